@@ -67,4 +67,23 @@ class CadastroForm(forms.ModelForm):
             
             if existe:
                 raise forms.ValidationError("Este Nº de Registro já existe.")
-        return num
\ No newline at end of file
+        return num
+
+
+class ImportacaoCadastrosForm(forms.Form):
+    arquivo = forms.FileField(
+        label="Arquivo (.csv ou .xlsx)",
+        help_text="Primeira linha com os nomes das colunas: Nome, CPF/CNPJ, Nº Registro, Email, Celular, Cidade, UF...",
+    )
+    papel = forms.ChoiceField(choices=Cadastro.PAPEL_CHOICES, label="Importar como", initial='CLI')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field in self.fields.values():
+            field.widget.attrs['class'] = 'w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500'
+
+    def clean_arquivo(self):
+        arquivo = self.cleaned_data['arquivo']
+        if not arquivo.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError("Envie um arquivo .csv ou .xlsx.")
+        return arquivo
@@ -0,0 +1,274 @@
+"""
+Importação em massa de Cadastros (CSV ou XLSX).
+
+O arquivo é lido linha a linha. CPF/CNPJ e Nº de Registro já existentes na
+empresa são carregados uma vez em conjuntos, então a validação de duplicados
+não consulta o banco por linha. As linhas válidas são gravadas em lotes
+(bulk_create) e as inválidas voltam num relatório com o número da linha.
+"""
+import codecs
+import csv
+import io
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+
+from .models import Cadastro, normalizar_texto, so_digitos
+
+TAMANHO_LOTE = 1000
+
+# Cabeçalho normalizado (sem acento/minúsculo) -> campo do Cadastro
+COLUNAS = {
+    'nome': 'nome', 'nome fantasia': 'nome', 'nome completo': 'nome',
+    'razao social': 'razao_social',
+    'cpf cnpj': 'cpf_cnpj', 'cpf': 'cpf_cnpj', 'cnpj': 'cpf_cnpj', 'documento': 'cpf_cnpj',
+    'rg': 'rg',
+    'inscricao estadual': 'inscricao_estadual', 'ie': 'inscricao_estadual',
+    'n registro': 'num_registro', 'no registro': 'num_registro', 'num registro': 'num_registro',
+    'registro': 'num_registro', 'matricula': 'num_registro',
+    'data nascimento': 'data_nascimento', 'nascimento': 'data_nascimento', 'data de nascimento': 'data_nascimento',
+    'email': 'email', 'e mail': 'email',
+    'celular': 'celular', 'telefone': 'telefone_fixo', 'telefone fixo': 'telefone_fixo',
+    'cep': 'cep', 'endereco': 'endereco', 'bairro': 'bairro', 'cidade': 'cidade', 'uf': 'uf',
+    'observacoes': 'observacoes',
+}
+
+# Tamanho máximo dos campos de texto (corta em vez de estourar o INSERT)
+LIMITES = {
+    campo.name: campo.max_length
+    for campo in Cadastro._meta.get_fields()
+    if getattr(campo, 'max_length', None)
+}
+
+
+# ==================================================
+# CPF / CNPJ
+# ==================================================
+
+def _digito(digitos, pesos):
+    resto = sum(int(d) * p for d, p in zip(digitos, pesos)) % 11
+    return '0' if resto < 2 else str(11 - resto)
+
+
+def cpf_valido(cpf):
+    if len(cpf) != 11 or cpf == cpf[0] * 11:
+        return False
+    dv1 = _digito(cpf[:9], range(10, 1, -1))
+    dv2 = _digito(cpf[:9] + dv1, range(11, 1, -1))
+    return cpf[9:] == dv1 + dv2
+
+
+def cnpj_valido(cnpj):
+    if len(cnpj) != 14 or cnpj == cnpj[0] * 14:
+        return False
+    pesos = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+    dv1 = _digito(cnpj[:12], pesos)
+    dv2 = _digito(cnpj[:12] + dv1, [6] + pesos)
+    return cnpj[12:] == dv1 + dv2
+
+
+def completar_cpf(base):
+    """Os 9 primeiros dígitos + os 2 verificadores (para gerar CPFs válidos)"""
+    dv1 = _digito(base, range(10, 1, -1))
+    return base + dv1 + _digito(base + dv1, range(11, 1, -1))
+
+
+def completar_cnpj(base):
+    """Os 12 primeiros dígitos + os 2 verificadores (para gerar CNPJs válidos)"""
+    pesos = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+    dv1 = _digito(base, pesos)
+    return base + dv1 + _digito(base + dv1, [6] + pesos)
+
+
+def formatar_documento(digitos):
+    """Mesma máscara usada no formulário: 000.000.000-00 / 00.000.000/0000-00"""
+    if len(digitos) == 11:
+        return f"{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}"
+    return f"{digitos[:2]}.{digitos[2:5]}.{digitos[5:8]}/{digitos[8:12]}-{digitos[12:]}"
+
+
+# ==================================================
+# LEITURA DO ARQUIVO
+# ==================================================
+
+def _encadear(primeira, resto):
+    yield primeira
+    yield from resto
+
+
+def _linhas_csv(arquivo):
+    texto = codecs.getreader('utf-8-sig')(arquivo, errors='replace')
+    primeira = texto.readline()
+    delimitador = ';' if primeira.count(';') >= primeira.count(',') else ','
+    leitor = csv.reader(_encadear(primeira, texto), delimiter=delimitador)
+    yield from leitor
+
+
+def _linhas_xlsx(arquivo):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Importação XLSX indisponível: instale o pacote openpyxl.")
+
+    # read_only lê a planilha aos poucos, sem carregar tudo na memória
+    planilha = load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        for linha in planilha.active.iter_rows(values_only=True):
+            yield ['' if valor is None else valor for valor in linha]
+    finally:
+        planilha.close()
+
+
+def ler_linhas(arquivo, nome_arquivo):
+    """Gera (número da linha, {campo: valor}) a partir de um CSV (; ou ,) ou XLSX com cabeçalho"""
+    if nome_arquivo.lower().endswith('.xlsx'):
+        linhas = _linhas_xlsx(arquivo)
+    else:
+        linhas = _linhas_csv(arquivo)
+
+    cabecalho = next(linhas, None)
+    if not cabecalho:
+        raise ValueError("Arquivo vazio.")
+
+    campos = [COLUNAS.get(normalizar_texto(str(coluna))) for coluna in cabecalho]
+    if 'nome' not in campos or 'cpf_cnpj' not in campos:
+        raise ValueError("O cabeçalho precisa ter as colunas Nome e CPF/CNPJ.")
+
+    for numero, linha in enumerate(linhas, start=2):
+        if not any(str(valor).strip() for valor in linha):
+            continue
+        yield numero, {campo: valor for campo, valor in zip(campos, linha) if campo}
+
+
+# ==================================================
+# VALIDAÇÃO E GRAVAÇÃO
+# ==================================================
+
+def _texto(valor):
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def _data(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = _texto(valor)
+    if not texto:
+        return None
+    for formato in ('%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y'):
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Data inválida: {texto}")
+
+
+def montar_cadastro(empresa, papel, dados, documentos, registros):
+    """Valida uma linha contra os conjuntos já carregados. Devolve (Cadastro, []) ou (None, erros)"""
+    erros = []
+    valores = {campo: _texto(valor) for campo, valor in dados.items() if campo != 'data_nascimento'}
+
+    if not valores.get('nome'):
+        erros.append("Nome em branco.")
+
+    digitos = so_digitos(valores.get('cpf_cnpj'))
+    if len(digitos) == 11:
+        tipo_pessoa = 'PF'
+        if not cpf_valido(digitos):
+            erros.append(f"CPF inválido: {valores['cpf_cnpj']}.")
+    elif len(digitos) == 14:
+        tipo_pessoa = 'PJ'
+        if not cnpj_valido(digitos):
+            erros.append(f"CNPJ inválido: {valores['cpf_cnpj']}.")
+    else:
+        tipo_pessoa = None
+        erros.append(f"CPF/CNPJ deve ter 11 ou 14 dígitos: {valores.get('cpf_cnpj') or '(vazio)'}.")
+
+    if digitos in documentos:
+        erros.append(f"CPF/CNPJ já cadastrado: {valores['cpf_cnpj']}.")
+
+    num_registro = None
+    if valores.get('num_registro'):
+        try:
+            num_registro = int(valores['num_registro'])
+        except ValueError:
+            erros.append(f"Nº de Registro não é número: {valores['num_registro']}.")
+        else:
+            if num_registro in registros:
+                erros.append(f"Nº de Registro já existe: {num_registro}.")
+
+    if valores.get('email'):
+        try:
+            validate_email(valores['email'])
+        except ValidationError:
+            erros.append(f"E-mail inválido: {valores['email']}.")
+
+    data_nascimento = None
+    try:
+        data_nascimento = _data(dados.get('data_nascimento', ''))
+    except ValueError as erro:
+        erros.append(f"{erro}.")
+
+    if erros:
+        return None, erros
+
+    # Daqui em diante, o mesmo documento/registro em outra linha do arquivo é duplicado
+    documentos.add(digitos)
+    if num_registro is not None:
+        registros.add(num_registro)
+
+    valores = {campo: valor[:LIMITES[campo]] for campo, valor in valores.items() if campo in LIMITES}
+    valores['cpf_cnpj'] = formatar_documento(digitos)
+    valores['uf'] = valores.get('uf', '').upper()
+    valores['email'] = valores.get('email') or None
+    return Cadastro(
+        empresa=empresa, papel=papel, tipo_pessoa=tipo_pessoa,
+        num_registro=num_registro, data_nascimento=data_nascimento, **valores
+    ), []
+
+
+def importar_cadastros(empresa, arquivo, nome_arquivo, papel='CLI', tamanho_lote=TAMANHO_LOTE):
+    """
+    Importa o arquivo para a empresa. Cada lote é gravado na sua própria transação.
+    Devolve {'importados': int, 'erros': [(linha, [mensagens])]}.
+    """
+    existentes = Cadastro.objects.filter(empresa=empresa)
+    documentos = set(existentes.values_list('documento_busca', flat=True))
+    registros = set(existentes.exclude(num_registro=None).values_list('num_registro', flat=True))
+
+    importados = 0
+    erros = []
+    lote = []
+
+    for numero, dados in ler_linhas(arquivo, nome_arquivo):
+        cadastro, erros_linha = montar_cadastro(empresa, papel, dados, documentos, registros)
+        if erros_linha:
+            erros.append((numero, erros_linha))
+            continue
+
+        lote.append(cadastro)
+        if len(lote) >= tamanho_lote:
+            Cadastro.criar_em_lote(lote)
+            importados += len(lote)
+            lote = []
+
+    if lote:
+        Cadastro.criar_em_lote(lote)
+        importados += len(lote)
+
+    return {'importados': importados, 'erros': erros}
+
+
+def relatorio_erros_csv(erros):
+    """Relatório de erros (linha;erro) em texto CSV, para baixar ou gravar em arquivo"""
+    saida = io.StringIO()
+    escritor = csv.writer(saida, delimiter=';')
+    escritor.writerow(['Linha', 'Erro'])
+    for numero, mensagens in erros:
+        for mensagem in mensagens:
+            escritor.writerow([numero, mensagem])
+    return saida.getvalue()
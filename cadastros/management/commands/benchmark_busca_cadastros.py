@@ -0,0 +1,76 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from cadastros.models import Cadastro
+from core.models import Empresa
+
+NOMES = ['João', 'José', 'Maria', 'Ana', 'Antônio', 'Francisca', 'Luís', 'Márcia', 'Sérgio', 'Conceição',
+         'Paulo', 'Adriana', 'Carlos', 'Juliana', 'Fábio', 'Patrícia', 'Rogério', 'Letícia', 'André', 'Cláudia']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Ferreira', 'Araújo', 'Gonçalves',
+              'Simões', 'Brandão', 'Magalhães', 'Conceição', 'Assunção', 'Rodrigues', 'Almeida', 'Nascimento']
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a busca de cadastros (LIKE '%...%' antigo x busca indexada) numa empresa "
+        "temporária com N cadastros. Tudo é desfeito no final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quantidade', type=int, default=200000, help="Cadastros na empresa de teste")
+        parser.add_argument('--repeticoes', type=int, default=5)
+
+    def handle(self, *args, **options):
+        aleatorio = random.Random(42)
+
+        with transaction.atomic():
+            empresa = Empresa.objects.create(nome="Benchmark Busca", cnpj=f"bench-{time.time_ns()}")
+            self.stdout.write(f"Gerando {options['quantidade']} cadastros...")
+            inicio = time.perf_counter()
+            lote = []
+            for i in range(options['quantidade']):
+                nome = f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {aleatorio.choice(SOBRENOMES)}"
+                cpf = f"{i:011d}"
+                lote.append(Cadastro(
+                    empresa=empresa, nome=nome,
+                    cpf_cnpj=f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}",
+                    email=f"cliente{i}@exemplo.com.br",
+                ))
+                if len(lote) == 5000:
+                    Cadastro.criar_em_lote(lote)
+                    lote = []
+            if lote:
+                Cadastro.criar_em_lote(lote)
+            self.stdout.write(f"  pronto em {time.perf_counter() - inicio:.1f}s\n")
+
+            buscas = ['silva', 'Joao', 'joão sil', 'magalhaes brandao', 'cliente1234', '000.001.2', '00000123']
+            base = Cadastro.objects.filter(empresa=empresa)
+
+            self.stdout.write(f"{'busca':<20} {'antigo (ms)':>12} {'indexado (ms)':>14} {'achados antigo/novo':>22}")
+            for texto in buscas:
+                antigo = base.filter(
+                    Q(nome__icontains=texto) | Q(cpf_cnpj__icontains=texto) | Q(email__icontains=texto)
+                )
+                novo = base.buscar(texto, empresa)
+                tempo_antigo, qtd_antigo = self.medir(antigo, options['repeticoes'])
+                tempo_novo, qtd_novo = self.medir(novo, options['repeticoes'])
+                self.stdout.write(
+                    f"{texto:<20} {tempo_antigo:>12.1f} {tempo_novo:>14.1f} {f'{qtd_antigo}/{qtd_novo}':>22}"
+                )
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def medir(queryset, repeticoes):
+        """Mediana (ms) de buscar os IDs de todos os resultados"""
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            ids = list(queryset.values_list('id', flat=True))
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tempos), len(ids)
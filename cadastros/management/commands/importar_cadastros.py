@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Empresa
+from cadastros.importacao import importar_cadastros, relatorio_erros_csv
+
+
+class Command(BaseCommand):
+    help = "Importa Cadastros de um arquivo CSV (; ou ,) ou XLSX com cabeçalho (Nome, CPF/CNPJ, ...)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Caminho do .csv ou .xlsx")
+        parser.add_argument('--empresa', type=int, required=True, help="ID da empresa")
+        parser.add_argument('--papel', choices=['CLI', 'FOR', 'AMB'], default='CLI', help="Tipo de cadastro (padrão: CLI)")
+        parser.add_argument('--relatorio', help="Grava as linhas com erro neste arquivo CSV")
+
+    def handle(self, *args, **options):
+        empresa = Empresa.objects.filter(id=options['empresa']).first()
+        if not empresa:
+            raise CommandError(f"Empresa {options['empresa']} não encontrada.")
+
+        try:
+            with open(options['arquivo'], 'rb') as arquivo:
+                resultado = importar_cadastros(empresa, arquivo, options['arquivo'], options['papel'])
+        except (OSError, ValueError) as erro:
+            raise CommandError(str(erro))
+
+        for numero, mensagens in resultado['erros'][:50]:
+            self.stdout.write(self.style.WARNING(f"Linha {numero}: {' '.join(mensagens)}"))
+        if len(resultado['erros']) > 50:
+            self.stdout.write(self.style.WARNING(f"... e mais {len(resultado['erros']) - 50} linhas com erro."))
+
+        if options['relatorio'] and resultado['erros']:
+            with open(options['relatorio'], 'w', encoding='utf-8-sig', newline='') as saida:
+                saida.write(relatorio_erros_csv(resultado['erros']))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['importados']} cadastros importados, {len(resultado['erros'])} linhas com erro."
+        ))
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastros', '0002_remove_cadastro_rg_ie_cadastro_inscricao_estadual_and_more'),
+        ('core', '0003_parametrosistema'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CadastroTermo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('termo', models.CharField(max_length=40)),
+            ],
+            options={
+                'verbose_name': 'Termo de Busca',
+                'verbose_name_plural': 'Termos de Busca',
+            },
+        ),
+        migrations.AddField(
+            model_name='cadastro',
+            name='documento_busca',
+            field=models.CharField(blank=True, editable=False, help_text='CPF/CNPJ só com dígitos', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='cadastro',
+            name='nome_busca',
+            field=models.CharField(blank=True, editable=False, help_text='Nome sem acento e minúsculo', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='cadastro',
+            index=models.Index(fields=['empresa', 'documento_busca'], name='cadastro_emp_documento_idx'),
+        ),
+        migrations.AddField(
+            model_name='cadastrotermo',
+            name='cadastro',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='termos_busca', to='cadastros.cadastro'),
+        ),
+        migrations.AddField(
+            model_name='cadastrotermo',
+            name='empresa',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.empresa', verbose_name='Empresa'),
+        ),
+        migrations.AddIndex(
+            model_name='cadastrotermo',
+            index=models.Index(fields=['empresa', 'termo'], name='termo_emp_termo_idx'),
+        ),
+    ]
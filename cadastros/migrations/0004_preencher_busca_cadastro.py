@@ -0,0 +1,58 @@
+import re
+import unicodedata
+
+from django.db import migrations
+
+# Cópia das funções de cadastros.models como estavam nesta migração: a migração
+# não pode mudar de comportamento se o modelo mudar depois
+TAMANHO_TERMO = 40
+
+
+def normalizar_texto(texto):
+    sem_acento = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', sem_acento.lower()).split())
+
+
+def so_digitos(texto):
+    return re.sub(r'\D', '', texto or '')
+
+
+def termos_busca(texto):
+    return list(dict.fromkeys(termo[:TAMANHO_TERMO] for termo in normalizar_texto(texto).split()))
+
+
+def preencher_busca(apps, schema_editor):
+    """Grava nome/documento normalizados e os termos de busca dos cadastros existentes"""
+    Cadastro = apps.get_model('cadastros', 'Cadastro')
+    CadastroTermo = apps.get_model('cadastros', 'CadastroTermo')
+
+    cadastros = Cadastro.objects.order_by('id')
+    ultimo_id = 0
+    while True:
+        lote = list(cadastros.filter(id__gt=ultimo_id)[:2000])
+        if not lote:
+            break
+
+        termos = []
+        for cadastro in lote:
+            cadastro.nome_busca = normalizar_texto(' '.join(filter(None, [cadastro.nome, cadastro.razao_social])))[:255]
+            cadastro.documento_busca = so_digitos(cadastro.cpf_cnpj)[:20]
+            termos += [
+                CadastroTermo(empresa_id=cadastro.empresa_id, cadastro_id=cadastro.id, termo=termo)
+                for termo in termos_busca(' '.join(filter(None, [cadastro.nome_busca, cadastro.email])))
+            ]
+
+        Cadastro.objects.bulk_update(lote, ['nome_busca', 'documento_busca'])
+        CadastroTermo.objects.bulk_create(termos)
+        ultimo_id = lote[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastros', '0003_busca_normalizada'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_busca, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastros', '0004_preencher_busca_cadastro'),
+        ('core', '0003_parametrosistema'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cadastro',
+            index=models.Index(fields=['empresa', 'nome'], name='cadastro_emp_nome_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastros', '0005_cadastro_nome_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cadastro',
+            name='foto_miniaturas',
+            field=models.BooleanField(default=False, editable=False, help_text='Miniaturas da foto já geradas (ver core.imagens)'),
+        ),
+    ]
@@ -1,5 +1,53 @@
-from django.db import models
-from core.models import ModeloSaaS
+import re
+import unicodedata
+
+from django.db import models, transaction
+from django.db.models import Q
+from core.empresa_atual import empresa_atual_id
+from core.imagens import ComMiniaturas
+from core.models import EmpresaManager, EmpresaQuerySet, ModeloSaaS
+
+
+# ==================================================
+# NORMALIZAÇÃO PARA BUSCA
+# ==================================================
+# Os termos só têm [0-9a-z]: a ordem é a mesma no SQLite (binária) e no MySQL
+# (collation *_ci), então a busca por prefixo vira um intervalo no índice.
+ALFABETO_BUSCA = '0123456789abcdefghijklmnopqrstuvwxyz'
+TAMANHO_TERMO = 40
+MAX_TERMOS_CONSULTA = 5
+
+
+def normalizar_texto(texto):
+    """'João  da Silva-Sauro' -> 'joao da silva sauro' (sem acento, minúsculo, só letras/dígitos)"""
+    sem_acento = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', sem_acento.lower()).split())
+
+
+def so_digitos(texto):
+    return re.sub(r'\D', '', texto or '')
+
+
+def termos_busca(texto):
+    """Palavras distintas do texto normalizado, na ordem em que aparecem"""
+    return list(dict.fromkeys(termo[:TAMANHO_TERMO] for termo in normalizar_texto(texto).split()))
+
+
+def filtro_prefixo(campo, prefixo):
+    """
+    Q de "campo começa com prefixo" escrito como intervalo (>= prefixo e < próximo prefixo),
+    que usa o índice em qualquer banco (o LIKE com ESCAPE do SQLite não usa).
+    """
+    filtro = Q(**{f'{campo}__gte': prefixo})
+    # Próximo prefixo: incrementa o último caractere; 'z'/'9' no fim "vai um" para o anterior
+    fim = prefixo
+    while fim and fim[-1] == ALFABETO_BUSCA[-1]:
+        fim = fim[:-1]
+    if fim:
+        fim = fim[:-1] + ALFABETO_BUSCA[ALFABETO_BUSCA.index(fim[-1]) + 1]
+        filtro &= Q(**{f'{campo}__lt': fim})
+    return filtro
+
 
 class CategoriaCliente(ModeloSaaS):
     """Ex: Sócio Ouro, Aluno Manhã, Cliente Varejo"""
@@ -12,7 +60,38 @@ class CategoriaCliente(ModeloSaaS):
         verbose_name = "Categoria de Cliente"
         verbose_name_plural = "Categorias de Clientes"
 
-class Cadastro(ModeloSaaS):
+class CadastroQuerySet(EmpresaQuerySet):
+    def buscar(self, texto, empresa=None):
+        """
+        Busca por prefixo de palavra, sem acento: "joao sil" acha "João da Silva".
+        Só números (CPF/CNPJ com ou sem pontuação) busca pelo início do documento.
+        A empresa (padrão: a da requisição) restringe a leitura do índice de termos.
+        """
+        texto = (texto or '').strip()
+        if not texto:
+            return self
+
+        digitos = so_digitos(texto)
+        if digitos and not re.search(r'[^\d\s./-]', texto):
+            return self.filter(filtro_prefixo('documento_busca', digitos))
+
+        termos = termos_busca(texto)[:MAX_TERMOS_CONSULTA]
+        if not termos:
+            return self.none()
+
+        termos_empresa = CadastroTermo.objects.all()
+        empresa_id = getattr(empresa, 'pk', empresa) or empresa_atual_id()
+        if empresa_id:
+            termos_empresa = termos_empresa.filter(empresa_id=empresa_id)
+
+        qs = self
+        for termo in termos:
+            # Cada palavra digitada tem que ser início de alguma palavra do cadastro
+            qs = qs.filter(id__in=termos_empresa.filter(filtro_prefixo('termo', termo)).values('cadastro_id'))
+        return qs
+
+
+class Cadastro(ComMiniaturas, ModeloSaaS):
     TIPO_PESSOA_CHOICES = [
         ('PF', 'Pessoa Física'),
         ('PJ', 'Pessoa Jurídica'),
@@ -29,6 +108,9 @@ class Cadastro(ModeloSaaS):
         ('INATIVO', 'Inativo'),
     ]
 
+    # Avatar da listagem (h-10) e pré-visualização do formulário (h-48)
+    MINIATURAS = {'foto': (64, 256)}
+
     # --- Classificação ---
     papel = models.CharField(max_length=3, choices=PAPEL_CHOICES, default='CLI', verbose_name="Tipo de Cadastro")
     categoria = models.ForeignKey(CategoriaCliente, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Categoria (Apenas Clientes)")
@@ -70,13 +152,93 @@ class Cadastro(ModeloSaaS):
 
     situacao = models.CharField(max_length=10, choices=STATUS_CHOICES, default='ATIVO')
     foto = models.ImageField(upload_to='fotos_cadastros/', null=True, blank=True)
+    foto_miniaturas = models.BooleanField(default=False, editable=False, help_text="Miniaturas da foto já geradas (ver core.imagens)")
     observacoes = models.TextField(blank=True)
 
+    # --- Busca (preenchidos no save) ---
+    nome_busca = models.CharField(max_length=255, blank=True, editable=False, help_text="Nome sem acento e minúsculo")
+    documento_busca = models.CharField(max_length=20, blank=True, editable=False, help_text="CPF/CNPJ só com dígitos")
+
+    objects = EmpresaManager.from_queryset(CadastroQuerySet)()
+
     def __str__(self):
         return self.nome 
 
+    def preencher_busca(self):
+        self.nome_busca = normalizar_texto(' '.join(filter(None, [self.nome, self.razao_social])))[:255]
+        self.documento_busca = so_digitos(self.cpf_cnpj)[:20]
+
+    def termos(self):
+        return termos_busca(' '.join(filter(None, [self.nome_busca, self.email])))
+
+    def save(self, *args, **kwargs):
+        self.preencher_busca()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.atualizar_termos([self])
+
+    @classmethod
+    def criar_em_lote(cls, cadastros, batch_size=1000):
+        """bulk_create que também preenche os campos e os termos de busca"""
+        for cadastro in cadastros:
+            cadastro.preencher_busca()
+
+        with transaction.atomic():
+            cls.objects.bulk_create(cadastros, batch_size=batch_size)
+
+            # MySQL não devolve os IDs no bulk_create: busca pelo CPF/CNPJ (único por empresa)
+            sem_id = [c for c in cadastros if c.id is None]
+            if sem_id:
+                ids = {}
+                for empresa_id in {c.empresa_id for c in sem_id}:
+                    documentos = [c.cpf_cnpj for c in sem_id if c.empresa_id == empresa_id]
+                    for inicio in range(0, len(documentos), batch_size):
+                        ids.update(
+                            ((empresa_id, doc), pk) for doc, pk in cls.objects.filter(
+                                empresa_id=empresa_id, cpf_cnpj__in=documentos[inicio:inicio + batch_size]
+                            ).values_list('cpf_cnpj', 'id')
+                        )
+                for cadastro in sem_id:
+                    cadastro.id = ids[(cadastro.empresa_id, cadastro.cpf_cnpj)]
+
+            cls.atualizar_termos(cadastros)
+        return cadastros
+
+    @staticmethod
+    def atualizar_termos(cadastros, batch_size=2000):
+        """Regrava os termos de busca dos cadastros (use também depois de bulk_create/bulk_update)"""
+        CadastroTermo.objects.filter(cadastro__in=[c.id for c in cadastros]).delete()
+        CadastroTermo.objects.bulk_create([
+            CadastroTermo(empresa_id=c.empresa_id, cadastro_id=c.id, termo=termo)
+            for c in cadastros for termo in c.termos()
+        ], batch_size=batch_size)
+
     class Meta:
         verbose_name = "Cadastro"
         verbose_name_plural = "Cadastros"
         ordering = ['nome']
         unique_together = [['empresa', 'cpf_cnpj']] # CPF/CNPJ único por empresa
+        indexes = [
+            models.Index(fields=['empresa', 'documento_busca'], name='cadastro_emp_documento_idx'),
+            # Ordem alfabética do autocomplete sem ordenar a empresa inteira
+            models.Index(fields=['empresa', 'nome'], name='cadastro_emp_nome_idx'),
+        ]
+
+
+class CadastroTermo(ModeloSaaS):
+    """
+    Cada palavra (normalizada) do nome, razão social e e-mail de um Cadastro.
+    Permite buscar por início de palavra usando índice, sem LIKE '%...%'.
+    """
+    cadastro = models.ForeignKey(Cadastro, on_delete=models.CASCADE, related_name='termos_busca')
+    termo = models.CharField(max_length=TAMANHO_TERMO)
+
+    def __str__(self):
+        return self.termo
+
+    class Meta:
+        verbose_name = "Termo de Busca"
+        verbose_name_plural = "Termos de Busca"
+        indexes = [
+            models.Index(fields=['empresa', 'termo'], name='termo_emp_termo_idx'),
+        ]
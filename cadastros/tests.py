@@ -1,3 +1,160 @@
-from django.test import TestCase
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from core.autocomplete import ITENS_POR_PAGINA
+from core.models import Empresa, Usuario
+from .importacao import cnpj_valido, completar_cnpj, completar_cpf, cpf_valido, importar_cadastros
+from .models import Cadastro, filtro_prefixo, normalizar_texto
+
+
+class BuscaCadastroTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        cls.outra = Empresa.objects.create(nome="B", cnpj="B")
+        cls.joao = Cadastro.objects.create(
+            empresa=cls.empresa, nome="João da Silva", cpf_cnpj="529.982.247-25", email="jsilva@exemplo.com"
+        )
+        cls.maria = Cadastro.objects.create(
+            empresa=cls.empresa, nome="Maria Conceição", razao_social="Padaria Pão Quente", cpf_cnpj="11.222.333/0001-81"
+        )
+        Cadastro.objects.create(empresa=cls.outra, nome="João Outro", cpf_cnpj="529.982.247-25")
+
+    def buscar(self, texto):
+        return list(Cadastro.objects.filter(empresa=self.empresa).buscar(texto, self.empresa))
+
+    def test_normalizacao(self):
+        self.assertEqual(normalizar_texto("  JOÃO da Silva-Sauro "), "joao da silva sauro")
+        self.assertEqual(self.joao.nome_busca, "joao da silva")
+        self.assertEqual(self.joao.documento_busca, "52998224725")
+
+    def test_sem_acento_e_por_inicio_de_palavra(self):
+        self.assertEqual(self.buscar("joao"), [self.joao])
+        self.assertEqual(self.buscar("Conceicao"), [self.maria])
+        self.assertEqual(self.buscar("sil jo"), [self.joao])
+        self.assertEqual(self.buscar("pao quen"), [self.maria])
+        self.assertEqual(self.buscar("jsilva"), [self.joao])
+        self.assertEqual(self.buscar("ilva"), [])
+
+    def test_documento_com_ou_sem_pontuacao(self):
+        self.assertEqual(self.buscar("529.982"), [self.joao])
+        self.assertEqual(self.buscar("529982247"), [self.joao])
+        self.assertEqual(self.buscar("11222333"), [self.maria])
+
+    def test_edicao_atualiza_os_termos(self):
+        self.joao.nome = "Joana Souza"
+        self.joao.save()
+        self.assertEqual(self.buscar("joao"), [])
+        self.assertEqual(self.buscar("souza"), [self.joao])
+
+    def test_prefixo_vira_intervalo(self):
+        self.assertEqual(str(filtro_prefixo('termo', 'az')), "(AND: ('termo__gte', 'az'), ('termo__lt', 'b'))")
+        self.assertEqual(str(filtro_prefixo('termo', 'a9')), "(AND: ('termo__gte', 'a9'), ('termo__lt', 'aa'))")
+        self.assertEqual(str(filtro_prefixo('termo', 'zz')), "(AND: ('termo__gte', 'zz'))")
+
+
+class AutocompleteCadastrosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        cls.usuario = Usuario.objects.create_user('a', password='x', empresa=cls.empresa)
+        Cadastro.criar_em_lote([
+            Cadastro(empresa=cls.empresa, nome=f"Cliente {i:02d}", cpf_cnpj=str(i), papel='CLI')
+            for i in range(ITENS_POR_PAGINA + 5)
+        ])
+        Cadastro.objects.create(empresa=cls.empresa, nome="Cliente Fornecedor", cpf_cnpj="x", papel='FOR')
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def test_paginacao(self):
+        pagina1 = self.client.get('/cadastros/autocomplete/', {'q': 'cliente', 'tipo': 'R'}).json()
+        pagina2 = self.client.get('/cadastros/autocomplete/', {'q': 'cliente', 'tipo': 'R', 'pagina': 2}).json()
+        self.assertEqual(len(pagina1['resultados']), ITENS_POR_PAGINA)
+        self.assertTrue(pagina1['mais'])
+        self.assertEqual(len(pagina2['resultados']), 5)
+        self.assertFalse(pagina2['mais'])
+        self.assertEqual(pagina1['resultados'][0]['texto'], "Cliente 00 (0)")
+
+    def test_filtra_por_papel(self):
+        resultados = self.client.get('/cadastros/autocomplete/', {'q': 'forn', 'tipo': 'R'}).json()['resultados']
+        self.assertEqual(resultados, [])
+        resultados = self.client.get('/cadastros/autocomplete/', {'q': 'forn', 'tipo': 'D'}).json()['resultados']
+        self.assertEqual([r['texto'] for r in resultados], ["Cliente Fornecedor (x)"])
+
+
+class ImportacaoCadastrosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        cls.usuario = Usuario.objects.create_user('a', password='x', empresa=cls.empresa)
+        Cadastro.objects.create(empresa=cls.empresa, nome="Existente", cpf_cnpj="529.982.247-25", num_registro=10)
+
+    def setUp(self):
+        # Os relatórios de erros vão para o storage
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        configuracao = override_settings(MEDIA_ROOT=self.media)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def arquivo(self, *linhas):
+        conteudo = "\n".join(["Nome;CPF/CNPJ;Nº Registro;E-mail;Cidade"] + list(linhas))
+        return SimpleUploadedFile("cadastros.csv", conteudo.encode('utf-8-sig'))
+
+    def test_digitos_verificadores(self):
+        self.assertTrue(cpf_valido("52998224725"))
+        self.assertFalse(cpf_valido("52998224724"))
+        self.assertFalse(cpf_valido("11111111111"))
+        self.assertTrue(cnpj_valido("11222333000181"))
+        self.assertFalse(cnpj_valido("11222333000182"))
+        self.assertEqual(completar_cpf("529982247"), "52998224725")
+        self.assertEqual(completar_cnpj("112223330001"), "11222333000181")
+
+    def test_duplicados_no_banco_e_no_arquivo(self):
+        resultado = importar_cadastros(self.empresa, self.arquivo(
+            "Ana Souza;390.533.447-05;11;ana@exemplo.com;Recife",
+            "Duplicado do banco;52998224725;;;",
+            "Duplicado do arquivo;39053344705;;;",
+            "Registro repetido;11.222.333/0001-81;10;;",
+            "CPF errado;123.456.789-00;;;",
+            "Email ruim;11.444.777/0001-61;;sem-arroba;",
+        ), "cadastros.csv", tamanho_lote=1)
+
+        self.assertEqual(resultado['importados'], 1)
+        self.assertEqual([linha for linha, _ in resultado['erros']], [3, 4, 5, 6, 7])
+        ana = Cadastro.objects.get(nome="Ana Souza")
+        self.assertEqual((ana.cpf_cnpj, ana.tipo_pessoa, ana.num_registro), ("390.533.447-05", 'PF', 11))
+        # Os termos de busca são gravados junto com o lote
+        self.assertEqual(list(Cadastro.objects.filter(empresa=self.empresa).buscar("ana", self.empresa)), [ana])
+
+    def test_upload_em_lote(self):
+        self.client.force_login(self.usuario)
+        linhas = [f"Fornecedor {i};{d};;;" for i, d in enumerate(["11.222.333/0001-81", "11.444.777/0001-61"])]
+        response = self.client.post('/cadastros/importar/', {'arquivo': self.arquivo(*linhas, "Sem documento;;;;"), 'papel': 'FOR'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['resultado']['importados'], 2)
+        self.assertEqual(Cadastro.objects.filter(papel='FOR', tipo_pessoa='PJ').count(), 2)
+
+        relatorio = b''.join(self.client.get('/cadastros/importar/relatorio/').streaming_content).decode('utf-8-sig')
+        self.assertEqual(relatorio.splitlines()[1].split(';')[0], "4")
+
+    def test_relatorio_fica_no_storage_e_nao_na_sessao(self):
+        self.client.force_login(self.usuario)
+
+        self.client.post('/cadastros/importar/', {'arquivo': self.arquivo("Sem documento;;;;"), 'papel': 'CLI'})
+        primeiro = self.client.session['relatorio_importacao']
+        self.assertTrue(primeiro.startswith(f'importacoes/{self.empresa.id}/'))
+        self.assertTrue(default_storage.exists(primeiro))
+
+        # Nova importação sem erros: o relatório anterior é apagado
+        self.client.post('/cadastros/importar/', {'arquivo': self.arquivo("Novo;11.222.333/0001-81;;;"), 'papel': 'CLI'})
+        self.assertNotIn('relatorio_importacao', self.client.session)
+        self.assertFalse(default_storage.exists(primeiro))
+        response = self.client.get('/cadastros/importar/relatorio/')
+        self.assertRedirects(response, '/cadastros/importar/')
@@ -14,6 +14,11 @@ urlpatterns = [
     # A edição é a mesma para os dois, pois a view sabe redirecionar de volta
     path('editar/<int:id>/', views.editar_cadastro, name='editar_cadastro'),
     path('excluir/<int:id>/', views.excluir_cadastro, name='excluir_cadastro'),
+    path('autocomplete/', views.autocomplete_cadastros, name='autocomplete_cadastros'),
+
+    # --- IMPORTAÇÃO EM MASSA ---
+    path('importar/', views.importar_cadastros_view, name='importar_cadastros'),
+    path('importar/relatorio/', views.relatorio_importacao, name='relatorio_importacao'),
     
     # Rota padrão: se acessar /cadastros/, vai para clientes
     path('', views.lista_clientes, name='lista_cadastros_padrao'),
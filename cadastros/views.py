@@ -1,9 +1,16 @@
+import uuid
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import FileResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Q
+from core.autocomplete import resposta_autocomplete
 from .models import Cadastro, CategoriaCliente
-from .forms import CadastroForm
+from .forms import CadastroForm, ImportacaoCadastrosForm
+from .importacao import importar_cadastros, relatorio_erros_csv
 
 # ==================================================
 # GESTÃO DE CLIENTES (Sócios / Alunos / Clientes)
@@ -20,8 +27,8 @@ def lista_clientes(request):
     status = request.GET.get('status')
 
     if q:
-        # Busca por Nome, CPF ou Email
-        qs = qs.filter(Q(nome__icontains=q) | Q(cpf_cnpj__icontains=q) | Q(email__icontains=q))
+        # Busca por Nome, CPF ou Email (início de palavra, sem acento - usa índice)
+        qs = qs.buscar(q, request.user.empresa)
     
     if categoria_id:
         qs = qs.filter(categoria_id=categoria_id)
@@ -77,8 +84,8 @@ def lista_fornecedores(request):
     status = request.GET.get('status')
 
     if q:
-        # Busca por Nome, CPF/CNPJ ou Razão Social
-        qs = qs.filter(Q(nome__icontains=q) | Q(cpf_cnpj__icontains=q) | Q(razao_social__icontains=q))
+        # Busca por Nome, CPF/CNPJ ou Razão Social (início de palavra, sem acento - usa índice)
+        qs = qs.buscar(q, request.user.empresa)
         
     if status:
         qs = qs.filter(situacao=status)
@@ -151,4 +158,96 @@ def excluir_cadastro(request, id):
         cadastro.delete()
         messages.success(request, "Cadastro excluído com sucesso.")
     
-    return redirect(tipo_redirect)
\ No newline at end of file
+    return redirect(tipo_redirect)
+
+
+# ==================================================
+# IMPORTAÇÃO EM MASSA (CSV / XLSX)
+# ==================================================
+
+# Linhas com erro exibidas na tela (o relatório completo fica para download)
+ERROS_NA_TELA = 200
+
+
+def gravar_relatorio_importacao(request, conteudo):
+    """
+    Grava o relatório de erros no storage e guarda só o nome do arquivo na sessão
+    (com 100 mil linhas o CSV passa de alguns MB, grande demais para a sessão).
+    """
+    nome = default_storage.save(
+        f'importacoes/{request.user.empresa_id}/{uuid.uuid4().hex}.csv',
+        ContentFile(conteudo.encode('utf-8-sig')),
+    )
+    request.session['relatorio_importacao'] = nome
+
+
+def descartar_relatorio_importacao(request):
+    """Apaga o relatório da importação anterior do usuário, se houver"""
+    nome = request.session.pop('relatorio_importacao', None)
+    if nome:
+        default_storage.delete(nome)
+
+
+@login_required
+def importar_cadastros_view(request):
+    resultado = None
+    papel = request.GET.get('papel', 'CLI')
+
+    if request.method == 'POST':
+        form = ImportacaoCadastrosForm(request.POST, request.FILES)
+        if form.is_valid():
+            arquivo = form.cleaned_data['arquivo']
+            descartar_relatorio_importacao(request)
+            try:
+                resultado = importar_cadastros(request.user.empresa, arquivo, arquivo.name, form.cleaned_data['papel'])
+            except ValueError as erro:
+                messages.error(request, str(erro))
+            else:
+                if resultado['importados']:
+                    messages.success(request, f"{resultado['importados']} cadastros importados.")
+                if resultado['erros']:
+                    messages.warning(request, f"{len(resultado['erros'])} linhas não foram importadas. Veja o relatório abaixo.")
+                    # Guarda o relatório para o botão de download
+                    gravar_relatorio_importacao(request, relatorio_erros_csv(resultado['erros']))
+    else:
+        form = ImportacaoCadastrosForm(initial={'papel': papel})
+
+    return render(request, 'cadastros/importar.html', {
+        'form': form,
+        'resultado': resultado,
+        'erros': resultado['erros'][:ERROS_NA_TELA] if resultado else [],
+        'url_cancelar': 'lista_fornecedores' if papel == 'FOR' else 'lista_clientes',
+    })
+
+@login_required
+def relatorio_importacao(request):
+    """Download do relatório de erros da última importação"""
+    nome = request.session.get('relatorio_importacao')
+    # O nome vem da sessão, mas só serve dentro da pasta da empresa do usuário
+    if not nome or not nome.startswith(f'importacoes/{request.user.empresa_id}/') or not default_storage.exists(nome):
+        messages.error(request, "Nenhum relatório de importação disponível.")
+        return redirect('importar_cadastros')
+
+    return FileResponse(
+        default_storage.open(nome, 'rb'), as_attachment=True,
+        filename='erros_importacao.csv', content_type='text/csv; charset=utf-8',
+    )
+
+
+# ==================================================
+# AUTOCOMPLETE (JSON)
+# ==================================================
+
+@login_required
+def autocomplete_cadastros(request):
+    """Busca indexada para os campos de Cliente/Fornecedor (?q=, ?tipo=R|D, ?pagina=)"""
+    qs = Cadastro.objects.filter(empresa=request.user.empresa, situacao='ATIVO')
+
+    tipo = request.GET.get('tipo')
+    if tipo == 'R':
+        qs = qs.filter(papel__in=['CLI', 'AMB'])
+    elif tipo == 'D':
+        qs = qs.filter(papel__in=['FOR', 'AMB'])
+
+    qs = qs.buscar(request.GET.get('q'), request.user.empresa).only('id', 'nome', 'cpf_cnpj').order_by('nome', 'id')
+    return resposta_autocomplete(request, qs, lambda c: f"{c.nome} ({c.cpf_cnpj})")
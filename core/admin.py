@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import Empresa, Usuario, ParametroSistema
+from .models import Empresa, Usuario, ParametroSistema, Tarefa
 
 # 3. Configuração para gerenciar Parâmetros do Sistema
 @admin.register(ParametroSistema)
@@ -34,4 +34,12 @@ class UsuarioAdmin(UserAdmin):
     # Adiciona o campo 'empresa' também na tela de criar usuário
     add_fieldsets = UserAdmin.add_fieldsets + (
         ('Informações SaaS', {'fields': ('empresa', 'email')}),
-    )
\ No newline at end of file
+    )
+
+# 4. Fila de tarefas em segundo plano (acompanhamento)
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    list_display = ('descricao', 'empresa', 'usuario', 'status', 'tentativas', 'criada_em', 'concluida_em')
+    list_filter = ('status', 'empresa')
+    exclude = ('resultado',)
+    readonly_fields = ('caminho', 'parametros', 'erro', 'iniciada_em', 'concluida_em', 'expira_em')
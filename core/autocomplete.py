@@ -0,0 +1,75 @@
+"""
+Autocomplete: widget de formulário + resposta JSON paginada usada pelos endpoints.
+"""
+from urllib.parse import urlencode
+
+from django import forms
+from django.http import JsonResponse
+from django.urls import reverse
+
+ITENS_POR_PAGINA = 20
+
+
+def resposta_autocomplete(request, queryset, texto):
+    """
+    Página `?pagina=` do queryset (já filtrado e ordenado) no formato do widget.
+    `texto(obj)` monta o rótulo. Lê um item a mais só para saber se há próxima página.
+    """
+    try:
+        pagina = max(int(request.GET.get('pagina', 1)), 1)
+    except ValueError:
+        pagina = 1
+
+    inicio = (pagina - 1) * ITENS_POR_PAGINA
+    itens = list(queryset[inicio:inicio + ITENS_POR_PAGINA + 1])
+
+    return JsonResponse({
+        'resultados': [{'id': obj.pk, 'texto': texto(obj)} for obj in itens[:ITENS_POR_PAGINA]],
+        'mais': len(itens) > ITENS_POR_PAGINA,
+    })
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    <select> que só traz do banco a opção já selecionada.
+    As demais são buscadas pelo navegador no endpoint JSON `url_name`
+    (formato: {"resultados": [{"id", "texto"}], "mais": bool}) - ver static/js/autocomplete.js.
+    """
+
+    class Media:
+        js = ['js/autocomplete.js']
+
+    def __init__(self, url_name, parametros=None, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+        self.parametros = parametros or {}
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        url = reverse(self.url_name)
+        if self.parametros:
+            url = f"{url}?{urlencode(self.parametros)}"
+        attrs['data-autocomplete-url'] = url
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        # Em vez de iterar o queryset inteiro (self.choices), carrega só o(s) valor(es) atual(is)
+        selecionados = [v for v in value if v not in ('', None)]
+        opcoes = [('', self.choices.field.empty_label or '---------')]
+        if selecionados:
+            campo = self.choices.field
+            for obj in campo.queryset.filter(pk__in=selecionados):
+                opcoes.append((str(obj.pk), campo.label_from_instance(obj)))
+
+        grupos = []
+        for indice, (valor_opcao, rotulo) in enumerate(opcoes):
+            selecionado = valor_opcao in selecionados
+            grupos.append((None, [self.create_option(name, valor_opcao, rotulo, selecionado, indice, attrs=attrs)], indice))
+        return grupos
+
+
+def usar_autocomplete(campo, url_name, parametros=None):
+    """Troca o widget de um ModelChoiceField já configurado (mantém classes CSS e queryset)"""
+    campo.widget = AutocompleteSelect(url_name, parametros, attrs=campo.widget.attrs)
+    # Reatribuir o queryset liga o novo widget às escolhas do campo
+    campo.queryset = campo.queryset
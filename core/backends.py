@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+class UsuarioComEmpresaBackend(ModelBackend):
+    """
+    Autenticação padrão, mas o usuário de cada requisição é carregado junto
+    com a Empresa (um JOIN): request.user.empresa não faz outra consulta.
+    """
+
+    def get_user(self, user_id):
+        Usuario = get_user_model()
+        try:
+            usuario = Usuario._default_manager.select_related('empresa').get(pk=user_id)
+        except Usuario.DoesNotExist:
+            return None
+        return usuario if self.user_can_authenticate(usuario) else None
+
+    async def aget_user(self, user_id):
+        # Usado pelo request.auser() sob ASGI; o ModelBackend não passa pelo get_user
+        Usuario = get_user_model()
+        try:
+            usuario = await Usuario._default_manager.select_related('empresa').aget(pk=user_id)
+        except Usuario.DoesNotExist:
+            return None
+        return usuario if self.user_can_authenticate(usuario) else None
@@ -0,0 +1,38 @@
+"""
+Empresa (tenant) da requisição em andamento.
+
+O EmpresaMiddleware define a empresa do usuário logado no início de cada requisição
+e o manager padrão do ModeloSaaS usa esse valor para filtrar as consultas.
+Fora de uma requisição (shell, comandos, filas) não há empresa definida e as
+consultas não são filtradas; use `usar_empresa()` para restringir um trecho.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# ContextVar (e não threading.local) para funcionar também em views assíncronas
+_empresa_id = ContextVar('empresa_id', default=None)
+
+
+def empresa_atual_id():
+    """ID da empresa da requisição atual, ou None"""
+    return _empresa_id.get()
+
+
+def definir_empresa(empresa):
+    """Define a empresa atual (objeto, ID ou None). Devolve o token para `restaurar_empresa`"""
+    empresa_id = getattr(empresa, 'pk', empresa)
+    return _empresa_id.set(empresa_id)
+
+
+def restaurar_empresa(token):
+    _empresa_id.reset(token)
+
+
+@contextmanager
+def usar_empresa(empresa):
+    """Restringe as consultas do bloco à empresa informada"""
+    token = definir_empresa(empresa)
+    try:
+        yield
+    finally:
+        restaurar_empresa(token)
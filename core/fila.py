@@ -0,0 +1,167 @@
+"""
+Fila de tarefas em segundo plano gravada no banco (model Tarefa).
+
+Um relatório pesado não é gerado na requisição: a view grava uma Tarefa com
+a URL e os filtros e devolve na hora uma página que acompanha o andamento.
+O comando `processar_tarefas` pega as tarefas da fila com um número fixo de
+threads, chama a mesma view (com o usuário de quem pediu) e guarda o HTML.
+
+- Cada tarefa é reservada com um UPDATE condicional (status=PENDENTE): dois
+  workers nunca executam a mesma, em qualquer banco.
+- Falhou: volta para a fila com espera crescente, até TENTATIVAS vezes.
+- Travada em EXECUTANDO (worker morto) por mais de TEMPO_MAXIMO: volta para a fila.
+- O resultado fica disponível por EXPIRACAO e depois é apagado.
+"""
+import logging
+import traceback
+from datetime import timedelta
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db.models import F
+from django.http import HttpRequest, QueryDict
+from django.shortcuts import redirect
+from django.urls import resolve
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .empresa_atual import usar_empresa
+from .models import Tarefa
+
+logger = logging.getLogger(__name__)
+
+TENTATIVAS = 3
+ESPERA_RETENTATIVA = timedelta(seconds=30)
+TEMPO_MAXIMO = timedelta(minutes=15)
+EXPIRACAO = timedelta(hours=24)
+
+
+# ==================================================
+# LADO DA REQUISIÇÃO
+# ==================================================
+
+def enfileirar(request, descricao):
+    """Cria (ou reaproveita, se já está na fila) a tarefa para a página pedida"""
+    parametros = urlencode(sorted(
+        (nome, valor) for nome in request.GET for valor in request.GET.getlist(nome)
+    ))
+    tarefa = Tarefa.objects.filter(
+        empresa=request.user.empresa, usuario=request.user, caminho=request.path,
+        parametros=parametros, status__in=['PENDENTE', 'EXECUTANDO'],
+    ).first()
+    if tarefa is None:
+        tarefa = Tarefa.objects.create(
+            empresa=request.user.empresa, usuario=request.user, descricao=descricao,
+            caminho=request.path, parametros=parametros, executar_apos=timezone.now(),
+        )
+    return tarefa
+
+
+def periodo_longo(request, padrao_inicio):
+    """Período (data_inicio..data_fim da URL) maior que RELATORIO_DIAS_SINCRONO"""
+    limite = getattr(settings, 'RELATORIO_DIAS_SINCRONO', None)
+    if limite is None:
+        return False
+    hoje = timezone.localdate()
+    inicio = parse_date(request.GET.get('data_inicio') or '') or padrao_inicio(hoje)
+    fim = parse_date(request.GET.get('data_fim') or '') or hoje
+    return (fim - inicio).days > limite
+
+
+def em_segundo_plano(descricao, pesado):
+    """
+    Decorator para views de relatório: quando pesado(request) é verdadeiro, enfileira
+    e redireciona para a página de acompanhamento. Deve vir depois do @cache_relatorio,
+    assim o que já está em cache continua saindo na hora.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method == 'GET' and not getattr(request, 'em_segundo_plano', False) and pesado(request):
+                tarefa = enfileirar(request, descricao)
+                return redirect('tarefa', id=tarefa.id)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ==================================================
+# LADO DO WORKER
+# ==================================================
+
+def reservar_proxima():
+    """Reserva a próxima tarefa da fila (ou None)"""
+    agora = timezone.now()
+    candidatas = Tarefa.objects.filter(
+        status='PENDENTE', executar_apos__lte=agora
+    ).order_by('executar_apos', 'id').values_list('id', flat=True)[:10]
+
+    for tarefa_id in candidatas:
+        reservada = Tarefa.objects.filter(id=tarefa_id, status='PENDENTE').update(
+            status='EXECUTANDO', iniciada_em=agora, tentativas=F('tentativas') + 1,
+        )
+        if reservada:
+            return Tarefa.objects.select_related('usuario__empresa').get(id=tarefa_id)
+    return None
+
+
+def gerar_pagina(tarefa):
+    """Chama a view da URL da tarefa como se fosse o usuário que pediu. Devolve a resposta"""
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = tarefa.caminho
+    request.GET = QueryDict(tarefa.parametros)
+    request.META = {'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'QUERY_STRING': tarefa.parametros}
+    request.user = tarefa.usuario
+    request.em_segundo_plano = True
+
+    view = resolve(tarefa.caminho)
+    with usar_empresa(tarefa.empresa_id):
+        response = view.func(request, *view.args, **view.kwargs)
+    if response.status_code != 200 or response.streaming:
+        raise RuntimeError(f"A página respondeu com status {response.status_code}")
+    return response
+
+
+def executar(tarefa):
+    """Executa uma tarefa reservada e grava o resultado ou o erro"""
+    try:
+        response = gerar_pagina(tarefa)
+    except Exception:
+        erro = traceback.format_exc()
+        logger.exception("Tarefa %s falhou (tentativa %s)", tarefa.id, tarefa.tentativas)
+        if tarefa.tentativas < TENTATIVAS:
+            # Espera 30s, 60s, 120s...
+            espera = ESPERA_RETENTATIVA * 2 ** (tarefa.tentativas - 1)
+            Tarefa.objects.filter(id=tarefa.id).update(
+                status='PENDENTE', executar_apos=timezone.now() + espera, erro=erro,
+            )
+        else:
+            agora = timezone.now()
+            Tarefa.objects.filter(id=tarefa.id).update(
+                status='ERRO', concluida_em=agora, expira_em=agora + EXPIRACAO, erro=erro,
+            )
+        return False
+
+    agora = timezone.now()
+    Tarefa.objects.filter(id=tarefa.id).update(
+        status='CONCLUIDA', concluida_em=agora, expira_em=agora + EXPIRACAO, erro='',
+        resultado=response.content.decode(response.charset), content_type=response['Content-Type'],
+    )
+    return True
+
+
+def manutencao():
+    """Devolve à fila as tarefas travadas e apaga as expiradas. Devolve (recuperadas, apagadas)"""
+    agora = timezone.now()
+    travadas = Tarefa.objects.filter(status='EXECUTANDO', iniciada_em__lt=agora - TEMPO_MAXIMO)
+    travadas.filter(tentativas__gte=TENTATIVAS).update(
+        status='ERRO', concluida_em=agora, expira_em=agora + EXPIRACAO,
+        erro="Tempo máximo de execução esgotado.",
+    )
+    recuperadas = travadas.update(status='PENDENTE', executar_apos=agora)
+    apagadas, _ = Tarefa.objects.filter(
+        status__in=['CONCLUIDA', 'ERRO'], expira_em__lt=agora,
+    ).delete()
+    return recuperadas, apagadas
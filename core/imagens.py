@@ -0,0 +1,123 @@
+"""
+Miniaturas das imagens enviadas (foto do cadastro, logo e banner da empresa).
+
+Cada imagem ganha versões reduzidas em WebP, gravadas no mesmo storage em
+'<pasta>/miniaturas/<nome>_<tamanho>.webp'. O nome é derivado do original, e
+a coluna '<campo>_miniaturas' do model diz se elas já foram geradas: o template
+pede '{{ c.foto|miniatura:64 }}' sem consultar o storage e, se a versão ainda
+não existir (imagem antiga sem backfill, ou falha ao gerar), recebe o original.
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+FORMATO = 'WEBP'
+QUALIDADE = 80
+
+
+def nome_miniatura(nome, tamanho):
+    pasta, arquivo = os.path.split(nome)
+    base = os.path.splitext(arquivo)[0]
+    return os.path.join(pasta, 'miniaturas', f"{base}_{tamanho}.webp").replace('\\', '/')
+
+
+def campo_marcador(campo):
+    """Coluna booleana que marca as miniaturas do campo como geradas"""
+    return f"{campo}_miniaturas"
+
+
+def url_miniatura(arquivo, tamanho):
+    """URL da versão reduzida, ou do original se ela ainda não foi gerada"""
+    if not arquivo:
+        return ''
+    # Pelo marcador gravado no registro: um stat (ou HEAD, em storage remoto) por imagem
+    # a cada página custaria mais do que a miniatura economiza
+    if getattr(arquivo.instance, campo_marcador(arquivo.field.name), False):
+        return arquivo.storage.url(nome_miniatura(arquivo.name, tamanho))
+    return arquivo.url
+
+
+def apagar_miniaturas(storage, nome, tamanhos):
+    for tamanho in tamanhos:
+        storage.delete(nome_miniatura(nome, tamanho))
+
+
+def gerar_miniaturas(arquivo, tamanhos):
+    """Grava as versões reduzidas (lado maior = tamanho) de um ImageField já salvo"""
+    with arquivo.storage.open(arquivo.name, 'rb') as origem:
+        imagem = Image.open(origem)
+        # JPEG: decodifica já reduzido (escala 1/2, 1/4, 1/8), bem mais rápido para fotos de celular
+        imagem.draft('RGB', (max(tamanhos) * 2, max(tamanhos) * 2))
+        imagem = ImageOps.exif_transpose(imagem)
+        imagem = imagem.convert('RGBA' if 'A' in imagem.getbands() or 'transparency' in imagem.info else 'RGB')
+
+    for tamanho in sorted(tamanhos, reverse=True):
+        # Reduz a partir do resultado anterior: cada passo trabalha com menos pixels
+        imagem.thumbnail((tamanho, tamanho), Image.Resampling.LANCZOS)
+        saida = BytesIO()
+        imagem.save(saida, FORMATO, quality=QUALIDADE, method=4)
+
+        nome = nome_miniatura(arquivo.name, tamanho)
+        arquivo.storage.delete(nome)
+        arquivo.storage.save(nome, ContentFile(saida.getvalue()))
+
+
+class ComMiniaturas:
+    """
+    Mixin para models com ImageField. MINIATURAS = {'campo': (tamanhos...)}, e o
+    model declara um BooleanField '<campo>_miniaturas' (editable=False) para cada um.
+    Gera as versões no save, só para arquivos recém-enviados, e apaga as da imagem
+    anterior quando ela é trocada ou removida.
+    """
+    MINIATURAS = {}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Nome gravado de cada imagem, para saber no save se ela foi trocada
+        # (só dos campos carregados: com only()/defer() não força outra consulta)
+        instancia._imagens_gravadas = {
+            campo: instancia.__dict__[campo] for campo in cls.MINIATURAS if campo in instancia.__dict__
+        }
+        return instancia
+
+    def save(self, *args, **kwargs):
+        enviados = [
+            campo for campo in self.MINIATURAS
+            if getattr(self, campo) and not getattr(self, campo)._committed
+        ]
+        for campo in self.MINIATURAS:
+            if campo in enviados or not getattr(self, campo):
+                setattr(self, campo_marcador(campo), False)
+        super().save(*args, **kwargs)
+
+        gravadas = getattr(self, '_imagens_gravadas', {})
+        for campo, tamanhos in self.MINIATURAS.items():
+            anterior = getattr(gravadas.get(campo), 'name', gravadas.get(campo))
+            if anterior and anterior != getattr(self, campo).name:
+                apagar_miniaturas(getattr(self, campo).storage, anterior, tamanhos)
+        self._imagens_gravadas = {campo: getattr(self, campo).name for campo in self.MINIATURAS}
+
+        for campo in enviados:
+            self.atualizar_miniaturas(campo)
+
+    def atualizar_miniaturas(self, campo):
+        """Gera as miniaturas do campo e marca o registro. Devolve False se a imagem não abriu"""
+        try:
+            gerar_miniaturas(getattr(self, campo), self.MINIATURAS[campo])
+        except (OSError, Image.DecompressionBombError):
+            # Sem miniatura o template usa o original; não impede o cadastro
+            logger.exception("Falha ao gerar miniaturas de %s.%s", self._meta.label, campo)
+            return False
+        self.marcar_miniaturas(campo)
+        return True
+
+    def marcar_miniaturas(self, campo):
+        setattr(self, campo_marcador(campo), True)
+        # UPDATE direto: não passa de novo pelo save (nem pelo filtro de empresa do manager)
+        type(self)._base_manager.filter(pk=self.pk).update(**{campo_marcador(campo): True})
@@ -0,0 +1,185 @@
+"""
+Medição por requisição: consultas SQL, tempo de banco e tempo de template.
+
+Ligada pelo setting INSTRUMENTAR_REQUISICOES (ver core.middleware.InstrumentacaoMiddleware).
+Cada requisição ganha uma `Medicao` guardada numa ContextVar:
+
+- Um execute_wrapper instalado em todas as conexões (inclusive as das threads de
+  core.paralelo, que copiam o contexto) soma as consultas na medição atual.
+  Fora de uma requisição medida ele só repassa a consulta.
+- O render do backend de templates do Django soma o tempo de template (só o
+  render mais externo: includes e render_to_string dentro dele já estão contados).
+
+Só o texto do SQL é guardado, nunca os parâmetros (CPF, nomes, valores dos clientes).
+"""
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template
+
+logger = logging.getLogger(__name__)
+
+# Consultas guardadas por requisição (as que passam disso só entram na contagem e no tempo)
+MAX_CONSULTAS_GUARDADAS = 500
+
+_medicao = ContextVar('medicao_requisicao', default=None)
+_instalado = False
+
+
+class Medicao:
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.banco = 0.0
+        self.template = 0.0
+        self.profundidade_template = 0
+        self.sql = []
+        self._trava = threading.Lock()
+
+    def registrar_consulta(self, sql, segundos):
+        # As threads de core.paralelo registram ao mesmo tempo
+        with self._trava:
+            self.consultas += 1
+            self.banco += segundos
+            if len(self.sql) < MAX_CONSULTAS_GUARDADAS:
+                self.sql.append((segundos, sql))
+
+    def total_ms(self):
+        return (time.perf_counter() - self.inicio) * 1000
+
+    def mais_lentas(self, quantidade):
+        return [
+            {'ms': round(segundos * 1000, 2), 'sql': sql}
+            for segundos, sql in sorted(self.sql, key=lambda item: item[0], reverse=True)[:quantidade]
+        ]
+
+    def repetidas(self, quantidade):
+        """Mesmo SQL executado várias vezes na requisição: o sinal típico de N+1"""
+        contagem = Counter(sql for _, sql in self.sql)
+        return [{'vezes': vezes, 'sql': sql} for sql, vezes in contagem.most_common(quantidade) if vezes > 1]
+
+    def server_timing(self):
+        """Valor do cabeçalho Server-Timing (aparece na aba Network do navegador)"""
+        mais_lenta = max((segundos for segundos, _ in self.sql), default=0)
+        return ", ".join([
+            f'sql;dur={self.banco * 1000:.1f};desc="{self.consultas} consultas"',
+            f'sqlmax;dur={mais_lenta * 1000:.1f};desc="Consulta mais lenta"',
+            f'tpl;dur={self.template * 1000:.1f};desc="Templates"',
+            f'total;dur={self.total_ms():.1f}',
+        ])
+
+
+def iniciar():
+    """Começa a medir a requisição atual. Devolve (medicao, token para `encerrar`)"""
+    medicao = Medicao()
+    return medicao, iniciar_com(medicao)
+
+
+def iniciar_com(medicao):
+    """Volta a somar numa medição já começada (streaming). Devolve o token para `encerrar`"""
+    return _medicao.set(medicao)
+
+
+def encerrar(token):
+    _medicao.reset(token)
+
+
+def medir_consulta(execute, sql, params, many, context):
+    medicao = _medicao.get()
+    if medicao is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicao.registrar_consulta(sql, time.perf_counter() - inicio)
+
+
+def instalar_na_conexao(connection):
+    if medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(medir_consulta)
+
+
+def instalar_nas_conexoes_da_thread():
+    for connection in connections.all():
+        instalar_na_conexao(connection)
+
+
+def _ao_conectar(sender, connection, **kwargs):
+    instalar_na_conexao(connection)
+
+
+def _medir_render(render):
+    @wraps(render)
+    def wrapper(self, *args, **kwargs):
+        medicao = _medicao.get()
+        if medicao is None:
+            return render(self, *args, **kwargs)
+        medicao.profundidade_template += 1
+        inicio = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            medicao.profundidade_template -= 1
+            if medicao.profundidade_template == 0:
+                medicao.template += time.perf_counter() - inicio
+    return wrapper
+
+
+def instalar():
+    """Liga os ganchos de banco e de template (uma vez por processo)"""
+    global _instalado
+    if _instalado:
+        return
+    _instalado = True
+    # Conexões abertas depois (novas threads, reconexões) e as que já existem nesta thread
+    connection_created.connect(_ao_conectar, weak=False, dispatch_uid='instrumentacao')
+    instalar_nas_conexoes_da_thread()
+    Template.render = _medir_render(Template.render)
+
+
+def percentil(tempos, p):
+    """Percentil 'p' (0-100) de uma lista de tempos, pelo método do vizinho mais próximo"""
+    ordenados = sorted(tempos)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def registrar(request, response, medicao):
+    """
+    Uma linha de log (JSON) por requisição. Acima de INSTRUMENTACAO_ORCAMENTO_MS
+    sai como WARNING e com todo o SQL guardado, na ordem em que rodou.
+    """
+    total = medicao.total_ms()
+    orcamento = getattr(settings, 'INSTRUMENTACAO_ORCAMENTO_MS', None)
+    estourou = orcamento is not None and total > orcamento
+    usuario = getattr(request, 'user', None)
+
+    dados = {
+        'metodo': request.method,
+        'caminho': request.path,
+        'status': response.status_code,
+        'empresa': usuario.empresa_id if usuario is not None and usuario.is_authenticated else None,
+        'total_ms': round(total, 1),
+        'consultas': medicao.consultas,
+        'banco_ms': round(medicao.banco * 1000, 1),
+        'template_ms': round(medicao.template * 1000, 1),
+        'mais_lentas': medicao.mais_lentas(getattr(settings, 'INSTRUMENTACAO_MAIS_LENTAS', 5)),
+        'repetidas': medicao.repetidas(3),
+    }
+    if estourou:
+        dados['orcamento_ms'] = orcamento
+        dados['sql'] = [{'ms': round(segundos * 1000, 2), 'sql': sql} for segundos, sql in medicao.sql]
+
+    logger.log(
+        logging.WARNING if estourou else logging.INFO,
+        json.dumps(dados, ensure_ascii=False), extra={'instrumentacao': dados},
+    )
+    return dados
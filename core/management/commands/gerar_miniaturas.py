@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from cadastros.models import Cadastro
+from core.imagens import campo_marcador, nome_miniatura
+from core.models import Empresa
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera as miniaturas WebP das imagens já enviadas (foto do cadastro, logo e banner da empresa) "
+        "e marca os registros. Imagens que já têm as miniaturas no storage só são marcadas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--refazer', action='store_true', help="Regrava também as miniaturas que já existem")
+
+    def handle(self, *args, **options):
+        geradas = puladas = falhas = 0
+
+        for model in (Empresa, Cadastro):
+            for campo, tamanhos in model.MINIATURAS.items():
+                registros = model.objects.exclude(**{campo: ''}).exclude(**{campo: None})
+                if not options['refazer']:
+                    registros = registros.filter(**{campo_marcador(campo): False})
+                for registro in registros.only('id', campo).iterator(chunk_size=500):
+                    arquivo = getattr(registro, campo)
+                    if not options['refazer'] and all(
+                        arquivo.storage.exists(nome_miniatura(arquivo.name, tamanho)) for tamanho in tamanhos
+                    ):
+                        registro.marcar_miniaturas(campo)
+                        puladas += 1
+                    elif registro.atualizar_miniaturas(campo):
+                        geradas += 1
+                    else:
+                        falhas += 1
+                        self.stdout.write(self.style.WARNING(f"{model._meta.label} {registro.id} ({arquivo.name}): falha ao gerar (ver o log)"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{geradas} imagens processadas, {puladas} já tinham miniaturas, {falhas} com erro."
+        ))
@@ -0,0 +1,59 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import fila
+
+
+def executar_e_fechar(tarefa):
+    try:
+        return fila.executar(tarefa)
+    finally:
+        # Cada thread tem a sua conexão: mesmo cuidado do fim de uma requisição
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = "Worker da fila de tarefas em segundo plano (relatórios pesados). Rode junto com o servidor."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=2, help="Tarefas executando ao mesmo tempo (padrão: 2)")
+        parser.add_argument('--intervalo', type=float, default=2, help="Segundos entre consultas à fila vazia")
+        parser.add_argument('--uma-vez', action='store_true', help="Processa o que estiver na fila e termina")
+
+    def handle(self, *args, **options):
+        limite = options['threads']
+        ultima_manutencao = 0
+        em_execucao = set()
+
+        self.stdout.write(f"Processando a fila com {limite} threads (Ctrl+C para parar)...")
+        with ThreadPoolExecutor(max_workers=limite, thread_name_prefix='tarefa') as pool:
+            try:
+                while True:
+                    if time.monotonic() - ultima_manutencao > 60:
+                        recuperadas, apagadas = fila.manutencao()
+                        if recuperadas or apagadas:
+                            self.stdout.write(f"Manutenção: {recuperadas} tarefas devolvidas à fila, {apagadas} expiradas apagadas.")
+                        ultima_manutencao = time.monotonic()
+
+                    # Só reserva quando há thread livre: o que fica na fila pode ir para outro worker
+                    tarefa = fila.reservar_proxima() if len(em_execucao) < limite else None
+                    if tarefa:
+                        self.stdout.write(f"Tarefa {tarefa.id}: {tarefa.descricao} (tentativa {tarefa.tentativas})")
+                        em_execucao.add(pool.submit(executar_e_fechar, tarefa))
+                        continue
+
+                    if options['uma_vez'] and not em_execucao:
+                        break
+                    if em_execucao:
+                        prontas, _ = wait(em_execucao, timeout=options['intervalo'], return_when=FIRST_COMPLETED)
+                        em_execucao -= prontas
+                    else:
+                        close_old_connections()
+                        time.sleep(options['intervalo'])
+            except KeyboardInterrupt:
+                self.stdout.write("Encerrando: aguardando as tarefas em execução...")
+
+        self.stdout.write(self.style.SUCCESS("Worker encerrado."))
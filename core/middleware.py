@@ -0,0 +1,132 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import NoReverseMatch, reverse
+
+from . import instrumentacao
+from .empresa_atual import definir_empresa, restaurar_empresa
+
+
+class EmpresaMiddleware:
+    """
+    Define a empresa do usuário logado como empresa atual da requisição.
+    Deve vir depois do AuthenticationMiddleware. O usuário já vem com a
+    empresa na mesma consulta (ver core.backends), então isso não custa query extra.
+
+    O admin fica de fora: lá a equipe vê e corrige os dados de todas as empresas,
+    mesmo que o usuário da equipe tenha uma empresa.
+
+    Funciona nos dois modos: sob ASGI não força a troca para uma thread síncrona.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._prefixo_admin = None
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def eh_admin(self, request):
+        # Resolvido na primeira requisição: no __init__ as URLs podem ainda não estar carregadas
+        if self._prefixo_admin is None:
+            try:
+                self._prefixo_admin = reverse('admin:index')
+            except NoReverseMatch:
+                self._prefixo_admin = ''
+        return bool(self._prefixo_admin) and request.path.startswith(self._prefixo_admin)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        usuario = request.user
+        empresa_id = usuario.empresa_id if usuario.is_authenticated and not self.eh_admin(request) else None
+
+        token = definir_empresa(empresa_id)
+        try:
+            return self.get_response(request)
+        finally:
+            restaurar_empresa(token)
+
+    async def __acall__(self, request):
+        usuario = await request.auser()
+        # Já resolvido: views e templates assíncronos usam request.user sem ir ao banco
+        request.user = usuario
+        empresa_id = usuario.empresa_id if usuario.is_authenticated and not self.eh_admin(request) else None
+
+        token = definir_empresa(empresa_id)
+        try:
+            return await self.get_response(request)
+        finally:
+            restaurar_empresa(token)
+
+
+class InstrumentacaoMiddleware:
+    """
+    Mede cada requisição (consultas, tempo de banco e de template, consultas mais
+    lentas; ver core.instrumentacao) e devolve no cabeçalho Server-Timing e numa
+    linha de log. Só fica ativo com INSTRUMENTAR_REQUISICOES = True; desligado,
+    o Django o retira da pilha e não custa nada.
+
+    Deve ser o primeiro da lista, para a medição incluir a sessão e o usuário.
+    Em respostas streaming (exportações) o cabeçalho sai com o que foi medido até
+    ali e o log só depois do último pedaço do arquivo.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTAR_REQUISICOES', False):
+            raise MiddlewareNotUsed
+        instrumentacao.instalar()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        instrumentacao.instalar_nas_conexoes_da_thread()
+        medicao, token = instrumentacao.iniciar()
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentacao.encerrar(token)
+        return self.finalizar(request, response, medicao)
+
+    async def __acall__(self, request):
+        # As consultas das views assíncronas rodam na thread do sync_to_async
+        await sync_to_async(instrumentacao.instalar_nas_conexoes_da_thread)()
+        medicao, token = instrumentacao.iniciar()
+        try:
+            response = await self.get_response(request)
+        finally:
+            instrumentacao.encerrar(token)
+        return self.finalizar(request, response, medicao)
+
+    def finalizar(self, request, response, medicao):
+        response['Server-Timing'] = medicao.server_timing()
+        if response.streaming and not response.is_async:
+            response.streaming_content = self.medir_streaming(response.streaming_content, request, response, medicao)
+        else:
+            instrumentacao.registrar(request, response, medicao)
+        return response
+
+    @staticmethod
+    def medir_streaming(conteudo, request, response, medicao):
+        # O arquivo é gerado (e consultado) enquanto o servidor consome o iterador
+        partes = iter(conteudo)
+        try:
+            while True:
+                token = instrumentacao.iniciar_com(medicao)
+                try:
+                    parte = next(partes)
+                except StopIteration:
+                    return
+                finally:
+                    instrumentacao.encerrar(token)
+                yield parte
+        finally:
+            instrumentacao.registrar(request, response, medicao)
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_parametrosistema'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarefa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('descricao', models.CharField(max_length=255)),
+                ('caminho', models.CharField(help_text='URL da página a gerar', max_length=255)),
+                ('parametros', models.TextField(blank=True, help_text='Query string (filtros do relatório)')),
+                ('status', models.CharField(choices=[('PENDENTE', 'Na fila'), ('EXECUTANDO', 'Em execução'), ('CONCLUIDA', 'Concluída'), ('ERRO', 'Erro')], default='PENDENTE', max_length=10)),
+                ('tentativas', models.PositiveSmallIntegerField(default=0)),
+                ('executar_apos', models.DateTimeField(help_text='Nova tentativa só depois deste horário')),
+                ('iniciada_em', models.DateTimeField(blank=True, null=True)),
+                ('concluida_em', models.DateTimeField(blank=True, null=True)),
+                ('expira_em', models.DateTimeField(blank=True, help_text='O resultado é apagado depois disso', null=True)),
+                ('erro', models.TextField(blank=True)),
+                ('resultado', models.TextField(blank=True)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('criada_em', models.DateTimeField(auto_now_add=True)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.empresa', verbose_name='Empresa')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tarefa em segundo plano',
+                'verbose_name_plural': 'Tarefas em segundo plano',
+                'indexes': [models.Index(fields=['status', 'executar_apos'], name='tarefa_status_exec_idx'), models.Index(fields=['status', 'expira_em'], name='tarefa_status_expira_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_tarefa'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='parametrosistema',
+            name='chave',
+            field=models.CharField(choices=[('CAIXA_PADRAO_ID', 'Financeiro - ID do Caixa Padrão'), ('TAXA_JUROS_MENSAL', 'Financeiro - Taxa de Juros Mensal (%)'), ('PERCENTUAL_MULTA', 'Financeiro - Multa por Atraso (%)'), ('PLANO_CONTAS_MENSALIDADE_ID', 'Financeiro - ID Plano Contas (Mensalidade)'), ('PLANO_CONTAS_JUROS_ID', 'Financeiro - ID Plano Contas (Juros/Multa)')], max_length=100),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_parametrosistema_multa'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empresa',
+            name='banner_miniaturas',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='empresa',
+            name='logo_miniaturas',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
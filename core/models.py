@@ -1,13 +1,23 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
+from .empresa_atual import empresa_atual_id
+from .imagens import ComMiniaturas
 
 # 1. A Empresa (Quem contrata o SaaS)
-class Empresa(models.Model):
+class Empresa(ComMiniaturas, models.Model):
+    # Logo aparece pequena no topo e nos relatórios; o banner é fundo de tela
+    MINIATURAS = {'logo': (256,), 'banner': (1920,)}
+
     nome = models.CharField(max_length=255)
     cnpj = models.CharField(max_length=20, unique=True)
     ativo = models.BooleanField(default=True)
     logo = models.ImageField(upload_to='empresas/logos/', null=True, blank=True)
     banner = models.ImageField(upload_to='empresas/banners/', null=True, blank=True, help_text="Imagem de fundo da tela inicial")
+    # Miniaturas já geradas (ver core.imagens)
+    logo_miniaturas = models.BooleanField(default=False, editable=False)
+    banner_miniaturas = models.BooleanField(default=False, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
@@ -25,8 +35,28 @@ class Usuario(AbstractUser):
 # 3. Classe Abstrata para Models SaaS
 # TODAS as tabelas do sistema herdarão disso.
 # Isso garante que nada seja criado sem dono.
+class EmpresaQuerySet(models.QuerySet):
+    def da_empresa(self, empresa):
+        return self.filter(empresa=empresa)
+
+
+class EmpresaManager(models.Manager.from_queryset(EmpresaQuerySet)):
+    """
+    Filtra automaticamente pela empresa da requisição atual (ver core.middleware).
+    Sem empresa definida (admin, shell, comandos) devolve todos os registros.
+    """
+    def get_queryset(self):
+        qs = super().get_queryset()
+        empresa_id = empresa_atual_id()
+        if empresa_id is not None:
+            qs = qs.filter(empresa_id=empresa_id)
+        return qs
+
+
 class ModeloSaaS(models.Model):
     empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, verbose_name="Empresa")
+
+    objects = EmpresaManager()
     
     class Meta:
         abstract = True  # Isso diz ao Django: "Não crie uma tabela 'ModeloSaaS', use isso como modelo para outras"
@@ -41,10 +71,20 @@ class ParametroSistema(ModeloSaaS):
     CHAVES_CHOICES = [
         ('CAIXA_PADRAO_ID', 'Financeiro - ID do Caixa Padrão'),
         ('TAXA_JUROS_MENSAL', 'Financeiro - Taxa de Juros Mensal (%)'),
+        ('PERCENTUAL_MULTA', 'Financeiro - Multa por Atraso (%)'),
         ('PLANO_CONTAS_MENSALIDADE_ID', 'Financeiro - ID Plano Contas (Mensalidade)'),
         ('PLANO_CONTAS_JUROS_ID', 'Financeiro - ID Plano Contas (Juros/Multa)'),
     ]
 
+    # Tipo de cada valor na leitura via core.parametros
+    TIPOS = {
+        'CAIXA_PADRAO_ID': int,
+        'TAXA_JUROS_MENSAL': Decimal,
+        'PERCENTUAL_MULTA': Decimal,
+        'PLANO_CONTAS_MENSALIDADE_ID': int,
+        'PLANO_CONTAS_JUROS_ID': int,
+    }
+
     chave = models.CharField(max_length=100, choices=CHAVES_CHOICES)
     valor = models.CharField(max_length=255, help_text="Digite o ID ou o Valor correspondente")
     descricao = models.TextField(blank=True, verbose_name="Descrição / Notas")
@@ -52,10 +92,67 @@ class ParametroSistema(ModeloSaaS):
     def __str__(self):
         return f"{self.get_chave_display()}: {self.valor}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.invalidar_cache(self.empresa_id)
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        self.invalidar_cache(self.empresa_id)
+        return resultado
+
+    @staticmethod
+    def invalidar_cache(empresa_id):
+        """Descarta os parâmetros guardados em cache (depois do commit da transação)"""
+        from .parametros import invalidar_parametros
+        transaction.on_commit(lambda: invalidar_parametros(empresa_id))
+
     class Meta:
         verbose_name = "Parâmetro do Sistema"
         verbose_name_plural = "Parâmetros do Sistema"
         # Garante que uma empresa não tenha duas configurações para a mesma chave
         unique_together = ['empresa', 'chave']
 
-        
\ No newline at end of file
+        
+
+
+class Tarefa(ModeloSaaS):
+    """
+    Fila de tarefas em segundo plano, gravada no banco (ver core/fila.py).
+    Hoje usada para relatórios pesados: guarda a página pedida e, ao final, o HTML gerado.
+    """
+    STATUS_CHOICES = [
+        ('PENDENTE', 'Na fila'),
+        ('EXECUTANDO', 'Em execução'),
+        ('CONCLUIDA', 'Concluída'),
+        ('ERRO', 'Erro'),
+    ]
+
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE)
+    descricao = models.CharField(max_length=255)
+    caminho = models.CharField(max_length=255, help_text="URL da página a gerar")
+    parametros = models.TextField(blank=True, help_text="Query string (filtros do relatório)")
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDENTE')
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    executar_apos = models.DateTimeField(help_text="Nova tentativa só depois deste horário")
+    iniciada_em = models.DateTimeField(null=True, blank=True)
+    concluida_em = models.DateTimeField(null=True, blank=True)
+    expira_em = models.DateTimeField(null=True, blank=True, help_text="O resultado é apagado depois disso")
+    erro = models.TextField(blank=True)
+
+    resultado = models.TextField(blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    criada_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Tarefa em segundo plano"
+        verbose_name_plural = "Tarefas em segundo plano"
+        indexes = [
+            # O worker procura por status + horário, de todas as empresas
+            models.Index(fields=['status', 'executar_apos'], name='tarefa_status_exec_idx'),
+            models.Index(fields=['status', 'expira_em'], name='tarefa_status_expira_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.descricao} ({self.get_status_display()})"
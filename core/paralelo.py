@@ -0,0 +1,63 @@
+"""
+Consultas independentes em paralelo para views assíncronas.
+
+O ORM assíncrono do Django (aget, aaggregate, async for...) ainda executa
+cada consulta pelo sync_to_async "thread_sensitive": todas passam pela mesma
+thread e pela mesma conexão, uma depois da outra. Um asyncio.gather sobre
+elas não ganha nada.
+
+Aqui cada grupo de consultas roda numa thread de um pool limitado, com a sua
+própria conexão (as conexões do Django são por thread). Essas conexões ficam
+abertas entre as requisições; o tamanho do pool (CONSULTAS_PARALELAS_MAX)
+é o número máximo de conexões extras por processo.
+
+Uma conexão nova não enxerga o que a transação da requisição ainda não
+gravou. Por isso, dentro de uma transação (ATOMIC_REQUESTS, testes) os
+grupos rodam em sequência na conexão da requisição.
+"""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+
+_pool = None
+
+
+def _executor():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'CONSULTAS_PARALELAS_MAX', 4),
+            thread_name_prefix='consultas',
+        )
+    return _pool
+
+
+def _em_conexao_da_thread(funcao):
+    # A conexão da thread do pool fica aberta de uma requisição para outra (abrir
+    # uma por grupo custaria mais que a própria consulta); só é trocada se caiu
+    if connection.connection is not None and not connection.is_usable():
+        connection.close()
+    return funcao()
+
+
+def _em_transacao():
+    return connection.in_atomic_block
+
+
+async def em_paralelo(*funcoes):
+    """
+    Executa funções síncronas (sem argumentos) que consultam o banco e devolve
+    os resultados na mesma ordem. A empresa atual (ContextVar) vale em todas.
+    """
+    if not getattr(settings, 'CONSULTAS_PARALELAS', True) or await sync_to_async(_em_transacao)():
+        return [await sync_to_async(funcao)() for funcao in funcoes]
+
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(*(
+        loop.run_in_executor(_executor(), contextvars.copy_context().run, _em_conexao_da_thread, funcao)
+        for funcao in funcoes
+    ))
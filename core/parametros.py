@@ -0,0 +1,66 @@
+"""
+Leitura dos Parâmetros do Sistema já convertidos (IDs como int, taxas como Decimal).
+
+Todos os parâmetros de uma empresa vêm numa única consulta e ficam guardados em
+dois níveis: na memória do processo (por PARAMETROS_TTL_LOCAL segundos) e no cache
+compartilhado (até alguém salvar um parâmetro). Ler um parâmetro numa view não
+vai ao banco.
+"""
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+
+from .models import ParametroSistema
+
+# Quanto tempo cada processo confia na sua cópia antes de reler o cache compartilhado
+PARAMETROS_TTL_LOCAL = 30
+
+_locais = {}
+
+
+def _chave_cache(empresa_id):
+    return f"parametros:{empresa_id}"
+
+
+def _converter(chave, valor):
+    tipo = ParametroSistema.TIPOS.get(chave, str)
+    valor = (valor or '').strip()
+    if tipo is int:
+        # '0' ou vazio = não configurado
+        return int(valor) if valor.isdigit() and int(valor) > 0 else None
+    if tipo is Decimal:
+        try:
+            return Decimal(valor.replace(',', '.'))
+        except InvalidOperation:
+            return Decimal('0')
+    return valor
+
+
+def parametros_da_empresa(empresa):
+    """Dicionário {chave: valor convertido} com todos os parâmetros da empresa"""
+    empresa_id = getattr(empresa, 'pk', empresa)
+
+    local = _locais.get(empresa_id)
+    if local and local[0] > time.monotonic():
+        return local[1]
+
+    valores = cache.get(_chave_cache(empresa_id))
+    if valores is None:
+        registros = ParametroSistema.objects.filter(empresa_id=empresa_id).values_list('chave', 'valor')
+        valores = {chave: _converter(chave, valor) for chave, valor in registros}
+        cache.set(_chave_cache(empresa_id), valores, timeout=None)
+
+    _locais[empresa_id] = (time.monotonic() + PARAMETROS_TTL_LOCAL, valores)
+    return valores
+
+
+def parametro(empresa, chave, padrao=None):
+    """Valor convertido de um parâmetro (ou `padrao` se não existir / não configurado)"""
+    valor = parametros_da_empresa(empresa).get(chave)
+    return padrao if valor is None else valor
+
+
+def invalidar_parametros(empresa_id):
+    _locais.pop(empresa_id, None)
+    cache.delete(_chave_cache(empresa_id))
@@ -32,6 +32,8 @@ DEBUG = True
 ALLOWED_HOSTS = []
 
 AUTH_USER_MODEL = 'core.Usuario'
+# Carrega o usuário já com a empresa (uma consulta por requisição)
+AUTHENTICATION_BACKENDS = ['core.backends.UsuarioComEmpresaBackend']
 
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'  # Ao logar, vai para a Home (que mostra o banner da empresa)
@@ -55,11 +57,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentacaoMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.EmpresaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -85,6 +89,35 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+ASGI_APPLICATION = 'core.asgi.application'
+
+# Views assíncronas (dashboard_async, relatorio_*_async): grupos de consultas em paralelo,
+# cada um numa thread com a sua conexão (ver core/paralelo.py). O MAX é o limite de
+# conexões extras por processo.
+CONSULTAS_PARALELAS = True
+CONSULTAS_PARALELAS_MAX = 4
+
+# Relatórios de fluxo e DRE sintético com período maior que isso (em dias) vão para a
+# fila em segundo plano (core/fila.py, comando processar_tarefas). None: sempre na hora.
+RELATORIO_DIAS_SINCRONO = 92
+
+# Medição por requisição (core/instrumentacao.py): nº de consultas, tempo de banco e de
+# template no cabeçalho Server-Timing e uma linha JSON no log 'core.instrumentacao'.
+# Requisições acima do orçamento (ms) saem como WARNING, com todo o SQL (sem os parâmetros).
+INSTRUMENTAR_REQUISICOES = False
+INSTRUMENTACAO_ORCAMENTO_MS = 500
+INSTRUMENTACAO_MAIS_LENTAS = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.instrumentacao': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -103,6 +136,27 @@ DATABASES = {
     }
 }
 
+# Cache
+# O cache de relatórios usa o alias 'relatorios'. Em produção com vários
+# processos, troque o BACKEND por Redis/Memcached (ex.: django.core.cache.backends.redis.RedisCache).
+# LocMemCache descarta as entradas menos usadas (LRU) ao passar de MAX_ENTRIES
+# e expira cada entrada após TIMEOUT segundos.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'efinanceiro-default',
+    },
+    'relatorios': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'efinanceiro-relatorios',
+        'TIMEOUT': 60 * 30,
+        'OPTIONS': {
+            'MAX_ENTRIES': 500,
+            'CULL_FREQUENCY': 4,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
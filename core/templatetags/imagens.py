@@ -0,0 +1,11 @@
+from django import template
+
+from core.imagens import url_miniatura
+
+register = template.Library()
+
+
+@register.filter
+def miniatura(arquivo, tamanho):
+    """{{ cadastro.foto|miniatura:64 }} -> URL da versão WebP reduzida (ou do original)"""
+    return url_miniatura(arquivo, int(tamanho))
@@ -0,0 +1,359 @@
+import json
+import shutil
+import threading
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from cadastros.models import Cadastro
+from . import fila
+from .empresa_atual import empresa_atual_id, usar_empresa
+from .imagens import nome_miniatura
+from .paralelo import em_paralelo
+from .middleware import EmpresaMiddleware, InstrumentacaoMiddleware
+from .models import Empresa, ParametroSistema, Tarefa, Usuario
+from .parametros import invalidar_parametros, parametro
+
+
+class EmpresaAtualTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa_a = Empresa.objects.create(nome="A", cnpj="A")
+        cls.empresa_b = Empresa.objects.create(nome="B", cnpj="B")
+        Cadastro.objects.create(empresa=cls.empresa_a, nome="Cliente A", cpf_cnpj="1")
+        Cadastro.objects.create(empresa=cls.empresa_b, nome="Cliente B", cpf_cnpj="2")
+        cls.usuario = Usuario.objects.create_user('a', password='x', empresa=cls.empresa_a)
+
+    def test_manager_filtra_pela_empresa_atual(self):
+        self.assertEqual(Cadastro.objects.count(), 2)
+        with usar_empresa(self.empresa_a):
+            self.assertEqual(list(Cadastro.objects.values_list('nome', flat=True)), ["Cliente A"])
+            self.assertFalse(Cadastro.objects.filter(nome="Cliente B").exists())
+        self.assertIsNone(empresa_atual_id())
+
+    def test_middleware_define_e_restaura_a_empresa(self):
+        vista = []
+        middleware = EmpresaMiddleware(lambda request: vista.append(empresa_atual_id()) or HttpResponse())
+        request = RequestFactory().get('/')
+        request.user = self.usuario
+
+        middleware(request)
+
+        self.assertEqual(vista, [self.empresa_a.id])
+        self.assertIsNone(empresa_atual_id())
+
+    def test_admin_nao_filtra_pela_empresa(self):
+        self.usuario.is_staff = self.usuario.is_superuser = True
+        self.usuario.save()
+        self.client.force_login(self.usuario)
+
+        response = self.client.get('/admin/cadastros/cadastro/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Cliente A")
+        self.assertContains(response, "Cliente B")
+
+    def test_usuario_vem_com_a_empresa(self):
+        self.client.force_login(self.usuario)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get('/cadastros/clientes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len([q for q in consultas if 'core_empresa' in q['sql'] and 'core_usuario' not in q['sql']]), 0)
+        self.assertContains(response, "Cliente A")
+        self.assertNotContains(response, "Cliente B")
+
+
+class ParametrosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        ParametroSistema.objects.create(empresa=cls.empresa, chave='CAIXA_PADRAO_ID', valor='7')
+        ParametroSistema.objects.create(empresa=cls.empresa, chave='TAXA_JUROS_MENSAL', valor='2,5')
+        ParametroSistema.objects.create(empresa=cls.empresa, chave='PLANO_CONTAS_JUROS_ID', valor='0')
+        cls.usuario = Usuario.objects.create_user('a', password='x', empresa=cls.empresa)
+
+    def setUp(self):
+        invalidar_parametros(self.empresa.id)
+
+    def test_valores_convertidos(self):
+        self.assertEqual(parametro(self.empresa, 'CAIXA_PADRAO_ID'), 7)
+        self.assertEqual(parametro(self.empresa, 'TAXA_JUROS_MENSAL'), Decimal('2.5'))
+        # '0' = não configurado
+        self.assertIsNone(parametro(self.empresa, 'PLANO_CONTAS_JUROS_ID'))
+        self.assertEqual(parametro(self.empresa, 'PLANO_CONTAS_MENSALIDADE_ID', padrao=1), 1)
+
+    def test_uma_consulta_por_empresa(self):
+        with self.assertNumQueries(1):
+            parametro(self.empresa, 'CAIXA_PADRAO_ID')
+            parametro(self.empresa, 'TAXA_JUROS_MENSAL')
+        with self.assertNumQueries(0):
+            parametro(self.empresa.id, 'CAIXA_PADRAO_ID')
+
+    def test_salvar_invalida_o_cache(self):
+        self.assertEqual(parametro(self.empresa, 'CAIXA_PADRAO_ID'), 7)
+        p = ParametroSistema.objects.get(empresa=self.empresa, chave='CAIXA_PADRAO_ID')
+        p.valor = '9'
+        with self.captureOnCommitCallbacks(execute=True):
+            p.save()
+        self.assertEqual(parametro(self.empresa, 'CAIXA_PADRAO_ID'), 9)
+
+    def test_configuracoes_cria_os_que_faltam(self):
+        self.client.force_login(self.usuario)
+        self.client.get('/configuracoes/')
+        self.assertEqual(ParametroSistema.objects.filter(empresa=self.empresa).count(), len(ParametroSistema.CHAVES_CHOICES))
+        # Com todos criados, a tela só lê a lista
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get('/configuracoes/')
+        self.assertEqual(len([q for q in consultas if 'core_parametrosistema' in q['sql']]), 1)
+
+
+class MiniaturasTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        configuracao = override_settings(MEDIA_ROOT=self.media)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.empresa = Empresa.objects.create(nome="A", cnpj="A")
+
+    def imagem(self, largura=1200, altura=800):
+        conteudo = BytesIO()
+        Image.new('RGB', (largura, altura), 'red').save(conteudo, 'JPEG')
+        return SimpleUploadedFile("foto.jpg", conteudo.getvalue(), content_type='image/jpeg')
+
+    def test_upload_gera_versoes_reduzidas(self):
+        cadastro = Cadastro.objects.create(empresa=self.empresa, nome="Com foto", cpf_cnpj="1", foto=self.imagem())
+
+        for tamanho, esperado in ((64, (64, 43)), (256, (256, 171))):
+            with cadastro.foto.storage.open(nome_miniatura(cadastro.foto.name, tamanho)) as arquivo:
+                miniatura = Image.open(arquivo)
+                self.assertEqual((miniatura.format, miniatura.size), ('WEBP', esperado))
+
+        html = Template("{% load imagens %}{{ c.foto|miniatura:64 }}").render(Context({'c': cadastro}))
+        self.assertTrue(html.endswith("/miniaturas/" + cadastro.foto.name.split('/')[-1].rsplit('.', 1)[0] + "_64.webp"))
+
+        # Salvar de novo sem trocar a foto não reprocessa
+        cadastro.foto.storage.delete(nome_miniatura(cadastro.foto.name, 64))
+        cadastro.nome = "Outro nome"
+        cadastro.save()
+        self.assertFalse(cadastro.foto.storage.exists(nome_miniatura(cadastro.foto.name, 64)))
+
+    def test_sem_miniatura_usa_original_e_backfill_gera(self):
+        self.empresa.logo = self.imagem()
+        self.empresa.save()
+        # Imagem enviada antes das miniaturas existirem
+        self.empresa.logo.storage.delete(nome_miniatura(self.empresa.logo.name, 256))
+        Empresa.objects.filter(pk=self.empresa.pk).update(logo_miniaturas=False)
+        self.empresa.refresh_from_db()
+
+        template = Template("{% load imagens %}{{ e.logo|miniatura:256 }}")
+        self.assertEqual(template.render(Context({'e': self.empresa})), self.empresa.logo.url)
+
+        call_command('gerar_miniaturas', stdout=StringIO())
+        self.empresa.refresh_from_db()
+        self.assertTrue(self.empresa.logo_miniaturas)
+        self.assertTrue(template.render(Context({'e': self.empresa})).endswith("_256.webp"))
+
+    def test_url_nao_consulta_o_storage(self):
+        cadastro = Cadastro.objects.create(empresa=self.empresa, nome="Com foto", cpf_cnpj="1", foto=self.imagem())
+        template = Template("{% load imagens %}{{ c.foto|miniatura:64 }}")
+
+        with mock.patch.object(FileSystemStorage, 'exists', side_effect=AssertionError("stat no render")):
+            self.assertTrue(template.render(Context({'c': Cadastro.objects.get(pk=cadastro.pk)})).endswith("_64.webp"))
+
+    def test_trocar_ou_remover_a_foto_apaga_as_miniaturas_antigas(self):
+        cadastro = Cadastro.objects.create(empresa=self.empresa, nome="Com foto", cpf_cnpj="1", foto=self.imagem())
+        cadastro = Cadastro.objects.get(pk=cadastro.pk)
+        storage, primeira = cadastro.foto.storage, cadastro.foto.name
+
+        cadastro.foto = self.imagem(600, 600)
+        cadastro.save()
+        self.assertNotEqual(cadastro.foto.name, primeira)
+        for tamanho in (64, 256):
+            self.assertFalse(storage.exists(nome_miniatura(primeira, tamanho)))
+            self.assertTrue(storage.exists(nome_miniatura(cadastro.foto.name, tamanho)))
+
+        segunda = cadastro.foto.name
+        cadastro.foto = None
+        cadastro.save()
+        self.assertFalse(storage.exists(nome_miniatura(segunda, 64)))
+        self.assertFalse(Cadastro.objects.get(pk=cadastro.pk).foto_miniaturas)
+
+
+class EmParaleloTests(TransactionTestCase):
+    def setUp(self):
+        self.empresa_a = Empresa.objects.create(nome="A", cnpj="A")
+        self.empresa_b = Empresa.objects.create(nome="B", cnpj="B")
+        Cadastro.objects.create(empresa=self.empresa_a, nome="Cliente A", cpf_cnpj="1")
+        Cadastro.objects.create(empresa=self.empresa_b, nome="Cliente B", cpf_cnpj="2")
+
+    async def test_grupos_em_outras_threads_com_a_empresa_atual(self):
+        def consulta():
+            return threading.current_thread().name, list(Cadastro.objects.values_list('nome', flat=True))
+
+        with usar_empresa(self.empresa_a):
+            resultados = await em_paralelo(consulta, consulta)
+
+        for thread, nomes in resultados:
+            self.assertTrue(thread.startswith('consultas'))
+            self.assertEqual(nomes, ["Cliente A"])
+
+
+@override_settings(RELATORIO_DIAS_SINCRONO=92)
+class FilaTarefasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        cls.usuario = Usuario.objects.create_user('a', password='x', empresa=cls.empresa)
+        cls.outro = Usuario.objects.create_user('b', password='x', empresa=cls.empresa)
+
+    def setUp(self):
+        caches['relatorios'].clear()
+        self.client.force_login(self.usuario)
+
+    def test_relatorio_longo_vai_para_a_fila(self):
+        url = '/financeiro/relatorios/dre/sintetico/?data_inicio=2024-01-01&data_fim=2024-12-31'
+        response = self.client.get(url)
+        tarefa = Tarefa.objects.get()
+        self.assertRedirects(response, f'/tarefas/{tarefa.id}/')
+        # Pedir de novo enquanto está na fila não duplica
+        self.client.get(url)
+        self.assertEqual(Tarefa.objects.count(), 1)
+        self.assertEqual(self.client.get(f'/tarefas/{tarefa.id}/status/').json()['status'], 'PENDENTE')
+
+        self.assertTrue(fila.executar(fila.reservar_proxima()))
+        self.assertIsNone(fila.reservar_proxima())
+
+        status = self.client.get(f'/tarefas/{tarefa.id}/status/').json()
+        self.assertEqual(status['resultado'], f'/tarefas/{tarefa.id}/resultado/')
+        self.assertContains(self.client.get(status['resultado']), "DRE - Visão Sintética")
+        # O worker deixou o relatório no cache: agora sai na hora
+        self.assertContains(self.client.get(url), "DRE - Visão Sintética")
+        # Só quem pediu vê a tarefa
+        self.client.force_login(self.outro)
+        self.assertEqual(self.client.get(f'/tarefas/{tarefa.id}/status/').status_code, 404)
+
+    def test_periodo_curto_sai_na_hora(self):
+        response = self.client.get('/financeiro/relatorios/dre/sintetico/?data_inicio=2024-01-01&data_fim=2024-02-01')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Tarefa.objects.exists())
+
+    def test_falha_tenta_de_novo_e_depois_desiste(self):
+        tarefa = Tarefa.objects.create(
+            empresa=self.empresa, usuario=self.usuario, descricao="Grupo inexistente",
+            caminho='/financeiro/relatorios/dre/sintetico/', parametros='grupo=999999',
+            executar_apos=timezone.now(),
+        )
+        with self.assertLogs('core.fila', 'ERROR'):
+            self.assertFalse(fila.executar(fila.reservar_proxima()))
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.status, tarefa.tentativas), ('PENDENTE', 1))
+        self.assertGreater(tarefa.executar_apos, timezone.now())
+        self.assertIsNone(fila.reservar_proxima())
+
+        for _ in range(fila.TENTATIVAS - 1):
+            Tarefa.objects.filter(id=tarefa.id).update(executar_apos=timezone.now())
+            with self.assertLogs('core.fila', 'ERROR'):
+                fila.executar(fila.reservar_proxima())
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.status, tarefa.tentativas), ('ERRO', fila.TENTATIVAS))
+        self.assertIn("Http404", tarefa.erro)
+
+    def test_manutencao(self):
+        agora = timezone.now()
+        comum = dict(empresa=self.empresa, usuario=self.usuario, descricao="x", caminho='/', executar_apos=agora)
+        travada = Tarefa.objects.create(status='EXECUTANDO', tentativas=1, iniciada_em=agora - fila.TEMPO_MAXIMO * 2, **comum)
+        expirada = Tarefa.objects.create(status='CONCLUIDA', expira_em=agora - timedelta(minutes=1), **comum)
+        valida = Tarefa.objects.create(status='CONCLUIDA', expira_em=agora + timedelta(hours=1), **comum)
+
+        self.assertEqual(fila.manutencao(), (1, 1))
+        travada.refresh_from_db()
+        self.assertEqual(travada.status, 'PENDENTE')
+        self.assertFalse(Tarefa.objects.filter(id=expirada.id).exists())
+        self.assertTrue(Tarefa.objects.filter(id=valida.id).exists())
+
+
+@override_settings(INSTRUMENTAR_REQUISICOES=True, INSTRUMENTACAO_ORCAMENTO_MS=None)
+class InstrumentacaoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        cls.usuario = Usuario.objects.create_user('a', password='x', empresa=cls.empresa)
+        for i in range(3):
+            Cadastro.objects.create(empresa=cls.empresa, nome=f"Cliente {i}", cpf_cnpj=f"529.982.247-2{i}")
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def get_medido(self, url, nivel='INFO'):
+        with self.assertLogs('core.instrumentacao', nivel) as logs, CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(len(logs.records), 1)
+        return response, json.loads(logs.records[0].getMessage()), len(consultas)
+
+    @override_settings(INSTRUMENTAR_REQUISICOES=False)
+    def test_desligado_por_padrao(self):
+        response = self.client.get('/cadastros/clientes/')
+        self.assertNotIn('Server-Timing', response)
+
+    def test_cabecalho_e_log_da_requisicao(self):
+        response, dados, consultas = self.get_medido('/cadastros/clientes/')
+
+        self.assertRegex(response['Server-Timing'], r'^sql;dur=[\d.]+;desc="\d+ consultas", sqlmax;dur=[\d.]+;.*tpl;dur=[\d.]+;.*total;dur=[\d.]+$')
+        self.assertEqual(dados['consultas'], consultas)
+        self.assertEqual((dados['caminho'], dados['status'], dados['empresa']), ('/cadastros/clientes/', 200, self.empresa.id))
+        self.assertGreater(dados['template_ms'], 0)
+        self.assertLessEqual(len(dados['mais_lentas']), 5)
+        self.assertNotIn('sql', dados)
+
+    @override_settings(INSTRUMENTACAO_ORCAMENTO_MS=0)
+    def test_acima_do_orcamento_loga_o_sql_sem_parametros(self):
+        _, dados, consultas = self.get_medido('/cadastros/clientes/?q=52998224720', nivel='WARNING')
+
+        self.assertEqual(dados['orcamento_ms'], 0)
+        self.assertEqual(len(dados['sql']), consultas)
+        self.assertNotIn('52998224720', json.dumps(dados))
+
+    def test_repetidas_apontam_n_mais_1(self):
+        def view(request):
+            for cadastro in Cadastro.objects.all():
+                Cadastro.objects.filter(id=cadastro.id).exists()
+            return HttpResponse()
+
+        middleware = InstrumentacaoMiddleware(view)
+        request = RequestFactory().get('/')
+        request.user = self.usuario
+        with self.assertLogs('core.instrumentacao', 'INFO') as logs:
+            middleware(request)
+
+        repetidas = json.loads(logs.records[0].getMessage())['repetidas']
+        self.assertEqual(repetidas[0]['vezes'], 3)
+        self.assertIn('cadastros_cadastro', repetidas[0]['sql'].lower())
+
+    def test_exportacao_streaming_medida_ate_o_fim(self):
+        _, dados, consultas = self.get_medido('/financeiro/contas/relatorio/exportar/')
+        self.assertEqual(dados['consultas'], consultas)
+
+    async def test_view_assincrona(self):
+        await self.async_client.aforce_login(self.usuario)
+        with self.assertLogs('core.instrumentacao', 'INFO') as logs:
+            response = await self.async_client.get('/dashboard/async/')
+
+        self.assertIn('Server-Timing', response)
+        self.assertGreater(json.loads(logs.records[0].getMessage())['consultas'], 0)
@@ -17,6 +17,11 @@ urlpatterns = [
     path('configuracoes/', views.configuracoes_sistema, name='configuracoes'),
     path('configuracoes/editar/<int:id>/', views.editar_parametro, name='editar_parametro'),
 
+    # Tarefas em segundo plano (relatórios pesados)
+    path('tarefas/<int:id>/', views.tarefa, name='tarefa'),
+    path('tarefas/<int:id>/status/', views.tarefa_status, name='tarefa_status'),
+    path('tarefas/<int:id>/resultado/', views.tarefa_resultado, name='tarefa_resultado'),
+
 ]
 
 # Configuração para servir Arquivos em modo DEBUG
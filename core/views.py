@@ -1,7 +1,9 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import ParametroSistema
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from .models import ParametroSistema, Tarefa
 from .forms import ParametroForm
 
 @login_required
@@ -9,22 +11,19 @@ def configuracoes_sistema(request):
     empresa = request.user.empresa
     
     # 1. Garante que os parâmetros padrão existam para esta empresa
-    parametros_padrao = [
-        'CAIXA_PADRAO_ID', 
-        'TAXA_JUROS_MENSAL', 
-        'PLANO_CONTAS_MENSALIDADE_ID',
-        'PLANO_CONTAS_JUROS_ID'
+    # (uma leitura; só insere, de uma vez, as chaves que faltarem)
+    parametros = list(ParametroSistema.objects.filter(empresa=empresa))
+    existentes = {p.chave for p in parametros}
+    faltando = [
+        ParametroSistema(empresa=empresa, chave=chave, valor='0', descricao='Configuração automática')
+        for chave, _ in ParametroSistema.CHAVES_CHOICES if chave not in existentes
     ]
-    
-    for chave in parametros_padrao:
-        ParametroSistema.objects.get_or_create(
-            empresa=empresa, 
-            chave=chave,
-            defaults={'valor': '0', 'descricao': 'Configuração automática'}
-        )
-
-    # 2. Lista todos
-    parametros = ParametroSistema.objects.filter(empresa=empresa)
+
+    if faltando:
+        ParametroSistema.objects.bulk_create(faltando)
+        ParametroSistema.invalidar_cache(empresa.id)
+        # 2. Lista todos
+        parametros = list(ParametroSistema.objects.filter(empresa=empresa))
     
     return render(request, 'core/configuracoes.html', {'parametros': parametros})
 
@@ -42,3 +41,31 @@ def editar_parametro(request, id):
         form = ParametroForm(instance=parametro)
         
     return render(request, 'core/parametro_form.html', {'form': form, 'parametro': parametro})
+
+
+# ==================================================
+# TAREFAS EM SEGUNDO PLANO (relatórios pesados)
+# ==================================================
+
+def tarefa_do_usuario(request, id):
+    return get_object_or_404(Tarefa.objects.defer('resultado'), id=id, empresa=request.user.empresa, usuario=request.user)
+
+@login_required
+def tarefa(request, id):
+    """Página de espera: consulta o status a cada poucos segundos e abre o resultado"""
+    return render(request, 'core/tarefa.html', {'tarefa': tarefa_do_usuario(request, id)})
+
+@login_required
+def tarefa_status(request, id):
+    tarefa = tarefa_do_usuario(request, id)
+    return JsonResponse({
+        'status': tarefa.status,
+        'status_display': tarefa.get_status_display(),
+        'tentativas': tarefa.tentativas,
+        'resultado': reverse('tarefa_resultado', args=[tarefa.id]) if tarefa.status == 'CONCLUIDA' else None,
+    })
+
+@login_required
+def tarefa_resultado(request, id):
+    tarefa = get_object_or_404(Tarefa, id=id, empresa=request.user.empresa, usuario=request.user, status='CONCLUIDA')
+    return HttpResponse(tarefa.resultado, content_type=tarefa.content_type or 'text/html; charset=utf-8')
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class FinanceiroConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'financeiro'
+
+    def ready(self):
+        # Sinais que invalidam o cache de relatórios
+        from . import signals  # noqa: F401
@@ -0,0 +1,108 @@
+"""
+Cache dos relatórios financeiros.
+
+Cada empresa tem um número de versão dos seus dados. A chave do relatório
+inclui essa versão, então qualquer gravação que incremente a versão
+(ver signals.py) faz os relatórios antigos deixarem de ser encontrados;
+as entradas velhas somem pela expiração/LRU do backend.
+"""
+import hashlib
+import time
+from datetime import date
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import caches
+from django.http import HttpResponse
+
+ALIAS_CACHE = 'relatorios'
+
+
+def _cache():
+    return caches[ALIAS_CACHE]
+
+
+def _chave_versao(empresa_id):
+    return f"relatorios:versao:{empresa_id}"
+
+
+def versao_empresa(empresa_id):
+    """Versão atual dos dados da empresa (criada na primeira leitura)"""
+    cache = _cache()
+    chave = _chave_versao(empresa_id)
+    versao = cache.get(chave)
+    if versao is None:
+        # Começa pelo relógio: se a chave for descartada, a nova versão
+        # nunca coincide com uma versão antiga ainda guardada
+        cache.add(chave, time.time_ns(), timeout=None)
+        versao = cache.get(chave)
+    return versao
+
+
+def invalidar_empresa(empresa_id):
+    """Incrementa a versão: todos os relatórios da empresa ficam desatualizados"""
+    cache = _cache()
+    chave = _chave_versao(empresa_id)
+    try:
+        cache.incr(chave)
+    except ValueError:
+        cache.set(chave, time.time_ns(), timeout=None)
+
+
+def chave_relatorio(empresa_id, relatorio, params):
+    """Chave por (empresa, relatório, parâmetros GET normalizados, versão)"""
+    # Ordena e remove parâmetros vazios: ?a=1&b= e ?b=&a=1 viram a mesma chave
+    normalizados = sorted(
+        (nome, valor)
+        for nome in params
+        for valor in params.getlist(nome)
+        if valor not in ('', 'None')
+    )
+    # Os períodos padrão dependem do dia de hoje
+    bruto = repr((normalizados, date.today().isoformat()))
+    resumo = hashlib.md5(bruto.encode('utf-8')).hexdigest()
+    return f"relatorios:{empresa_id}:{relatorio}:{versao_empresa(empresa_id)}:{resumo}"
+
+
+def cache_relatorio(relatorio):
+    """
+    Decorator para views de relatório: guarda o HTML renderizado.
+    Só responde do cache em GET com status 200; deve vir depois do @login_required.
+    Aceita views síncronas e assíncronas (a versão ASGI usa a mesma entrada).
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapper_async(request, *args, **kwargs):
+                if request.method != 'GET':
+                    return await view(request, *args, **kwargs)
+
+                chave = await sync_to_async(chave_relatorio)(request.user.empresa_id, relatorio, request.GET)
+                guardado = await _cache().aget(chave)
+                if guardado is not None:
+                    conteudo, content_type = guardado
+                    return HttpResponse(conteudo, content_type=content_type)
+
+                response = await view(request, *args, **kwargs)
+                if response.status_code == 200 and not response.streaming:
+                    await _cache().aset(chave, (response.content, response['Content-Type']))
+                return response
+            return wrapper_async
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+
+            chave = chave_relatorio(request.user.empresa_id, relatorio, request.GET)
+            guardado = _cache().get(chave)
+            if guardado is not None:
+                conteudo, content_type = guardado
+                return HttpResponse(conteudo, content_type=content_type)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                _cache().set(chave, (response.content, response['Content-Type']))
+            return response
+        return wrapper
+    return decorator
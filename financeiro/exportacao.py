@@ -0,0 +1,98 @@
+"""
+Exportação de relatórios em CSV e XLSX sem carregar tudo na memória.
+As linhas são lidas do banco em lotes (keyset) e escritas aos poucos.
+"""
+import csv
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import Q
+from django.http import FileResponse, Http404, StreamingHttpResponse
+
+# Linhas buscadas do banco por vez
+TAMANHO_LOTE = 2000
+
+
+def em_lotes(queryset, campos, ordem, tamanho=TAMANHO_LOTE):
+    """
+    Linhas de queryset.values_list(*campos) na ordem (ordem, id), uma consulta por lote
+    ("as próximas N depois da última linha lida"). O queryset.iterator() não serve: o
+    mysqlclient traz o resultado inteiro para a memória antes de entregar a primeira linha.
+    """
+    base = queryset.order_by(ordem, 'id').values_list(ordem, 'id', *campos)
+    ultima = None
+    while True:
+        lote = base
+        if ultima:
+            valor, pk = ultima
+            lote = lote.filter(Q(**{f'{ordem}__gt': valor}) | Q(**{ordem: valor, 'id__gt': pk}))
+        linhas = list(lote[:tamanho])
+        for linha in linhas:
+            yield linha[2:]
+        if len(linhas) < tamanho:
+            return
+        ultima = linhas[-1][:2]
+
+
+class _Eco:
+    """Pseudo-arquivo: o csv.writer escreve e a linha volta direto para a resposta"""
+    def write(self, valor):
+        return valor
+
+
+def _formatar_csv(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, Decimal):
+        # Padrão brasileiro (Excel pt-BR): vírgula decimal
+        return f"{valor:.2f}".replace('.', ',')
+    if isinstance(valor, date):
+        return valor.strftime('%d/%m/%Y')
+    return valor
+
+
+def resposta_csv(nome_arquivo, cabecalho, linhas):
+    escritor = csv.writer(_Eco(), delimiter=';')
+
+    def gerar():
+        # BOM para o Excel reconhecer UTF-8 (acentos)
+        yield '\ufeff' + escritor.writerow(cabecalho)
+        for linha in linhas:
+            yield escritor.writerow([_formatar_csv(v) for v in linha])
+
+    response = StreamingHttpResponse(gerar(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{nome_arquivo}.csv"'
+    return response
+
+
+def resposta_xlsx(nome_arquivo, cabecalho, linhas):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise Http404("Exportação XLSX indisponível: instale o pacote openpyxl.")
+
+    # write_only grava as linhas direto no arquivo temporário, sem montar a planilha na memória
+    planilha = Workbook(write_only=True)
+    aba = planilha.create_sheet('Relatório')
+    aba.append(cabecalho)
+    for linha in linhas:
+        aba.append(list(linha))
+
+    arquivo = tempfile.TemporaryFile()
+    planilha.save(arquivo)
+    arquivo.seek(0)
+
+    return FileResponse(
+        arquivo,
+        as_attachment=True,
+        filename=f"{nome_arquivo}.xlsx",
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+
+
+def resposta(formato, nome_arquivo, cabecalho, linhas):
+    """Escolhe CSV (padrão) ou XLSX pelo parâmetro ?formato="""
+    if formato == 'xlsx':
+        return resposta_xlsx(nome_arquivo, cabecalho, linhas)
+    return resposta_csv(nome_arquivo, cabecalho, linhas)
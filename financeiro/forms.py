@@ -1,5 +1,6 @@
 from django import forms
-from .models import Conta, Lancamento, Caixa, PlanoDeContas
+from core.autocomplete import usar_autocomplete
+from .models import Conta, Lancamento, Caixa, PlanoDeContas, Fechamento
 
 # --- FORMULÁRIO DE CAIXA / BANCO ---
 class CaixaForm(forms.ModelForm):
@@ -22,9 +23,10 @@ class CaixaForm(forms.ModelForm):
 class PlanoContasForm(forms.ModelForm):
     class Meta:
         model = PlanoDeContas
-        fields = ['codigo', 'nome', 'tipo']
+        fields = ['codigo', 'nome', 'tipo', 'pai']
         widgets = {
             'tipo': forms.Select(attrs={'class': 'w-full px-3 py-2 border border-gray-300 rounded-md bg-white'}),
+            'pai': forms.Select(attrs={'class': 'w-full px-3 py-2 border border-gray-300 rounded-md bg-white'}),
         }
     
     def __init__(self, *args, **kwargs):
@@ -36,6 +38,15 @@ class PlanoContasForm(forms.ModelForm):
             if 'class' not in field.widget.attrs:
                  field.widget.attrs['class'] = 'w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500'
 
+        # Grupo (pai): só planos da empresa, e nunca o próprio plano ou um descendente dele
+        if self.user:
+            qs_pai = PlanoDeContas.objects.filter(empresa=self.user.empresa)
+            if self.instance.pk:
+                qs_pai = qs_pai.exclude(caminho__startswith=self.instance.caminho)
+            self.fields['pai'].queryset = qs_pai
+        self.fields['pai'].required = False
+        self.fields['pai'].help_text = "Deixe em branco para deduzir pelo código"
+
     # --- VALIDAÇÃO DE CÓDIGO ÚNICO ---
     def clean_codigo(self):
         codigo = self.cleaned_data.get('codigo')
@@ -51,6 +62,19 @@ class PlanoContasForm(forms.ModelForm):
                 raise forms.ValidationError("Este Código já está em uso nesta empresa.")
         
         return codigo
+
+    def clean(self):
+        cleaned_data = super().clean()
+        codigo = cleaned_data.get('codigo')
+
+        # Sem grupo informado: deduz pelo código (ex: '01.02.001' -> '01.02')
+        if self.user and codigo and not cleaned_data.get('pai'):
+            candidatos = PlanoDeContas.objects.filter(empresa=self.user.empresa).exclude(codigo='')
+            if self.instance.pk:
+                candidatos = candidatos.exclude(caminho__startswith=self.instance.caminho)
+            por_codigo = {p.codigo: p for p in candidatos.only('id', 'codigo', 'caminho')}
+            cleaned_data['pai'] = PlanoDeContas.inferir_pai(codigo, por_codigo)
+        return cleaned_data
     
 
 class ContaForm(forms.ModelForm):
@@ -99,6 +123,12 @@ class ContaForm(forms.ModelForm):
                 qs_cadastro = qs_cadastro.filter(papel__in=['FOR', 'AMB'])
             self.fields['cadastro'].queryset = qs_cadastro
 
+        # Autocomplete: o HTML só leva a opção selecionada; o resto vem do endpoint JSON.
+        # O queryset acima continua valendo para validar o que for enviado.
+        parametros = {'tipo': tipo_filtro} if tipo_filtro else None
+        usar_autocomplete(self.fields['plano_de_contas'], 'financeiro:autocomplete_planos', parametros)
+        usar_autocomplete(self.fields['cadastro'], 'autocomplete_cadastros', parametros)
+
     def clean(self):
         cleaned_data = super().clean()
         gerar = cleaned_data.get('gerar_parcelas')
@@ -131,4 +161,16 @@ class LancamentoManualForm(forms.ModelForm):
         
         if user:
             self.fields['caixa'].queryset = Caixa.objects.filter(empresa=user.empresa)
-            self.fields['plano_de_contas'].queryset = PlanoDeContas.objects.filter(empresa=user.empresa)
\ No newline at end of file
+            self.fields['plano_de_contas'].queryset = PlanoDeContas.objects.filter(empresa=user.empresa)
+
+        usar_autocomplete(self.fields['plano_de_contas'], 'financeiro:autocomplete_planos')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # Mês fechado: não entra lançamento novo nem sai o que já estava lá (na edição)
+        if self.instance.pk:
+            Fechamento.verificar(self.instance.caixa_id, self.instance.data_lancamento)
+        caixa = cleaned_data.get('caixa')
+        if caixa and cleaned_data.get('data_lancamento'):
+            Fechamento.verificar(caixa.id, cleaned_data['data_lancamento'])
+        return cleaned_data
@@ -0,0 +1,234 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from cadastros.importacao import completar_cnpj, completar_cpf, formatar_documento
+from cadastros.models import Cadastro
+from core.models import Empresa, Usuario
+from financeiro.cache import invalidar_empresa
+from financeiro.models import Caixa, Conta, Lancamento, PlanoDeContas, ResumoMensal, SaldoMensal
+from financeiro.services import add_months
+
+NOMES = ['João', 'José', 'Maria', 'Ana', 'Antônio', 'Francisca', 'Luís', 'Márcia', 'Sérgio', 'Conceição',
+         'Paulo', 'Adriana', 'Carlos', 'Juliana', 'Fábio', 'Patrícia', 'Rogério', 'Letícia', 'André', 'Cláudia']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Ferreira', 'Araújo', 'Gonçalves',
+              'Simões', 'Brandão', 'Magalhães', 'Conceição', 'Assunção', 'Rodrigues', 'Almeida', 'Nascimento']
+RAMOS = ['Comércio', 'Distribuidora', 'Serviços', 'Materiais', 'Transportes', 'Tecnologia', 'Papelaria', 'Alimentos']
+
+# Plano de contas base (código, nome, tipo); o pai sai do código
+PLANOS = [
+    ('1', 'Receitas', 'R'),
+    ('1.01', 'Mensalidades', 'R'),
+    ('1.02', 'Vendas', 'R'),
+    ('1.03', 'Serviços', 'R'),
+    ('1.04', 'Juros Recebidos', 'R'),
+    ('2', 'Despesas', 'D'),
+    ('2.01', 'Pessoal', 'D'),
+    ('2.01.01', 'Salários', 'D'),
+    ('2.01.02', 'Encargos Sociais', 'D'),
+    ('2.02', 'Ocupação', 'D'),
+    ('2.02.01', 'Aluguel', 'D'),
+    ('2.02.02', 'Energia', 'D'),
+    ('2.02.03', 'Água', 'D'),
+    ('2.03', 'Fornecedores', 'D'),
+    ('2.04', 'Impostos', 'D'),
+    ('2.05', 'Tarifas Bancárias', 'D'),
+]
+
+# Valores (R$) com distribuição log-normal: mediana e espalhamento por tipo
+VALORES = {'R': (250, 0.8), 'D': (400, 1.1)}
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera empresas com dados sintéticos (cadastros, plano de contas, caixas, contas e "
+        "lançamentos) em volumes configuráveis, para reproduzir a escala de produção. "
+        "Cada empresa ganha um usuário 'sintetico<id>' para entrar no sistema e rodar benchmark_views."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresas', type=int, default=1)
+        parser.add_argument('--cadastros', type=int, default=2000, help="Por empresa (clientes e fornecedores)")
+        parser.add_argument('--planos', type=int, default=len(PLANOS), help=f"Por empresa (mínimo {len(PLANOS)})")
+        parser.add_argument('--caixas', type=int, default=3, help="Por empresa")
+        parser.add_argument('--contas', type=int, default=20000, help="Por empresa")
+        parser.add_argument('--lancamentos', type=int, default=50000, help="Avulsos por empresa, além das baixas das contas pagas")
+        parser.add_argument('--meses', type=int, default=24, help="Meses de histórico até hoje")
+        parser.add_argument('--senha', default='sintetico', help="Senha dos usuários criados")
+        parser.add_argument('--seed', type=int, default=None, help="Semente: mesma semente, mesmos dados")
+
+    def handle(self, *args, **options):
+        if options['planos'] < len(PLANOS):
+            raise CommandError(f"--planos precisa ser pelo menos {len(PLANOS)}.")
+        self.aleatorio = random.Random(options['seed'])
+        self.hoje = date.today()
+        self.inicio = add_months(self.hoje, -options['meses'])
+
+        for _ in range(options['empresas']):
+            inicio = time.perf_counter()
+            with transaction.atomic():
+                empresa, usuario = self.criar_empresa(options['senha'])
+                cadastros = self.criar_cadastros(empresa, options['cadastros'])
+                planos = self.criar_planos(empresa, options['planos'])
+                caixas = [
+                    Caixa.objects.create(empresa=empresa, nome=f"Banco {i + 1}", saldo_inicial=self.valor(5000, 1))
+                    for i in range(options['caixas'])
+                ]
+                contas, baixas = self.criar_contas(empresa, options['contas'], planos, cadastros, caixas)
+                avulsos = self.criar_lancamentos(empresa, options['lancamentos'], planos, caixas)
+
+                # Os lançamentos foram criados em lote: resumos e saldos de uma vez no final
+                SaldoMensal.reconstruir(empresa)
+                ResumoMensal.reconstruir(empresa)
+                transaction.on_commit(lambda: invalidar_empresa(empresa.id))
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{empresa.nome} (id {empresa.id}, usuário {usuario.username}): {len(cadastros)} cadastros, "
+                f"{len(planos)} planos, {len(caixas)} caixas, {contas} contas, {baixas + avulsos} lançamentos "
+                f"em {time.perf_counter() - inicio:.1f}s"
+            ))
+
+    # --------------------------------------------------
+    # Distribuições
+    # --------------------------------------------------
+
+    def valor(self, mediana, espalhamento):
+        """Valor log-normal (2 casas): muitos valores pequenos, poucos grandes"""
+        bruto = self.aleatorio.lognormvariate(0, espalhamento) * mediana
+        return Decimal(max(bruto, 1)).quantize(Decimal('0.01'))
+
+    def dia_util(self, dia):
+        """Sábado/domingo passam para a segunda"""
+        return dia + timedelta(days=7 - dia.weekday()) if dia.weekday() >= 5 else dia
+
+    def data_no_mes(self, mes):
+        """Concentrada no começo do mês (vencimentos, folha, aluguel) e rareando até o fim"""
+        dia = min(1 + int(abs(self.aleatorio.gauss(0, 9))), 28)
+        return self.dia_util(mes.replace(day=dia))
+
+    def mes_entre(self, inicio, fim):
+        meses = (fim.year - inicio.year) * 12 + fim.month - inicio.month
+        return add_months(inicio.replace(day=1), self.aleatorio.randint(0, meses))
+
+    def documento_unico(self, usados, tamanho):
+        while True:
+            if tamanho == 11:
+                digitos = completar_cpf(f"{self.aleatorio.randrange(10 ** 8, 10 ** 9):09d}")
+            else:
+                digitos = completar_cnpj(f"{self.aleatorio.randrange(10 ** 7, 10 ** 8):08d}0001")
+            if digitos not in usados:
+                usados.add(digitos)
+                return formatar_documento(digitos)
+
+    # --------------------------------------------------
+    # Criação
+    # --------------------------------------------------
+
+    def criar_empresa(self, senha):
+        usados = set(Empresa.objects.values_list('cnpj', flat=True))
+        cnpj = self.documento_unico(usados, 14)
+        empresa = Empresa.objects.create(nome=f"Empresa Sintética {cnpj[:10]}", cnpj=cnpj)
+        usuario = Usuario.objects.create_user(f"sintetico{empresa.id}", password=senha, empresa=empresa)
+        return empresa, usuario
+
+    def criar_cadastros(self, empresa, quantidade):
+        usados = set()
+        cadastros = []
+        for i in range(quantidade):
+            # 80% clientes pessoa física; fornecedores são empresas
+            if self.aleatorio.random() < 0.8:
+                nome = f"{self.aleatorio.choice(NOMES)} {self.aleatorio.choice(SOBRENOMES)} {self.aleatorio.choice(SOBRENOMES)}"
+                papel, tipo_pessoa, documento = 'CLI', 'PF', self.documento_unico(usados, 11)
+            else:
+                nome = f"{self.aleatorio.choice(SOBRENOMES)} {self.aleatorio.choice(RAMOS)}"
+                papel, tipo_pessoa, documento = 'FOR', 'PJ', self.documento_unico(usados, 14)
+            if self.aleatorio.random() < 0.05:
+                papel = 'AMB'
+            cadastros.append(Cadastro(
+                empresa=empresa, nome=nome, papel=papel, tipo_pessoa=tipo_pessoa, cpf_cnpj=documento,
+                num_registro=i + 1, email=f"contato{i + 1}@exemplo.com.br",
+                situacao='INATIVO' if self.aleatorio.random() < 0.1 else 'ATIVO',
+            ))
+        return Cadastro.criar_em_lote(cadastros)
+
+    def criar_planos(self, empresa, quantidade):
+        definicoes = list(PLANOS)
+        # Planos extras: subcontas das categorias de segundo nível, alternando receita/despesa
+        folhas = [(codigo, tipo) for codigo, _, tipo in PLANOS if codigo.count('.') == 1]
+        for i in range(quantidade - len(PLANOS)):
+            pai, tipo = folhas[i % len(folhas)]
+            definicoes.append((f"{pai}.{90 + i // len(folhas):02d}", f"Subcategoria {i + 1}", tipo))
+
+        PlanoDeContas.objects.bulk_create([
+            PlanoDeContas(empresa=empresa, codigo=codigo, nome=nome, tipo=tipo) for codigo, nome, tipo in definicoes
+        ])
+        PlanoDeContas.reconstruir_hierarquia(empresa, inferir_pais=True)
+        # Só as folhas recebem movimento
+        planos = list(PlanoDeContas.objects.filter(empresa=empresa))
+        pais = {p.pai_id for p in planos}
+        return [p for p in planos if p.id not in pais]
+
+    def criar_contas(self, empresa, quantidade, planos, cadastros, caixas):
+        """Contas de todo o histórico até 12 meses à frente; as vencidas quase todas pagas"""
+        clientes = [c for c in cadastros if c.papel in ('CLI', 'AMB')] or [None]
+        fornecedores = [c for c in cadastros if c.papel in ('FOR', 'AMB')] or [None]
+        fim = add_months(self.hoje, 12)
+
+        contas = []
+        for i in range(quantidade):
+            plano = self.aleatorio.choice(planos)
+            vencimento = self.data_no_mes(self.mes_entre(self.inicio, fim))
+            status = 'PENDENTE'
+            if vencimento < self.hoje:
+                sorteio = self.aleatorio.random()
+                status = 'PAGA' if sorteio < 0.88 else 'CANCELADA' if sorteio < 0.91 else 'PENDENTE'
+            contas.append(Conta(
+                empresa=empresa, plano_de_contas=plano, status=status,
+                cadastro=self.aleatorio.choice(clientes if plano.tipo == 'R' else fornecedores),
+                descricao=f"{plano.nome} {vencimento:%m/%Y}", documento=f"{i + 1:06d}",
+                valor=self.valor(*VALORES[plano.tipo]), data_vencimento=vencimento,
+            ))
+        Conta.objects.bulk_create(contas, batch_size=1000)
+
+        # MySQL não devolve os IDs no bulk_create: busca pelo documento (sequencial, único aqui)
+        if contas and contas[0].id is None:
+            ids = dict(Conta.objects.filter(empresa=empresa).values_list('documento', 'id'))
+            for conta in contas:
+                conta.id = ids[conta.documento]
+
+        # Baixa das pagas: alguns dias depois do vencimento (nunca depois de hoje)
+        baixas = []
+        for conta in contas:
+            if conta.status != 'PAGA':
+                continue
+            atraso = int(self.aleatorio.expovariate(1 / 3))
+            lancamento = Lancamento(
+                empresa=empresa, caixa=self.aleatorio.choice(caixas), plano_de_contas=conta.plano_de_contas,
+                conta_origem=conta, descricao=f"Baixa: {conta.descricao}", valor=conta.valor,
+                data_lancamento=min(conta.data_vencimento + timedelta(days=atraso), self.hoje),
+                tipo='C' if conta.plano_de_contas.tipo == 'R' else 'D',
+            )
+            lancamento.ajustar_sinal()
+            baixas.append(lancamento)
+        Lancamento.objects.bulk_create(baixas, batch_size=1000)
+        return len(contas), len(baixas)
+
+    def criar_lancamentos(self, empresa, quantidade, planos, caixas):
+        """Movimento avulso (vendas à vista, tarifas...) espalhado pelo histórico"""
+        lancamentos = []
+        for _ in range(quantidade):
+            plano = self.aleatorio.choice(planos)
+            lancamento = Lancamento(
+                empresa=empresa, caixa=self.aleatorio.choice(caixas), plano_de_contas=plano,
+                descricao=plano.nome, valor=self.valor(VALORES[plano.tipo][0] / 4, VALORES[plano.tipo][1]),
+                data_lancamento=min(self.data_no_mes(self.mes_entre(self.inicio, self.hoje)), self.hoje),
+                tipo='C' if plano.tipo == 'R' else 'D',
+            )
+            lancamento.ajustar_sinal()
+            lancamentos.append(lancamento)
+        Lancamento.objects.bulk_create(lancamentos, batch_size=1000)
+        return len(lancamentos)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Empresa
+from financeiro.models import PlanoDeContas
+
+
+class Command(BaseCommand):
+    help = "Recalcula o caminho/nível da hierarquia do Plano de Contas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, help="ID da empresa (padrão: todas)")
+        parser.add_argument('--inferir-pais', action='store_true', help="Deduz o pai pelo código nos planos sem pai")
+
+    def handle(self, *args, **options):
+        empresas = Empresa.objects.all()
+        if options['empresa']:
+            empresas = empresas.filter(id=options['empresa'])
+            if not empresas.exists():
+                raise CommandError(f"Empresa {options['empresa']} não encontrada.")
+
+        total = 0
+        for empresa in empresas:
+            total += PlanoDeContas.reconstruir_hierarquia(empresa, inferir_pais=options['inferir_pais'])
+        self.stdout.write(self.style.SUCCESS(f"{total} planos de contas atualizados."))
@@ -0,0 +1,50 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from core.models import Empresa
+from financeiro.models import ResumoMensal
+
+
+def reconstruir_e_fechar(empresa):
+    try:
+        return ResumoMensal.reconstruir(empresa)
+    finally:
+        # Cada thread tem a sua conexão: mesmo cuidado do fim de uma requisição
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula o Resumo Mensal (caixa x plano de contas x tipo) a partir dos lançamentos, "
+        "uma empresa por vez em cada thread"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, help="ID da empresa (padrão: todas)")
+        parser.add_argument('--threads', type=int, default=4, help="Empresas reconstruídas ao mesmo tempo (padrão: 4)")
+
+    def handle(self, *args, **options):
+        if options['empresa']:
+            empresas = list(Empresa.objects.filter(id=options['empresa']))
+            if not empresas:
+                raise CommandError(f"Empresa {options['empresa']} não encontrada.")
+        else:
+            empresas = list(Empresa.objects.order_by('id'))
+
+        # SQLite tem um único escritor: em paralelo as threads só esperariam umas pelas outras
+        threads = 1 if connection.vendor == 'sqlite' else max(1, options['threads'])
+
+        inicio = time.perf_counter()
+        if threads == 1:
+            total = sum(ResumoMensal.reconstruir(empresa) for empresa in empresas)
+        else:
+            with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='resumos') as pool:
+                total = sum(pool.map(reconstruir_e_fechar, empresas))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} resumos mensais reconstruídos ({len(empresas)} empresas, {threads} threads, "
+            f"{time.perf_counter() - inicio:.1f}s)."
+        ))
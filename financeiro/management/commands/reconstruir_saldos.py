@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Empresa
+from financeiro.models import SaldoMensal
+
+
+class Command(BaseCommand):
+    help = "Recalcula o Saldo Mensal de todos os caixas a partir dos lançamentos"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--empresa', type=int, help="ID da empresa (padrão: todas)")
+
+    def handle(self, *args, **options):
+        empresa = None
+        if options['empresa']:
+            empresa = Empresa.objects.filter(id=options['empresa']).first()
+            if not empresa:
+                raise CommandError(f"Empresa {options['empresa']} não encontrada.")
+
+        total = SaldoMensal.reconstruir(empresa)
+        self.stdout.write(self.style.SUCCESS(f"{total} saldos mensais reconstruídos."))
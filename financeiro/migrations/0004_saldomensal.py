@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_parametrosistema'),
+        ('financeiro', '0003_alter_planodecontas_unique_together'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('competencia', models.DateField(help_text='Sempre o dia 1 do mês')),
+                ('saldo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('caixa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos_mensais', to='financeiro.caixa')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.empresa', verbose_name='Empresa')),
+            ],
+            options={
+                'verbose_name': 'Saldo Mensal',
+                'verbose_name_plural': 'Saldos Mensais',
+                'ordering': ['caixa', 'competencia'],
+                'unique_together': {('caixa', 'competencia')},
+            },
+        ),
+    ]
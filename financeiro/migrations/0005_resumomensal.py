@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_parametrosistema'),
+        ('financeiro', '0004_saldomensal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('competencia', models.DateField(help_text='Sempre o dia 1 do mês')),
+                ('tipo', models.CharField(choices=[('C', 'Receita (Crédito-Entrada)'), ('D', 'Despesa (Débito-Saída)')], max_length=1)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('caixa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_mensais', to='financeiro.caixa')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.empresa', verbose_name='Empresa')),
+                ('plano_de_contas', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='resumos_mensais', to='financeiro.planodecontas')),
+            ],
+            options={
+                'verbose_name': 'Resumo Mensal',
+                'verbose_name_plural': 'Resumos Mensais',
+                'ordering': ['competencia'],
+                'unique_together': {('caixa', 'plano_de_contas', 'competencia', 'tipo')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_parametrosistema'),
+        ('financeiro', '0005_resumomensal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='planodecontas',
+            name='caminho',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='planodecontas',
+            name='nivel',
+            field=models.PositiveSmallIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='planodecontas',
+            name='pai',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='filhos', to='financeiro.planodecontas', verbose_name='Grupo (Conta Pai)'),
+        ),
+        migrations.AddIndex(
+            model_name='planodecontas',
+            index=models.Index(fields=['empresa', 'caminho'], name='plano_empresa_caminho_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+
+def preencher_hierarquia(apps, schema_editor):
+    """Deduz o pai de cada plano pelo código e grava caminho/nivel"""
+    PlanoDeContas = apps.get_model('financeiro', 'PlanoDeContas')
+
+    empresas = PlanoDeContas.objects.values_list('empresa_id', flat=True).distinct()
+    for empresa_id in empresas:
+        planos = list(PlanoDeContas.objects.filter(empresa_id=empresa_id).order_by('codigo'))
+        por_codigo = {p.codigo: p for p in planos if p.codigo}
+        por_id = {p.id: p for p in planos}
+
+        # Maior código existente que seja prefixo ('01.02.001' -> '01.02' -> '01')
+        for plano in planos:
+            codigo = plano.codigo or ''
+            if '.' in codigo:
+                partes = codigo.split('.')
+                candidatos = ['.'.join(partes[:i]) for i in range(len(partes) - 1, 0, -1)]
+            else:
+                candidatos = [codigo[:i] for i in range(len(codigo) - 1, 0, -1)]
+            pai = next((por_codigo[c] for c in candidatos if c in por_codigo), None)
+            plano.pai_id = pai.id if pai else None
+
+        def calcular(plano):
+            pai = por_id.get(plano.pai_id)
+            if pai is None:
+                return f"{plano.id:010d}/", 1
+            caminho_pai, nivel_pai = calcular(pai)
+            return f"{caminho_pai}{plano.id:010d}/", nivel_pai + 1
+
+        for plano in planos:
+            plano.caminho, plano.nivel = calcular(plano)
+
+        PlanoDeContas.objects.bulk_update(planos, ['pai', 'caminho', 'nivel'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0006_planodecontas_hierarquia'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_hierarquia, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cadastros', '0002_remove_cadastro_rg_ie_cadastro_inscricao_estadual_and_more'),
+        ('core', '0003_parametrosistema'),
+        ('financeiro', '0007_preencher_hierarquia_plano'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conta',
+            index=models.Index(fields=['empresa', 'status', 'data_vencimento'], name='conta_emp_status_venc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conta',
+            index=models.Index(fields=['empresa', 'data_vencimento'], name='conta_emp_venc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lancamento',
+            index=models.Index(fields=['empresa', 'data_lancamento', 'tipo'], name='lanc_emp_data_tipo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lancamento',
+            index=models.Index(fields=['empresa', 'caixa', 'data_lancamento'], name='lanc_emp_caixa_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lancamento',
+            index=models.Index(fields=['empresa', 'plano_de_contas', 'data_lancamento'], name='lanc_emp_plano_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resumomensal',
+            index=models.Index(fields=['empresa', 'competencia'], name='resumo_emp_comp_idx'),
+        ),
+    ]
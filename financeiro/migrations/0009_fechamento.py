@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_parametrosistema_multa'),
+        ('financeiro', '0008_indices_compostos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Fechamento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('competencia', models.DateField(help_text='Sempre o dia 1 do mês')),
+                ('saldo', models.DecimalField(decimal_places=2, default=0, help_text='Acumulado dos lançamentos até o fim do mês (sem o saldo inicial do caixa)', max_digits=14)),
+                ('fechado_em', models.DateTimeField(auto_now_add=True)),
+                ('caixa', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='fechamentos', to='financeiro.caixa')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.empresa', verbose_name='Empresa')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Fechamento',
+                'verbose_name_plural': 'Fechamentos',
+                'ordering': ['caixa', 'competencia'],
+                'unique_together': {('caixa', 'competencia')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TotalFechado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('competencia', models.DateField(help_text='Sempre o dia 1 do mês')),
+                ('tipo', models.CharField(choices=[('C', 'Receita (Crédito-Entrada)'), ('D', 'Despesa (Débito-Saída)')], max_length=1)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('caixa', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='totais_fechados', to='financeiro.caixa')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.empresa', verbose_name='Empresa')),
+                ('fechamento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='totais', to='financeiro.fechamento')),
+                ('plano_de_contas', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='totais_fechados', to='financeiro.planodecontas')),
+            ],
+            options={
+                'verbose_name': 'Total Fechado',
+                'verbose_name_plural': 'Totais Fechados',
+                'ordering': ['competencia'],
+                'indexes': [models.Index(fields=['empresa', 'competencia'], name='totalfech_emp_comp_idx')],
+            },
+        ),
+    ]
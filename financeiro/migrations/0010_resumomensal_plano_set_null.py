@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0009_fechamento'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resumomensal',
+            name='plano_de_contas',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resumos_mensais', to='financeiro.planodecontas'),
+        ),
+    ]
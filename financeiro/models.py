@@ -1,7 +1,18 @@
-from django.db import models
+from datetime import date, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Exists, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Concat, Left, Substr, TruncMonth
+from django.utils.dateparse import parse_date
 from core.models import ModeloSaaS
 from cadastros.models import Cadastro
 
+# Cada nível do caminho materializado ocupa o ID com 10 dígitos + '/'
+TAMANHO_SEGMENTO = 11
+
+
 class PlanoDeContas(ModeloSaaS):
     TIPO_CHOICES = [
         ('R', 'Receita'),
@@ -11,6 +22,14 @@ class PlanoDeContas(ModeloSaaS):
     nome = models.CharField(max_length=100)
     tipo = models.CharField(max_length=1, choices=TIPO_CHOICES)
     codigo = models.CharField(max_length=20, blank=True, help_text="Ex: 1.01")
+
+    # --- Hierarquia ---
+    # 'caminho' é o caminho materializado (IDs dos ancestrais + o próprio),
+    # ex: '0000000001/0000000004/'. Toda a subárvore de um grupo é um
+    # filtro caminho__startswith, e o grupo de nível N é o prefixo de N segmentos.
+    pai = models.ForeignKey('self', on_delete=models.PROTECT, null=True, blank=True, related_name='filhos', verbose_name="Grupo (Conta Pai)")
+    caminho = models.CharField(max_length=255, blank=True, editable=False)
+    nivel = models.PositiveSmallIntegerField(default=1, editable=False)
     
     def __str__(self):
         return f"{self.codigo} - {self.nome}" if self.codigo else self.nome
@@ -20,6 +39,87 @@ class PlanoDeContas(ModeloSaaS):
         verbose_name_plural = "Planos de Contas"
         ordering = ['codigo', 'nome']
         unique_together = [['empresa', 'codigo']]
+        indexes = [
+            models.Index(fields=['empresa', 'caminho'], name='plano_empresa_caminho_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            # O caminho depende do ID, então é calculado depois do INSERT
+            pai = PlanoDeContas.objects.filter(pk=self.pai_id).values('caminho', 'nivel').first() if self.pai_id else None
+            caminho = f"{pai['caminho'] if pai else ''}{self.pk:010d}/"
+            nivel = pai['nivel'] + 1 if pai else 1
+
+            if caminho != self.caminho or nivel != self.nivel:
+                caminho_antigo, nivel_antigo = self.caminho, self.nivel
+                PlanoDeContas.objects.filter(pk=self.pk).update(caminho=caminho, nivel=nivel)
+
+                # Mudou de grupo: reescreve o caminho de toda a subárvore num único UPDATE
+                if caminho_antigo:
+                    self.descendentes(caminho_antigo).update(
+                        caminho=Concat(Value(caminho), Substr('caminho', len(caminho_antigo) + 1)),
+                        nivel=F('nivel') + (nivel - nivel_antigo),
+                    )
+                self.caminho, self.nivel = caminho, nivel
+
+    def descendentes(self, caminho=None):
+        """Toda a subárvore abaixo deste plano (sem ele mesmo)"""
+        caminho = caminho or self.caminho
+        return PlanoDeContas.objects.filter(empresa_id=self.empresa_id, caminho__startswith=caminho).exclude(pk=self.pk)
+
+    def subarvore(self):
+        """Este plano e todos os descendentes"""
+        return PlanoDeContas.objects.filter(empresa_id=self.empresa_id, caminho__startswith=self.caminho)
+
+    @staticmethod
+    def inferir_pai(codigo, planos_por_codigo):
+        """
+        Sugere o pai pelo código: o maior código existente que seja prefixo dele.
+        '01.02.001' -> '01.02' -> '01'; sem ponto, '101001' -> '10100' -> ... -> '1'.
+        """
+        if not codigo:
+            return None
+        if '.' in codigo:
+            partes = codigo.split('.')
+            candidatos = ['.'.join(partes[:i]) for i in range(len(partes) - 1, 0, -1)]
+        else:
+            candidatos = [codigo[:i] for i in range(len(codigo) - 1, 0, -1)]
+        for candidato in candidatos:
+            if candidato in planos_por_codigo:
+                return planos_por_codigo[candidato]
+        return None
+
+    @classmethod
+    def reconstruir_hierarquia(cls, empresa, inferir_pais=False):
+        """Recalcula caminho/nivel de todos os planos da empresa (opcionalmente deduzindo o pai pelo código)"""
+        planos = list(cls.objects.filter(empresa=empresa).order_by('codigo'))
+        por_id = {p.id: p for p in planos}
+
+        if inferir_pais:
+            por_codigo = {p.codigo: p for p in planos if p.codigo}
+            for plano in planos:
+                if plano.pai_id is None:
+                    pai = cls.inferir_pai(plano.codigo, por_codigo)
+                    plano.pai_id = pai.id if pai else None
+
+        def calcular(plano, visitados=()):
+            if plano.id in visitados:
+                raise ValueError(f"Ciclo na hierarquia do plano {plano}")
+            pai = por_id.get(plano.pai_id)
+            if pai is None:
+                plano.pai_id = None
+                return f"{plano.id:010d}/", 1
+            caminho_pai, nivel_pai = calcular(pai, visitados + (plano.id,))
+            return f"{caminho_pai}{plano.id:010d}/", nivel_pai + 1
+
+        for plano in planos:
+            plano.caminho, plano.nivel = calcular(plano)
+
+        with transaction.atomic():
+            cls.objects.bulk_update(planos, ['pai', 'caminho', 'nivel'], batch_size=500)
+        return len(planos)
 
 
 class Caixa(ModeloSaaS):
@@ -56,6 +156,69 @@ class Conta(ModeloSaaS):
     def __str__(self):
         return f"{self.descricao} - {self.data_vencimento}"
 
+    def em_periodo_fechado(self):
+        """Conta baixada por um lançamento que está num mês já fechado (não pode mais mudar)"""
+        baixa = Lancamento.objects.filter(conta_origem=self).values('caixa_id', 'data_lancamento').first()
+        return bool(baixa) and Fechamento.fechado(baixa['caixa_id'], baixa['data_lancamento'])
+
+    class Meta:
+        indexes = [
+            # Listas de contas, dashboard (atrasadas) e relatório: empresa + status + vencimento
+            models.Index(fields=['empresa', 'status', 'data_vencimento'], name='conta_emp_status_venc_idx'),
+            # Listas sem filtro de status (paginação por vencimento)
+            models.Index(fields=['empresa', 'data_vencimento'], name='conta_emp_venc_idx'),
+        ]
+
+
+# Campos do Lançamento que alimentam as tabelas de resumo (Saldo Mensal / Resumo Mensal)
+CAMPOS_RESUMO = ('empresa_id', 'caixa_id', 'plano_de_contas_id', 'tipo', 'data_lancamento', 'valor')
+
+
+def travar_caixas(*caixa_ids):
+    """
+    Trava as linhas dos caixas (SELECT ... FOR UPDATE, sempre na ordem do id) até o fim da
+    transação: os movimentos de um mesmo caixa atualizam os resumos um de cada vez.
+    Chame antes de gravar o lançamento: no MySQL o INSERT já pega uma trava
+    compartilhada no caixa (chave estrangeira), e subir essa trava depois dá deadlock.
+    """
+    ids = sorted({caixa_id for caixa_id in caixa_ids if caixa_id})
+    if ids:
+        list(Caixa.objects.select_for_update().filter(id__in=ids).order_by('id').values_list('id', flat=True))
+
+
+def atualizar_resumos(movimento, sinal=1):
+    """Aplica (sinal=1) ou estorna (sinal=-1) um movimento nos resumos"""
+    valor = movimento['valor'] * sinal
+    SaldoMensal.registrar_movimento(movimento['empresa_id'], movimento['caixa_id'], movimento['data_lancamento'], valor)
+    ResumoMensal.registrar_movimento(
+        movimento['empresa_id'], movimento['caixa_id'], movimento['plano_de_contas_id'],
+        movimento['tipo'], movimento['data_lancamento'], valor
+    )
+
+
+def atualizar_resumos_em_lote(lancamentos):
+    """
+    Versão em lote de atualizar_resumos, para lançamentos criados com bulk_create
+    (que não passa pelo save). Soma tudo por (caixa, plano, tipo, mês) antes de gravar.
+    """
+    agrupados = {}
+    for lancamento in lancamentos:
+        movimento = lancamento.dados_resumo()
+        movimento['data_lancamento'] = movimento['data_lancamento'].replace(day=1)
+        chave = tuple(movimento[campo] for campo in CAMPOS_RESUMO if campo != 'valor')
+        if chave in agrupados:
+            agrupados[chave]['valor'] += movimento['valor']
+        else:
+            agrupados[chave] = movimento
+    for movimento in agrupados.values():
+        atualizar_resumos(movimento)
+
+
+def primeiro_dia_proximo_mes(data):
+    if data.month == 12:
+        return date(data.year + 1, 1, 1)
+    return date(data.year, data.month + 1, 1)
+
 
 class Lancamento(ModeloSaaS):
     """
@@ -80,16 +243,414 @@ class Lancamento(ModeloSaaS):
     valor = models.DecimalField(max_digits=12, decimal_places=2)
     tipo = models.CharField(max_length=1, choices=TIPO_CHOICES)
 
-    def save(self, *args, **kwargs):
+    def ajustar_sinal(self):
         # Garante que despesas (D) sejam negativas e Receitas (C) positivas
         if self.tipo == 'D' and self.valor > 0:
             self.valor = self.valor * -1
         elif self.tipo == 'C' and self.valor < 0:
             self.valor = self.valor * -1
-        super().save(*args, **kwargs)
+
+    def save(self, *args, **kwargs):
+        self.ajustar_sinal()
+
+        # A baixa de conta envia a data como texto (vinda do POST)
+        if isinstance(self.data_lancamento, str):
+            self.data_lancamento = parse_date(self.data_lancamento)
+
+        with transaction.atomic():
+            # Na edição, estorna o valor antigo dos resumos antes de aplicar o novo
+            anterior = None
+            if self.pk:
+                anterior = Lancamento.objects.filter(pk=self.pk).values(*CAMPOS_RESUMO).first()
+
+            travar_caixas(self.caixa_id, anterior and anterior['caixa_id'])
+
+            # Nem a data nova nem a antiga podem estar num mês fechado
+            Fechamento.verificar(self.caixa_id, self.data_lancamento)
+            if anterior:
+                Fechamento.verificar(anterior['caixa_id'], anterior['data_lancamento'])
+
+            super().save(*args, **kwargs)
+
+            if anterior:
+                atualizar_resumos(anterior, sinal=-1)
+            atualizar_resumos(self.dados_resumo())
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            travar_caixas(self.caixa_id)
+            Fechamento.verificar(self.caixa_id, self.data_lancamento)
+            atualizar_resumos(self.dados_resumo(), sinal=-1)
+            return super().delete(*args, **kwargs)
+
+    def dados_resumo(self):
+        return {campo: getattr(self, campo) for campo in CAMPOS_RESUMO}
 
     def __str__(self):
         return f"{self.data_lancamento} - {self.descricao} ({self.valor})"
 
     class Meta:
-        ordering = ['-data_lancamento']
\ No newline at end of file
+        ordering = ['-data_lancamento']
+        indexes = [
+            # Fluxo de caixa / relatório / DRE (dias fora dos meses fechados) e dashboard
+            models.Index(fields=['empresa', 'data_lancamento', 'tipo'], name='lanc_emp_data_tipo_idx'),
+            # Mesmos filtros com caixa selecionado
+            models.Index(fields=['empresa', 'caixa', 'data_lancamento'], name='lanc_emp_caixa_data_idx'),
+            # Filtro por categoria (inclusive o saldo anterior por categoria)
+            models.Index(fields=['empresa', 'plano_de_contas', 'data_lancamento'], name='lanc_emp_plano_data_idx'),
+        ]
+
+
+class SaldoMensal(ModeloSaaS):
+    """
+    Fotografia do saldo de cada Caixa no fechamento de cada mês.
+
+    'saldo' é o acumulado de TODOS os lançamentos do caixa até o último dia
+    da competência (sem o saldo_inicial do cadastro). Assim o saldo anterior
+    de qualquer data é: última fotografia + lançamentos do mês corrente.
+    """
+    caixa = models.ForeignKey(Caixa, on_delete=models.CASCADE, related_name='saldos_mensais')
+    competencia = models.DateField(help_text="Sempre o dia 1 do mês")
+    saldo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.caixa} - {self.competencia:%m/%Y}: {self.saldo}"
+
+    class Meta:
+        verbose_name = "Saldo Mensal"
+        verbose_name_plural = "Saldos Mensais"
+        ordering = ['caixa', 'competencia']
+        unique_together = [['caixa', 'competencia']]
+
+    @classmethod
+    def registrar_movimento(cls, empresa_id, caixa_id, data, valor):
+        """Soma 'valor' na competência de 'data' e em todas as fotografias seguintes"""
+        if not valor or not caixa_id or not data:
+            return
+        competencia = data.replace(day=1)
+
+        with transaction.atomic():
+            # Dois lançamentos no mesmo mês novo criariam a mesma fotografia (IntegrityError)
+            travar_caixas(caixa_id)
+            cls.objects.filter(caixa_id=caixa_id, competencia__gte=competencia).update(saldo=F('saldo') + valor)
+
+            if not cls.objects.filter(caixa_id=caixa_id, competencia=competencia).exists():
+                # Mês sem fotografia ainda: parte do acumulado do último mês fechado
+                acumulado = cls.objects.filter(
+                    caixa_id=caixa_id, competencia__lt=competencia
+                ).order_by('-competencia').values_list('saldo', flat=True).first() or Decimal(0)
+                cls.objects.create(empresa_id=empresa_id, caixa_id=caixa_id, competencia=competencia, saldo=acumulado + valor)
+
+    @classmethod
+    def movimento_anterior(cls, empresa, data, caixa_id=None):
+        """
+        Soma dos lançamentos antes de 'data' (um caixa ou todos da empresa).
+        Custa uma busca de fotografia + os lançamentos do próprio mês.
+        """
+        competencia = data.replace(day=1)
+
+        # Última fotografia de cada caixa antes do mês de 'data'
+        ultima = cls.objects.filter(
+            caixa=OuterRef('caixa'), competencia__lt=competencia
+        ).order_by('-competencia').values('competencia')[:1]
+
+        fotografias = cls.objects.filter(empresa=empresa, competencia=Subquery(ultima))
+        mes_corrente = Lancamento.objects.filter(
+            empresa=empresa,
+            data_lancamento__gte=competencia,
+            data_lancamento__lt=data,
+        )
+        if caixa_id:
+            fotografias = fotografias.filter(caixa_id=caixa_id)
+            mes_corrente = mes_corrente.filter(caixa_id=caixa_id)
+
+        total_fechado = fotografias.aggregate(Sum('saldo'))['saldo__sum'] or 0
+        total_mes = mes_corrente.aggregate(Sum('valor'))['valor__sum'] or 0
+        return total_fechado + total_mes
+
+    @classmethod
+    def movimento_anterior_por_caixa(cls, empresa, data):
+        """Mesma soma do movimento_anterior, separada por caixa: {caixa_id: total}"""
+        competencia = data.replace(day=1)
+        ultima = cls.objects.filter(
+            caixa=OuterRef('caixa'), competencia__lt=competencia
+        ).order_by('-competencia').values('competencia')[:1]
+
+        totais = dict(
+            cls.objects.filter(empresa=empresa, competencia=Subquery(ultima)).values_list('caixa_id', 'saldo')
+        )
+        mes_corrente = Lancamento.objects.filter(
+            empresa=empresa, data_lancamento__gte=competencia, data_lancamento__lt=data,
+        ).values('caixa_id').annotate(soma=Sum('valor')).order_by()
+        for linha in mes_corrente:
+            totais[linha['caixa_id']] = totais.get(linha['caixa_id'], 0) + linha['soma']
+        return totais
+
+    @classmethod
+    def reconstruir(cls, empresa=None):
+        """Recalcula todas as fotografias a partir dos lançamentos (um único agrupamento)"""
+        lancamentos = Lancamento.objects.all()
+        fotografias = cls.objects.all()
+        if empresa:
+            lancamentos = lancamentos.filter(empresa=empresa)
+            fotografias = fotografias.filter(empresa=empresa)
+
+        movimentos = lancamentos.annotate(mes=TruncMonth('data_lancamento')).values(
+            'empresa_id', 'caixa_id', 'mes'
+        ).annotate(total=Sum('valor')).order_by('caixa_id', 'mes')
+
+        novos = []
+        caixa_atual = None
+        acumulado = Decimal(0)
+        for m in movimentos:
+            if m['caixa_id'] != caixa_atual:
+                caixa_atual = m['caixa_id']
+                acumulado = Decimal(0)
+            acumulado += m['total']
+            novos.append(cls(empresa_id=m['empresa_id'], caixa_id=m['caixa_id'], competencia=m['mes'], saldo=acumulado))
+
+        with transaction.atomic():
+            fotografias.delete()
+            cls.objects.bulk_create(novos, batch_size=1000)
+        return len(novos)
+
+
+class ResumoMensal(ModeloSaaS):
+    """
+    Total mensal dos lançamentos por Caixa + Plano de Contas + Tipo.
+    Alimenta o DRE e o gráfico do dashboard sem reagrupar os lançamentos.
+    """
+    caixa = models.ForeignKey(Caixa, on_delete=models.CASCADE, related_name='resumos_mensais')
+    # Como no Lancamento: excluído o plano, os totais passam para a linha sem plano
+    # (ver transferir_para_sem_plano), em vez de sumirem com ele
+    plano_de_contas = models.ForeignKey(PlanoDeContas, on_delete=models.SET_NULL, null=True, blank=True, related_name='resumos_mensais')
+    competencia = models.DateField(help_text="Sempre o dia 1 do mês")
+    tipo = models.CharField(max_length=1, choices=Lancamento.TIPO_CHOICES)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.competencia:%m/%Y} - {self.plano_de_contas} ({self.tipo}): {self.total}"
+
+    class Meta:
+        verbose_name = "Resumo Mensal"
+        verbose_name_plural = "Resumos Mensais"
+        ordering = ['competencia']
+        unique_together = [['caixa', 'plano_de_contas', 'competencia', 'tipo']]
+        indexes = [
+            # DRE e dashboard: empresa + intervalo de competências
+            models.Index(fields=['empresa', 'competencia'], name='resumo_emp_comp_idx'),
+        ]
+
+    @classmethod
+    def registrar_movimento(cls, empresa_id, caixa_id, plano_de_contas_id, tipo, data, valor):
+        """Soma 'valor' na linha do mês (cria a linha se ainda não existir)"""
+        if not valor or not caixa_id or not data:
+            return
+        chave = {
+            'caixa_id': caixa_id,
+            'plano_de_contas_id': plano_de_contas_id,
+            'competencia': data.replace(day=1),
+            'tipo': tipo,
+        }
+        with transaction.atomic():
+            # Sem a trava, dois movimentos na mesma linha nova criariam duas linhas: com
+            # plano_de_contas NULL a chave única não barra (NULL não é igual a NULL)
+            travar_caixas(caixa_id)
+            if not cls.objects.filter(**chave).update(total=F('total') + valor):
+                cls.objects.create(empresa_id=empresa_id, total=valor, **chave)
+
+    @classmethod
+    def transferir_para_sem_plano(cls, plano_de_contas_id):
+        """
+        Soma os totais do plano nas linhas sem plano e apaga as linhas dele.
+        Chamado antes de excluir o plano: os lançamentos dele ficam com plano NULL
+        (SET_NULL), e o resumo precisa continuar batendo com eles.
+        """
+        with transaction.atomic():
+            linhas = list(cls.objects.filter(plano_de_contas_id=plano_de_contas_id))
+            for linha in linhas:
+                cls.registrar_movimento(linha.empresa_id, linha.caixa_id, None, linha.tipo, linha.competencia, linha.total)
+            cls.objects.filter(pk__in=[linha.pk for linha in linhas]).delete()
+
+    @classmethod
+    def consultas_periodo(cls, empresa, data_inicio, data_fim, caixa_id=None):
+        """
+        Fontes para totalizar um período, como pares (queryset, campo do valor).
+        Meses completos vêm dos totais do fechamento (mês fechado) ou do resumo;
+        só as pontas quebradas do período são lidas dos lançamentos.
+        """
+        # Meses inteiros dentro do período: [mes_ini, mes_fim)
+        mes_ini = data_inicio if data_inicio.day == 1 else primeiro_dia_proximo_mes(data_inicio)
+        mes_fim = (data_fim + timedelta(days=1)).replace(day=1)
+
+        pontas = Q()
+        if mes_ini < mes_fim:
+            if data_inicio < mes_ini:
+                pontas |= Q(data_lancamento__gte=data_inicio, data_lancamento__lt=mes_ini)
+            if mes_fim <= data_fim:
+                pontas |= Q(data_lancamento__gte=mes_fim, data_lancamento__lte=data_fim)
+        else:
+            pontas = Q(data_lancamento__range=[data_inicio, data_fim])
+
+        consultas = []
+        if mes_ini < mes_fim:
+            # Mês fechado: totais gravados no fechamento; os demais meses inteiros, do resumo
+            fechado = Fechamento.objects.filter(caixa=OuterRef('caixa'), competencia=OuterRef('competencia'))
+            consultas.append((TotalFechado.objects.filter(
+                empresa=empresa, competencia__gte=mes_ini, competencia__lt=mes_fim
+            ), 'total'))
+            consultas.append((cls.objects.filter(
+                empresa=empresa, competencia__gte=mes_ini, competencia__lt=mes_fim
+            ).exclude(Exists(fechado)), 'total'))
+        if pontas:
+            consultas.append((Lancamento.objects.filter(empresa=empresa).filter(pontas), 'valor'))
+
+        return [
+            (consulta.filter(caixa_id=caixa_id) if caixa_id else consulta, campo)
+            for consulta, campo in consultas
+        ]
+
+    @classmethod
+    def totais_por_plano(cls, empresa, data_inicio, data_fim, caixa_id=None):
+        """Total por (plano, tipo) no período, ordenado pelo código do plano"""
+        campos = ('plano_de_contas_id', 'plano_de_contas__codigo', 'plano_de_contas__nome', 'tipo')
+
+        totais = {}
+        for consulta, campo in cls.consultas_periodo(empresa, data_inicio, data_fim, caixa_id):
+            consulta = consulta.filter(plano_de_contas__isnull=False).values(*campos).annotate(soma=Sum(campo))
+            for linha in consulta.order_by():
+                chave = (linha['plano_de_contas_id'], linha['tipo'])
+                if chave in totais:
+                    totais[chave]['total'] += linha['soma']
+                else:
+                    linha['total'] = linha.pop('soma')
+                    totais[chave] = linha
+
+        return sorted(totais.values(), key=lambda l: (l['plano_de_contas__codigo'], l['plano_de_contas__nome']))
+
+    @classmethod
+    def totais_por_grupo(cls, empresa, data_inicio, data_fim, nivel=1, grupo=None, caixa_id=None):
+        """
+        Total por (grupo, tipo) no período, agrupado no banco pelo prefixo do caminho.
+        O grupo de cada plano é o seu ancestral no 'nivel' pedido (ou ele mesmo, se for mais raso).
+        Com 'grupo', soma apenas a subárvore dele (drill-down).
+        Devolve {(caminho_do_grupo, tipo): total}.
+        """
+        tamanho = nivel * TAMANHO_SEGMENTO
+
+        totais = {}
+        for consulta, campo in cls.consultas_periodo(empresa, data_inicio, data_fim, caixa_id):
+            consulta = consulta.filter(plano_de_contas__isnull=False)
+            if grupo:
+                consulta = consulta.filter(plano_de_contas__caminho__startswith=grupo.caminho)
+            consulta = consulta.annotate(
+                caminho_grupo=Left('plano_de_contas__caminho', tamanho)
+            ).values('caminho_grupo', 'tipo').annotate(soma=Sum(campo))
+            for linha in consulta.order_by():
+                chave = (linha['caminho_grupo'], linha['tipo'])
+                totais[chave] = totais.get(chave, 0) + linha['soma']
+        return totais
+
+    @classmethod
+    def reconstruir(cls, empresa=None):
+        """Recalcula todos os resumos a partir dos lançamentos (um único agrupamento)"""
+        lancamentos = Lancamento.objects.all()
+        resumos = cls.objects.all()
+        if empresa:
+            lancamentos = lancamentos.filter(empresa=empresa)
+            resumos = resumos.filter(empresa=empresa)
+
+        movimentos = lancamentos.annotate(mes=TruncMonth('data_lancamento')).values(
+            'empresa_id', 'caixa_id', 'plano_de_contas_id', 'tipo', 'mes'
+        ).annotate(soma=Sum('valor')).order_by()
+
+        novos = [
+            cls(empresa_id=m['empresa_id'], caixa_id=m['caixa_id'], plano_de_contas_id=m['plano_de_contas_id'],
+                tipo=m['tipo'], competencia=m['mes'], total=m['soma'])
+            for m in movimentos
+        ]
+
+        with transaction.atomic():
+            resumos.delete()
+            cls.objects.bulk_create(novos, batch_size=1000)
+        return len(novos)
+
+
+class PeriodoFechado(ValidationError):
+    """Tentativa de gravar um lançamento num mês já fechado"""
+
+
+class Fechamento(ModeloSaaS):
+    """
+    Fechamento mensal de um Caixa.
+
+    Com o mês fechado, nenhum lançamento do caixa com data naquele mês pode ser
+    criado, alterado ou excluído. O saldo e os totais por plano (TotalFechado)
+    são calculados dos lançamentos uma vez, no fechamento, e daí em diante os
+    relatórios usam esses valores. Os fechamentos de um caixa são contínuos:
+    fechar um mês fecha também os anteriores ainda abertos (ver services.fechar_periodo).
+    """
+    caixa = models.ForeignKey(Caixa, on_delete=models.PROTECT, related_name='fechamentos')
+    competencia = models.DateField(help_text="Sempre o dia 1 do mês")
+    saldo = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0,
+        help_text="Acumulado dos lançamentos até o fim do mês (sem o saldo inicial do caixa)",
+    )
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    fechado_em = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.caixa} - {self.competencia:%m/%Y}"
+
+    @property
+    def saldo_final(self):
+        """Saldo do caixa no fim do mês (com o saldo inicial do cadastro)"""
+        return self.caixa.saldo_inicial + self.saldo
+
+    class Meta:
+        verbose_name = "Fechamento"
+        verbose_name_plural = "Fechamentos"
+        ordering = ['caixa', 'competencia']
+        unique_together = [['caixa', 'competencia']]
+
+    @classmethod
+    def fechado(cls, caixa_id, data):
+        """O mês de 'data' está fechado no caixa?"""
+        if isinstance(data, str):
+            data = parse_date(data)
+        if not caixa_id or not data:
+            return False
+        return cls.objects.filter(caixa_id=caixa_id, competencia=data.replace(day=1)).exists()
+
+    @classmethod
+    def verificar(cls, caixa_id, data):
+        """Levanta PeriodoFechado se o mês de 'data' está fechado no caixa"""
+        if cls.fechado(caixa_id, data):
+            if isinstance(data, str):
+                data = parse_date(data)
+            raise PeriodoFechado(f"O mês {data:%m/%Y} está fechado neste caixa. Reabra o período para alterar.")
+
+
+class TotalFechado(ModeloSaaS):
+    """
+    Total de um mês fechado por Plano de Contas + Tipo (mesmas colunas do Resumo Mensal,
+    para os relatórios lerem os dois do mesmo jeito). Não muda depois do fechamento.
+    """
+    fechamento = models.ForeignKey(Fechamento, on_delete=models.CASCADE, related_name='totais')
+    caixa = models.ForeignKey(Caixa, on_delete=models.PROTECT, related_name='totais_fechados')
+    plano_de_contas = models.ForeignKey(PlanoDeContas, on_delete=models.PROTECT, null=True, blank=True, related_name='totais_fechados')
+    competencia = models.DateField(help_text="Sempre o dia 1 do mês")
+    tipo = models.CharField(max_length=1, choices=Lancamento.TIPO_CHOICES)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.competencia:%m/%Y} - {self.plano_de_contas} ({self.tipo}): {self.total}"
+
+    class Meta:
+        verbose_name = "Total Fechado"
+        verbose_name_plural = "Totais Fechados"
+        ordering = ['competencia']
+        indexes = [
+            # DRE: empresa + intervalo de competências (como no Resumo Mensal)
+            models.Index(fields=['empresa', 'competencia'], name='totalfech_emp_comp_idx'),
+        ]
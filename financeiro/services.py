@@ -0,0 +1,455 @@
+"""
+Operações do financeiro que não dependem de request/HTTP.
+Podem ser chamadas pelas views, por management commands ou por scripts.
+
+O projeto não depende de numpy: as contas "em vetor" (ex: projecao_fluxo) usam
+listas e itertools, já que os vetores são pequenos (um item por dia ou semana).
+"""
+import calendar
+import random
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_DOWN
+from itertools import accumulate
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from core.parametros import parametro
+from .cache import ALIAS_CACHE, invalidar_empresa, versao_empresa
+from .models import (
+    Caixa, Conta, Fechamento, Lancamento, PlanoDeContas, SaldoMensal, TotalFechado,
+    atualizar_resumos_em_lote, primeiro_dia_proximo_mes, travar_caixas,
+)
+
+CENTAVO = Decimal('0.01')
+
+
+def add_months(source_date, months):
+    """Adiciona meses a uma data corretamente (ex: 31/01 + 1 mês -> 28/02)"""
+    month = source_date.month - 1 + months
+    year = source_date.year + month // 12
+    month = month % 12 + 1
+    day = min(source_date.day, calendar.monthrange(year, month)[1])
+    return date(year, month, day)
+
+
+def calcular_parcelas(valor, qtd, taxa_juros=0):
+    """
+    Divide valor + juros (%) em 'qtd' parcelas em centavos exatos.
+    A diferença do arredondamento fica na primeira parcela, então a soma bate com o total.
+    """
+    valor_total = (valor * (1 + Decimal(taxa_juros or 0) / Decimal(100))).quantize(CENTAVO)
+    valor_parcela = (valor_total / qtd).quantize(CENTAVO, rounding=ROUND_DOWN)
+    parcelas = [valor_parcela] * qtd
+    parcelas[0] += valor_total - valor_parcela * qtd
+    return parcelas
+
+
+def gerar_parcelas(empresa, plano_de_contas, descricao, valor, data_vencimento, qtd_parcelas,
+                   taxa_juros=0, cadastro=None, observacoes='', grupo_parcela=None, batch_size=500):
+    """
+    Cria as 'qtd_parcelas' Contas mensais de um parcelamento num único INSERT em lote,
+    dentro de uma transação (ou todas as parcelas são criadas, ou nenhuma).
+    Devolve (grupo_parcela, lista de Contas).
+    """
+    # Número aleatório de 4 dígitos para agrupar as parcelas (Ex: 1234)
+    grupo_parcela = grupo_parcela or random.randint(1000, 9999)
+
+    parcelas = [
+        Conta(
+            empresa=empresa,
+            plano_de_contas=plano_de_contas,
+            cadastro=cadastro,
+            descricao=descricao,
+            observacoes=observacoes,
+            valor=valor_parcela,
+            data_vencimento=add_months(data_vencimento, i),
+            # Formata: 1234-1/3
+            documento=f"{grupo_parcela}-{i + 1}/{qtd_parcelas}",
+        )
+        for i, valor_parcela in enumerate(calcular_parcelas(valor, qtd_parcelas, taxa_juros))
+    ]
+
+    with transaction.atomic():
+        Conta.objects.bulk_create(parcelas, batch_size=batch_size)
+        transaction.on_commit(lambda: invalidar_empresa(empresa.id))
+
+    return grupo_parcela, parcelas
+
+
+def baixar_contas(empresa, conta_ids, caixa, data_pagamento, encargos_em=None):
+    """
+    Baixa em lote: cria um Lançamento por Conta pendente (INSERT em lote),
+    marca todas como PAGA (um único UPDATE) e atualiza os resumos, tudo numa transação.
+    Contas de outra empresa ou que não estejam pendentes são ignoradas.
+    Com o plano de juros em 'encargos_em', a multa e os juros das contas a receber
+    vencidas viram lançamentos à parte nesse plano (ver lancamento_encargos).
+    Devolve a lista de Lançamentos criados.
+    """
+    # bulk_create não passa pelo save() do Lançamento, que barra meses fechados
+    Fechamento.verificar(caixa.id, data_pagamento)
+
+    with transaction.atomic():
+        travar_caixas(caixa.id)
+        contas = list(
+            Conta.objects.select_for_update()
+            .filter(empresa=empresa, id__in=conta_ids, status='PENDENTE')
+            .select_related('plano_de_contas')
+        )
+
+        lancamentos = []
+        for conta in contas:
+            lancamento = Lancamento(
+                empresa=empresa,
+                caixa=caixa,
+                plano_de_contas=conta.plano_de_contas,
+                conta_origem=conta,
+                descricao=f"Baixa: {conta.descricao}",
+                data_lancamento=data_pagamento,
+                valor=conta.valor,
+                # R (Receita) -> C (Crédito) / D (Despesa) -> D (Débito)
+                tipo='C' if conta.plano_de_contas.tipo == 'R' else 'D',
+            )
+            # bulk_create não chama o save(): aplica aqui a mesma regra de sinal
+            lancamento.ajustar_sinal()
+            lancamentos.append(lancamento)
+
+            encargos = lancamento_encargos(conta, caixa, data_pagamento, encargos_em) if encargos_em else None
+            if encargos:
+                encargos.ajustar_sinal()
+                lancamentos.append(encargos)
+
+        Lancamento.objects.bulk_create(lancamentos, batch_size=500)
+        Conta.objects.filter(id__in=[c.id for c in contas]).update(status='PAGA')
+        atualizar_resumos_em_lote(lancamentos)
+        transaction.on_commit(lambda: invalidar_empresa(empresa.id))
+
+    return lancamentos
+
+
+# ==================================================
+# FECHAMENTO MENSAL
+# ==================================================
+
+def fechar_periodo(empresa, caixa, competencia, usuario=None):
+    """
+    Fecha o mês 'competencia' do caixa e todos os meses anteriores ainda abertos
+    (desde o último fechamento ou, no primeiro, desde o primeiro lançamento do caixa).
+    Grava o saldo de cada mês e os totais por plano, somados direto dos lançamentos.
+    Só fecha meses que já terminaram. Devolve a lista de Fechamentos criados.
+    """
+    competencia = competencia.replace(day=1)
+    if competencia >= date.today().replace(day=1):
+        raise ValueError("Só é possível fechar meses já encerrados.")
+
+    with transaction.atomic():
+        # Trava o caixa: dois fechamentos simultâneos não calculam o mesmo mês
+        Caixa.objects.select_for_update().filter(pk=caixa.pk).first()
+        lancamentos = Lancamento.objects.filter(empresa=empresa, caixa=caixa)
+
+        ultimo = Fechamento.objects.filter(caixa=caixa).order_by('-competencia').first()
+        if ultimo:
+            inicio = primeiro_dia_proximo_mes(ultimo.competencia)
+            acumulado = ultimo.saldo
+        else:
+            primeiro = lancamentos.order_by('data_lancamento').values_list('data_lancamento', flat=True).first()
+            inicio = min(primeiro.replace(day=1), competencia) if primeiro else competencia
+            acumulado = Decimal(0)
+        if inicio > competencia:
+            return []
+
+        fim = primeiro_dia_proximo_mes(competencia)
+        if not ultimo:
+            # Lançamentos de antes do primeiro mês fechado também entram no saldo
+            acumulado += lancamentos.filter(data_lancamento__lt=inicio).aggregate(Sum('valor'))['valor__sum'] or 0
+
+        # Uma consulta para todos os meses: (mês, plano, tipo) -> total
+        totais = lancamentos.filter(data_lancamento__gte=inicio, data_lancamento__lt=fim).annotate(
+            mes=TruncMonth('data_lancamento')
+        ).values('mes', 'plano_de_contas_id', 'tipo').annotate(soma=Sum('valor')).order_by()
+        por_mes = {}
+        for linha in totais:
+            por_mes.setdefault(linha['mes'], []).append(linha)
+
+        fechamentos, linhas_totais = [], []
+        mes = inicio
+        while mes < fim:
+            do_mes = por_mes.get(mes, [])
+            acumulado += sum(linha['soma'] for linha in do_mes)
+            # Um INSERT por mês: os totais precisam do ID (o bulk_create do MySQL não o devolve)
+            fechamento = Fechamento.objects.create(
+                empresa=empresa, caixa=caixa, competencia=mes, saldo=acumulado, usuario=usuario,
+            )
+            fechamentos.append(fechamento)
+            linhas_totais += [
+                TotalFechado(
+                    empresa=empresa, fechamento=fechamento, caixa=caixa, competencia=mes,
+                    plano_de_contas_id=linha['plano_de_contas_id'], tipo=linha['tipo'], total=linha['soma'],
+                )
+                for linha in do_mes
+            ]
+            mes = primeiro_dia_proximo_mes(mes)
+
+        TotalFechado.objects.bulk_create(linhas_totais, batch_size=500)
+        transaction.on_commit(lambda: invalidar_empresa(empresa.id))
+
+    return fechamentos
+
+
+def reabrir_periodo(empresa, caixa):
+    """Reabre o último mês fechado do caixa. Devolve a competência reaberta (ou None)"""
+    with transaction.atomic():
+        ultimo = Fechamento.objects.select_for_update().filter(
+            empresa=empresa, caixa=caixa
+        ).order_by('-competencia').first()
+        if not ultimo:
+            return None
+        ultimo.delete()
+        transaction.on_commit(lambda: invalidar_empresa(empresa.id))
+    return ultimo.competencia
+
+
+# ==================================================
+# JUROS E MULTA POR ATRASO
+# ==================================================
+
+def parametros_encargos(empresa):
+    """(taxa de juros mensal %, multa %) configuradas nos Parâmetros do Sistema"""
+    return (
+        parametro(empresa, 'TAXA_JUROS_MENSAL', Decimal(0)),
+        parametro(empresa, 'PERCENTUAL_MULTA', Decimal(0)),
+    )
+
+
+def calcular_encargos(valor, vencimento, data, taxa_mensal, percentual_multa):
+    """
+    (multa, juros) de uma conta paga em 'data': multa fixa sobre o valor e juros
+    simples pro rata dia (taxa mensal / 30 por dia de atraso), em centavos.
+    """
+    dias = (data - vencimento).days
+    if dias <= 0:
+        return Decimal(0), Decimal(0)
+    multa = (valor * percentual_multa / 100).quantize(CENTAVO)
+    juros = (valor * taxa_mensal * dias / 3000).quantize(CENTAVO)
+    return multa, juros
+
+
+def encargos_atraso(empresa, hoje=None):
+    """
+    Multa e juros de hoje de todas as contas a receber vencidas: {conta_id: (multa, juros)}.
+
+    Uma consulta e um laço sobre as vencidas. O cálculo fica em Python de propósito,
+    e não numa expressão anotada na consulta: os valores precisam bater centavo a
+    centavo com os da baixa (calcular_encargos, arredondamento do Decimal), e a
+    diferença de datas e o ROUND mudam de um banco para outro.
+
+    O resultado fica no cache dos relatórios até virar o dia: a chave leva a data,
+    as taxas e a versão dos dados da empresa, então editar uma conta ou um
+    parâmetro também recalcula.
+    """
+    hoje = hoje or date.today()
+    empresa_id = getattr(empresa, 'pk', empresa)
+    taxa_mensal, percentual_multa = parametros_encargos(empresa)
+    if not taxa_mensal and not percentual_multa:
+        return {}
+
+    cache = caches[ALIAS_CACHE]
+    chave = f"encargos:{empresa_id}:{versao_empresa(empresa_id)}:{hoje.isoformat()}:{taxa_mensal}:{percentual_multa}"
+    encargos = cache.get(chave)
+    if encargos is None:
+        vencidas = Conta.objects.filter(
+            empresa_id=empresa_id, status='PENDENTE', data_vencimento__lt=hoje, plano_de_contas__tipo='R',
+        ).values_list('id', 'valor', 'data_vencimento')
+        encargos = {
+            conta_id: calcular_encargos(valor, vencimento, hoje, taxa_mensal, percentual_multa)
+            for conta_id, valor, vencimento in vencidas
+        }
+        cache.set(chave, encargos, timeout=24 * 60 * 60)
+    return encargos
+
+
+def plano_juros(empresa):
+    """Plano de contas dos juros/multa (parâmetro PLANO_CONTAS_JUROS_ID), ou None"""
+    plano_id = parametro(empresa, 'PLANO_CONTAS_JUROS_ID')
+    return PlanoDeContas.objects.filter(empresa=empresa, id=plano_id).first() if plano_id else None
+
+
+def lancamento_encargos(conta, caixa, data_pagamento, plano):
+    """
+    Lançamento (ainda não gravado) com a multa e os juros da conta paga em 'data_pagamento',
+    no plano de juros. None se a conta não é a receber ou não tem encargos nessa data.
+    """
+    if conta.plano_de_contas.tipo != 'R':
+        return None
+
+    multa, juros = calcular_encargos(
+        conta.valor, conta.data_vencimento, data_pagamento, *parametros_encargos(conta.empresa_id)
+    )
+    if not multa + juros:
+        return None
+    return Lancamento(
+        empresa_id=conta.empresa_id,
+        caixa=caixa,
+        plano_de_contas=plano,
+        descricao=f"Juros/Multa: {conta.descricao}",
+        data_lancamento=data_pagamento,
+        valor=multa + juros,
+        tipo='C',
+    )
+
+
+# Faixas do aging: (campo, rótulo, atraso maior que 'de' dias, até 'ate' dias). None = sem limite
+FAIXAS_AGING = [
+    ('a_vencer', 'A vencer', None, 0),
+    ('dias_0_30', '0–30 dias', 0, 30),
+    ('dias_31_60', '31–60 dias', 30, 60),
+    ('dias_61_90', '61–90 dias', 60, 90),
+    ('dias_90', '+90 dias', 90, None),
+]
+
+# Colunas de agrupamento do aging
+AGRUPAMENTOS_AGING = {
+    'cadastro': ('cadastro_id', 'cadastro__nome'),
+    'plano': ('plano_de_contas_id', 'plano_de_contas__codigo', 'plano_de_contas__nome'),
+}
+
+
+def filtros_aging(hoje):
+    """
+    Filtro de vencimento de cada faixa. Atraso = hoje - vencimento, então cada faixa
+    é um intervalo de datas (sem calcular dias linha a linha no banco).
+    """
+    filtros = {}
+    for campo, _, de, ate in FAIXAS_AGING:
+        filtro = Q()
+        if de is not None:
+            filtro &= Q(data_vencimento__lt=hoje - timedelta(days=de))
+        if ate is not None:
+            filtro &= Q(data_vencimento__gte=hoje - timedelta(days=ate))
+        filtros[campo] = filtro
+    return filtros
+
+
+def aging_contas(empresa, tipo_plano, agrupar_por='cadastro', hoje=None):
+    """
+    Contas pendentes (R ou D) por faixa de atraso, agrupadas por cadastro ou por plano.
+    Uma única consulta com agregação condicional sobre (empresa, status, vencimento).
+    Devolve (linhas, totais); cada linha tem os campos do agrupamento, as faixas,
+    'total' e 'quantidade'.
+    """
+    hoje = hoje or date.today()
+    faixas = {
+        campo: Sum('valor', filter=filtro, default=0)
+        for campo, filtro in filtros_aging(hoje).items()
+    }
+    linhas = list(
+        Conta.objects.filter(empresa=empresa, status='PENDENTE', plano_de_contas__tipo=tipo_plano)
+        .values(*AGRUPAMENTOS_AGING[agrupar_por])
+        .annotate(**faixas, total=Sum('valor'), quantidade=Count('id'))
+        .order_by('-total')
+    )
+
+    totais = {campo: sum(linha[campo] for linha in linhas) for campo in [*faixas, 'total', 'quantidade']}
+    return linhas, totais
+
+
+# Tamanho (em dias) de cada período da projeção
+PERIODOS_PROJECAO = {'dia': 1, 'semana': 7}
+
+
+def projecao_fluxo(empresa, meses=3, periodo='dia', hoje=None, caixa_contas_id=None):
+    """
+    Saldo projetado dos caixas de hoje até 'meses' à frente, por dia ou por semana.
+
+    Parte do saldo de cada caixa antes de hoje e soma, em cada período, os lançamentos
+    já gravados (com data de hoje em diante) e as contas pendentes pelo vencimento.
+    A conta não tem caixa: as contas entram no caixa 'caixa_contas_id' (o caixa padrão)
+    ou, sem ele, numa coluna à parte. Contas vencidas entram no primeiro período.
+
+    São três consultas agrupadas por dia (saldo anterior, lançamentos, contas); depois
+    cada coluna vira um vetor de movimentos por período e o saldo é a soma acumulada dele.
+    Os vetores são listas de Decimal com no máximo 366 posições (um ano por dia):
+    o trabalho pesado fica nas consultas, e numpy só trocaria Decimal por float.
+    """
+    hoje = hoje or date.today()
+    fim = add_months(hoje, meses)
+    passo = PERIODOS_PROJECAO[periodo]
+    quantidade = ((fim - hoje).days + passo - 1) // passo
+
+    def indice(dia):
+        # Vencidas (antes de hoje) caem no primeiro período
+        return max((dia - hoje).days, 0) // passo
+
+    caixas = list(Caixa.objects.filter(empresa=empresa).order_by('nome').values('id', 'nome', 'saldo_inicial'))
+    anteriores = SaldoMensal.movimento_anterior_por_caixa(empresa, hoje)
+    colunas = [
+        {'caixa_id': c['id'], 'nome': c['nome'], 'saldo_atual': c['saldo_inicial'] + anteriores.get(c['id'], 0)}
+        for c in caixas
+    ]
+    movimentos = {c['id']: [Decimal(0)] * quantidade for c in caixas}
+
+    agendados = [Decimal(0)] * quantidade
+    lancamentos = Lancamento.objects.filter(
+        empresa=empresa, data_lancamento__gte=hoje, data_lancamento__lt=fim,
+    ).values('caixa_id', 'data_lancamento').annotate(soma=Sum('valor')).order_by()
+    for linha in lancamentos:
+        i = indice(linha['data_lancamento'])
+        movimentos[linha['caixa_id']][i] += linha['soma']
+        agendados[i] += linha['soma']
+
+    receber = [Decimal(0)] * quantidade
+    pagar = [Decimal(0)] * quantidade
+    atrasadas = {'receber': Decimal(0), 'pagar': Decimal(0)}
+    contas = Conta.objects.filter(
+        empresa=empresa, status='PENDENTE', data_vencimento__lt=fim,
+    ).values('data_vencimento').annotate(
+        receber=Sum('valor', filter=Q(plano_de_contas__tipo='R'), default=0),
+        pagar=Sum('valor', filter=Q(plano_de_contas__tipo='D'), default=0),
+    ).order_by()
+    for linha in contas:
+        i = indice(linha['data_vencimento'])
+        receber[i] += linha['receber']
+        pagar[i] += linha['pagar']
+        if linha['data_vencimento'] < hoje:
+            atrasadas['receber'] += linha['receber']
+            atrasadas['pagar'] += linha['pagar']
+
+    saldo_contas = [r - p for r, p in zip(receber, pagar)]
+    if caixa_contas_id in movimentos:
+        movimentos[caixa_contas_id] = [m + c for m, c in zip(movimentos[caixa_contas_id], saldo_contas)]
+    else:
+        colunas.append({'caixa_id': None, 'nome': 'Contas (sem caixa)', 'saldo_atual': Decimal(0)})
+        movimentos[None] = saldo_contas
+
+    # Saldo de cada coluna em cada período = saldo atual + movimentos acumulados
+    saldos = [
+        list(accumulate(movimentos[coluna['caixa_id']], initial=coluna['saldo_atual']))[1:]
+        for coluna in colunas
+    ]
+    totais = [sum(valores) for valores in zip(*saldos)]
+
+    periodos = []
+    for i in range(quantidade):
+        inicio = hoje + timedelta(days=i * passo)
+        periodos.append({
+            'inicio': inicio,
+            'fim': min(inicio + timedelta(days=passo - 1), fim - timedelta(days=1)),
+            'receber': receber[i],
+            'pagar': pagar[i],
+            'agendados': agendados[i],
+            'saldos': [coluna[i] for coluna in saldos],
+            'saldo': totais[i],
+        })
+
+    return {
+        'hoje': hoje,
+        'fim': fim - timedelta(days=1),
+        'colunas': colunas,
+        'periodos': periodos,
+        'atrasadas': atrasadas,
+        'saldo_atual': sum(coluna['saldo_atual'] for coluna in colunas),
+        'saldo_final': totais[-1] if totais else Decimal(0),
+        'menor_saldo': min(periodos, key=lambda p: p['saldo']) if periodos else None,
+    }
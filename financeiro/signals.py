@@ -0,0 +1,39 @@
+"""
+Invalida o cache de relatórios da empresa a cada gravação nos dados financeiros.
+Gravações em massa (bulk_create/update) não disparam sinais: quem as faz
+chama cache.invalidar_empresa() diretamente (ver services.py).
+
+Também mantém o ResumoMensal ao excluir um plano de contas (inclusive pelo admin).
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from cadastros.models import Cadastro
+from core.models import ParametroSistema
+from .cache import invalidar_empresa
+from .models import Caixa, Conta, Lancamento, PlanoDeContas, ResumoMensal
+
+# Cadastro (nome no relatório de contas) e ParametroSistema (caixa padrão do fluxo)
+# também aparecem nos relatórios
+MODELOS_RELATORIOS = (Lancamento, Conta, Caixa, PlanoDeContas, Cadastro, ParametroSistema)
+
+
+def invalidar_relatorios(sender, instance, **kwargs):
+    if instance.empresa_id:
+        # Só depois do commit: antes disso outra requisição ainda leria os dados antigos
+        # e os guardaria já com a versão nova
+        empresa_id = instance.empresa_id
+        transaction.on_commit(lambda: invalidar_empresa(empresa_id))
+
+
+# Um receptor por modelo: sem sender, o sinal rodaria a cada save de qualquer model do projeto
+for modelo in MODELOS_RELATORIOS:
+    post_save.connect(invalidar_relatorios, sender=modelo, dispatch_uid=f'invalidar_relatorios_save_{modelo._meta.label}')
+    post_delete.connect(invalidar_relatorios, sender=modelo, dispatch_uid=f'invalidar_relatorios_delete_{modelo._meta.label}')
+
+
+@receiver(pre_delete, sender=PlanoDeContas, dispatch_uid='resumos_do_plano_excluido')
+def transferir_resumos_do_plano(sender, instance, **kwargs):
+    # Na mesma transação da exclusão: os lançamentos do plano ficam com plano NULL
+    ResumoMensal.transferir_para_sem_plano(instance.pk)
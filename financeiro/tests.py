@@ -1,3 +1,1166 @@
-from django.test import TestCase
+import importlib.util
+import json
+import re
+import sys
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from cadastros.models import Cadastro
+from core.models import Empresa, ParametroSistema, Usuario
+from core.parametros import invalidar_parametros
+from . import exportacao, services, views
+from .cache import versao_empresa
+from .forms import PlanoContasForm
+from .models import Caixa, Conta, Fechamento, Lancamento, PeriodoFechado, PlanoDeContas, ResumoMensal, SaldoMensal
+
+# Tabelas que crescem com o uso: nenhuma consulta das telas pode varrê-las inteiras
+TABELAS_MONITORADAS = (
+    'financeiro_lancamento',
+    'financeiro_conta',
+    'financeiro_resumomensal',
+    'financeiro_saldomensal',
+)
+
+# Nestas, quando a tela tem filtro de período/status, também não basta o índice só da empresa
+# (seria ler todo o histórico da empresa). O Saldo Mensal fica de fora: tem uma linha por caixa/mês.
+TABELAS_COM_FILTRO = (
+    'financeiro_lancamento',
+    'financeiro_conta',
+    'financeiro_resumomensal',
+)
+
+
+def acessos_ruins(sql, params, alem_da_empresa):
+    """
+    Tabelas monitoradas que o plano da consulta lê por inteiro (full scan) ou,
+    com alem_da_empresa=True, só pelo índice de empresa.
+    """
+    encontradas = []
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            for linha in cursor.fetchall():
+                detalhe = linha[-1]
+                for tabela in TABELAS_MONITORADAS:
+                    # "SCAN tabela" sem "USING ... INDEX" = leitura da tabela inteira
+                    if re.fullmatch(rf'SCAN {tabela}( AS \S+)?', detalhe):
+                        encontradas.append(tabela)
+                    elif (alem_da_empresa and tabela in TABELAS_COM_FILTRO
+                            and re.match(rf'SEARCH {tabela} .*\(empresa_id=\?\)$', detalhe)):
+                        encontradas.append(tabela)
+            return encontradas
+
+        cursor.execute('EXPLAIN FORMAT=JSON ' + sql, params)
+        plano = json.loads(cursor.fetchone()[0])
+
+    def percorrer(no):
+        if isinstance(no, dict):
+            tabela = no.get('table_name')
+            if tabela in TABELAS_MONITORADAS:
+                if no.get('access_type') == 'ALL':
+                    encontradas.append(tabela)
+                elif alem_da_empresa and tabela in TABELAS_COM_FILTRO and no.get('used_key_parts') == ['empresa_id']:
+                    encontradas.append(tabela)
+            for valor in no.values():
+                percorrer(valor)
+        elif isinstance(no, list):
+            for valor in no:
+                percorrer(valor)
+
+    percorrer(plano)
+    return encontradas
+
+
+class PlanoDeConsultaTests(TestCase):
+    """
+    Abre as telas mais usadas, captura as consultas que elas fazem e roda EXPLAIN em cada uma.
+    Falha se alguma consulta voltar a ler Lançamentos/Contas/Resumos inteiros (índice perdido).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        hoje = date.today()
+        for nome in ('Empresa A', 'Empresa B'):
+            empresa = Empresa.objects.create(nome=nome, cnpj=nome)
+            caixa = Caixa.objects.create(empresa=empresa, nome='Banco', saldo_inicial=0)
+            receita = PlanoDeContas.objects.create(empresa=empresa, nome='Mensalidade', tipo='R', codigo='01')
+            despesa = PlanoDeContas.objects.create(empresa=empresa, nome='Luz', tipo='D', codigo='02')
+            cadastro = Cadastro.objects.create(empresa=empresa, nome='Cliente', cpf_cnpj=f'{empresa.id}')
+            for i in range(30):
+                dia = hoje - timedelta(days=i * 15)
+                Lancamento(
+                    empresa=empresa, caixa=caixa, plano_de_contas=receita if i % 2 else despesa,
+                    descricao='Lançamento', valor=Decimal('10.00'), tipo='C' if i % 2 else 'D',
+                    data_lancamento=dia,
+                ).save()
+                Conta.objects.create(
+                    empresa=empresa, descricao='Conta', plano_de_contas=receita if i % 2 else despesa,
+                    cadastro=cadastro, valor=Decimal('10.00'), data_vencimento=dia + timedelta(days=30),
+                    status='PENDENTE' if i % 3 else 'PAGA',
+                )
+        cls.empresa = empresa
+        cls.caixa = caixa
+        cls.receita = receita
+        cls.usuario = Usuario.objects.create_user('plano', password='x', empresa=empresa)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        # Relatório vindo do cache não consulta o banco
+        caches['relatorios'].clear()
+
+    def assertSemVarreduraCompleta(self, url, alem_da_empresa=True):
+        consultas = []
+
+        def capturar(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                consultas.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capturar):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+
+        for sql, params in consultas:
+            tabelas = acessos_ruins(sql, params, alem_da_empresa)
+            self.assertFalse(tabelas, f"{url}: varredura em {tabelas}\n{sql}")
+
+    def test_fluxo_caixa(self):
+        inicio = (date.today() - timedelta(days=90)).isoformat()
+        self.assertSemVarreduraCompleta('/financeiro/fluxo/')
+        self.assertSemVarreduraCompleta(f'/financeiro/fluxo/?data_inicio={inicio}&caixa={self.caixa.id}')
+        self.assertSemVarreduraCompleta(f'/financeiro/fluxo/?data_inicio={inicio}&categoria={self.receita.id}')
+
+    def test_listas_de_contas(self):
+        # Sem filtros, os totais do rodapé somam todas as contas da empresa
+        self.assertSemVarreduraCompleta('/financeiro/contas/receber/', alem_da_empresa=False)
+        self.assertSemVarreduraCompleta('/financeiro/contas/pagar/?status=ATRASADA')
+        self.assertSemVarreduraCompleta('/financeiro/contas/receber/?status=PAGA&data_ini=2020-01-01&data_fim=2100-01-01')
+
+    def test_dashboard(self):
+        self.assertSemVarreduraCompleta('/dashboard/')
+
+    def test_aging(self):
+        self.assertSemVarreduraCompleta('/financeiro/contas/aging/')
+        self.assertSemVarreduraCompleta('/financeiro/contas/aging/?tipo_lista=pagar&agrupar=plano')
+
+    def test_projecao(self):
+        self.assertSemVarreduraCompleta('/financeiro/fluxo/projecao/')
+        self.assertSemVarreduraCompleta('/financeiro/fluxo/projecao/?meses=12&periodo=semana')
+
+    @override_settings(RELATORIO_DIAS_SINCRONO=None)  # Aqui interessa a consulta, não a fila
+    def test_dre(self):
+        inicio = (date.today() - timedelta(days=200)).isoformat()
+        self.assertSemVarreduraCompleta(f'/financeiro/relatorios/dre/?data_inicio={inicio}')
+        self.assertSemVarreduraCompleta(f'/financeiro/relatorios/dre/sintetico/?data_inicio={inicio}')
+
+
+class ContaFormAutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        cls.usuario = Usuario.objects.create_user('a', password='x', empresa=cls.empresa)
+        cls.plano = PlanoDeContas.objects.create(empresa=cls.empresa, nome='Mensalidade', tipo='R', codigo='01')
+        cls.cadastros = Cadastro.criar_em_lote([
+            Cadastro(empresa=cls.empresa, nome=f"Cliente {i}", cpf_cnpj=str(i)) for i in range(50)
+        ])
+        cls.conta = Conta.objects.create(
+            empresa=cls.empresa, descricao='Conta', plano_de_contas=cls.plano, cadastro=cls.cadastros[7],
+            valor=Decimal('10.00'), data_vencimento=date.today(),
+        )
+
+    def test_so_a_opcao_selecionada_vai_no_html(self):
+        self.client.force_login(self.usuario)
+        response = self.client.get(f'/financeiro/contas/editar/{self.conta.id}/')
+        html = response.content.decode()
+        self.assertIn('data-autocomplete-url="/cadastros/autocomplete/?tipo=R"', html)
+        self.assertIn('Cliente 7</option>', html)
+        self.assertNotIn('Cliente 8</option>', html)
+
+    def test_valor_enviado_continua_validado(self):
+        from .forms import ContaForm
+        outra = Empresa.objects.create(nome="B", cnpj="B")
+        estranho = Cadastro.objects.create(empresa=outra, nome="Outro", cpf_cnpj="1")
+        form = ContaForm({
+            'descricao': 'x', 'plano_de_contas': self.plano.id, 'cadastro': estranho.id,
+            'valor': '10', 'data_vencimento': '2026-01-01',
+        }, user=self.usuario, tipo_filtro='R')
+        self.assertIn('cadastro', form.errors)
+
+
+class RelatoriosAssincronosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        cls.usuario = Usuario.objects.create_user('a', password='x', empresa=cls.empresa)
+        caixa = Caixa.objects.create(empresa=cls.empresa, nome='Banco', saldo_inicial=Decimal('50.00'))
+        plano = PlanoDeContas.objects.create(empresa=cls.empresa, nome='Mensalidade', tipo='R', codigo='01')
+        cadastro = Cadastro.objects.create(empresa=cls.empresa, nome='Cliente', cpf_cnpj='1')
+        for i in range(6):
+            dia = date.today() - timedelta(days=i * 20)
+            Lancamento(
+                empresa=cls.empresa, caixa=caixa, plano_de_contas=plano, descricao='L',
+                valor=Decimal('10.00') if i % 2 else Decimal('-4.00'), tipo='C' if i % 2 else 'D',
+                data_lancamento=dia,
+            ).save()
+            Conta.objects.create(empresa=cls.empresa, descricao='Conta', plano_de_contas=plano,
+                                 cadastro=cadastro, valor=Decimal('10.00'), data_vencimento=dia)
+
+    def setUp(self):
+        caches['relatorios'].clear()
+
+    async def test_mesmo_resultado_da_versao_sincrona(self):
+        await self.async_client.aforce_login(self.usuario)
+        inicio = (date.today() - timedelta(days=70)).isoformat()
+        casos = (
+            ('/financeiro/fluxo/relatorio/', {'data_inicio': inicio},
+             ('saldo_anterior', 'total_receitas', 'total_despesas', 'saldo_final')),
+            ('/financeiro/contas/relatorio/', {'tipo_lista': 'receber'}, ('total_valor', 'titulo_relatorio')),
+        )
+        for url, params, chaves in casos:
+            sincrono = await self.async_client.get(url, params)
+            # 'v' muda a chave do cache: sem ele a versão async devolveria o HTML da síncrona
+            assincrono = await self.async_client.get(url + 'async/', {**params, 'v': 'async'})
+            self.assertEqual(assincrono.status_code, 200)
+            for chave in chaves:
+                self.assertEqual(assincrono.context[chave], sincrono.context[chave], f"{url} {chave}")
+
+
+class AgingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        cls.hoje = date(2025, 6, 30)
+        receita = PlanoDeContas.objects.create(empresa=cls.empresa, nome='Mensalidade', tipo='R', codigo='01')
+        outra = PlanoDeContas.objects.create(empresa=cls.empresa, nome='Eventos', tipo='R', codigo='02')
+        despesa = PlanoDeContas.objects.create(empresa=cls.empresa, nome='Luz', tipo='D', codigo='03')
+        cls.ana = Cadastro.objects.create(empresa=cls.empresa, nome='Ana', cpf_cnpj='1')
+        cls.bia = Cadastro.objects.create(empresa=cls.empresa, nome='Bia', cpf_cnpj='2')
+
+        # (dias de atraso, valor, cadastro, plano, status)
+        for atraso, valor, cadastro, plano, status in [
+            (-5, '1', cls.ana, receita, 'PENDENTE'),     # a vencer
+            (0, '2', cls.ana, receita, 'PENDENTE'),      # vence hoje: a vencer
+            (1, '4', cls.ana, outra, 'PENDENTE'),        # 0-30
+            (30, '8', cls.ana, receita, 'PENDENTE'),     # 0-30
+            (31, '16', cls.bia, receita, 'PENDENTE'),    # 31-60
+            (90, '32', cls.bia, outra, 'PENDENTE'),      # 61-90
+            (91, '64', None, receita, 'PENDENTE'),       # +90
+            (200, '128', cls.bia, receita, 'PAGA'),      # baixada: fora
+            (10, '256', cls.ana, despesa, 'PENDENTE'),   # a pagar: fora
+        ]:
+            Conta.objects.create(
+                empresa=cls.empresa, descricao='Conta', plano_de_contas=plano, cadastro=cadastro,
+                valor=Decimal(valor), data_vencimento=cls.hoje - timedelta(days=atraso), status=status,
+            )
+
+    def test_faixas_por_cadastro_numa_consulta(self):
+        with CaptureQueriesContext(connection) as consultas:
+            linhas, totais = services.aging_contas(self.empresa, 'R', hoje=self.hoje)
+        self.assertEqual(len(consultas), 1)
+
+        faixas = ['a_vencer', 'dias_0_30', 'dias_31_60', 'dias_61_90', 'dias_90']
+        por_nome = {l['cadastro__nome']: [l[f] for f in faixas] + [l['total'], l['quantidade']] for l in linhas}
+        self.assertEqual(por_nome, {
+            'Ana': [3, 12, 0, 0, 0, 15, 4],
+            'Bia': [0, 0, 16, 32, 0, 48, 2],
+            None: [0, 0, 0, 0, 64, 64, 1],
+        })
+        self.assertEqual([totais[f] for f in faixas] + [totais['total']], [3, 12, 16, 32, 64, 127])
+        # Maior total primeiro
+        self.assertEqual([l['cadastro__nome'] for l in linhas], [None, 'Bia', 'Ana'])
+
+    def test_por_plano_e_a_pagar(self):
+        linhas, _ = services.aging_contas(self.empresa, 'R', agrupar_por='plano', hoje=self.hoje)
+        self.assertEqual({l['plano_de_contas__nome']: l['total'] for l in linhas}, {'Mensalidade': 91, 'Eventos': 36})
+
+        linhas, totais = services.aging_contas(self.empresa, 'D', hoje=self.hoje)
+        self.assertEqual((totais['dias_0_30'], totais['total']), (256, 256))
+
+
+class ProjecaoFluxoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        cls.hoje = date(2025, 6, 10)
+        cls.banco = Caixa.objects.create(empresa=cls.empresa, nome='Banco', saldo_inicial=100)
+        cls.cofre = Caixa.objects.create(empresa=cls.empresa, nome='Cofre', saldo_inicial=50)
+        receita = PlanoDeContas.objects.create(empresa=cls.empresa, nome='Mensalidade', tipo='R', codigo='01')
+        despesa = PlanoDeContas.objects.create(empresa=cls.empresa, nome='Luz', tipo='D', codigo='02')
+
+        # (caixa, dia, valor, tipo): dois realizados e um já lançado para depois de hoje
+        for caixa, dia, valor, tipo in [
+            (cls.banco, date(2025, 5, 20), '20', 'D'),
+            (cls.cofre, date(2025, 6, 1), '30', 'C'),
+            (cls.banco, date(2025, 6, 12), '40', 'C'),
+        ]:
+            Lancamento(
+                empresa=cls.empresa, caixa=caixa, plano_de_contas=receita if tipo == 'C' else despesa,
+                descricao='Lançamento', valor=Decimal(valor), tipo=tipo, data_lancamento=dia,
+            ).save()
+
+        # (vencimento, valor, plano, status)
+        for dia, valor, plano, status in [
+            (date(2025, 6, 1), '10', receita, 'PENDENTE'),   # vencida: entra hoje
+            (date(2025, 6, 10), '5', receita, 'PENDENTE'),
+            (date(2025, 6, 17), '7', despesa, 'PENDENTE'),
+            (date(2025, 10, 1), '1000', receita, 'PENDENTE'),  # depois do horizonte
+            (date(2025, 6, 11), '999', receita, 'PAGA'),
+        ]:
+            Conta.objects.create(
+                empresa=cls.empresa, descricao='Conta', plano_de_contas=plano,
+                valor=Decimal(valor), data_vencimento=dia, status=status,
+            )
+
+    def test_saldo_por_dia_com_contas_em_coluna_propria(self):
+        with self.assertNumQueries(5):
+            projecao = services.projecao_fluxo(self.empresa, hoje=self.hoje)
+
+        self.assertEqual([c['nome'] for c in projecao['colunas']], ['Banco', 'Cofre', 'Contas (sem caixa)'])
+        self.assertEqual(projecao['saldo_atual'], 160)
+        self.assertEqual(projecao['atrasadas'], {'receber': 10, 'pagar': 0})
+
+        periodos = projecao['periodos']
+        self.assertEqual(len(periodos), 92)
+        self.assertEqual((periodos[0]['receber'], periodos[0]['saldos']), (15, [80, 80, 15]))
+        self.assertEqual((periodos[2]['agendados'], periodos[2]['saldo']), (40, 215))
+        self.assertEqual((periodos[7]['pagar'], periodos[7]['saldos']), (7, [120, 80, 8]))
+        self.assertEqual(projecao['saldo_final'], 208)
+        self.assertEqual(projecao['menor_saldo']['inicio'], self.hoje)
+
+    def test_por_semana_no_caixa_padrao(self):
+        projecao = services.projecao_fluxo(
+            self.empresa, periodo='semana', hoje=self.hoje, caixa_contas_id=self.banco.id,
+        )
+        self.assertEqual([c['nome'] for c in projecao['colunas']], ['Banco', 'Cofre'])
+
+        primeira, segunda = projecao['periodos'][:2]
+        self.assertEqual((primeira['inicio'], primeira['fim']), (self.hoje, date(2025, 6, 16)))
+        self.assertEqual(primeira['saldos'], [135, 80])
+        self.assertEqual(segunda['saldos'], [128, 80])
+        self.assertEqual(projecao['periodos'][-1]['fim'], date(2025, 9, 9))
+        self.assertEqual(projecao['saldo_final'], 208)
+
+
+class EncargosAtrasoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        cls.caixa = Caixa.objects.create(empresa=cls.empresa, nome='Banco', saldo_inicial=0)
+        cls.receita = PlanoDeContas.objects.create(empresa=cls.empresa, nome='Mensalidade', tipo='R', codigo='01')
+        cls.despesa = PlanoDeContas.objects.create(empresa=cls.empresa, nome='Luz', tipo='D', codigo='02')
+        cls.juros = PlanoDeContas.objects.create(empresa=cls.empresa, nome='Juros', tipo='R', codigo='03')
+        for chave, valor in [('TAXA_JUROS_MENSAL', '3'), ('PERCENTUAL_MULTA', '2'), ('PLANO_CONTAS_JUROS_ID', cls.juros.id)]:
+            ParametroSistema.objects.create(empresa=cls.empresa, chave=chave, valor=str(valor))
+        cls.usuario = Usuario.objects.create_user('encargos', password='x', empresa=cls.empresa)
+
+        hoje = date.today()
+        cls.vencida = cls.criar_conta(cls.receita, hoje - timedelta(days=30))
+        cls.a_vencer = cls.criar_conta(cls.receita, hoje + timedelta(days=5))
+        cls.a_pagar = cls.criar_conta(cls.despesa, hoje - timedelta(days=30))
+
+    @classmethod
+    def criar_conta(cls, plano, vencimento):
+        return Conta.objects.create(
+            empresa=cls.empresa, descricao='Conta', plano_de_contas=plano,
+            valor=Decimal('100.00'), data_vencimento=vencimento,
+        )
+
+    def setUp(self):
+        invalidar_parametros(self.empresa.id)
+        caches['relatorios'].clear()
+        self.client.force_login(self.usuario)
+
+    def test_calculo_pro_rata(self):
+        vencimento = date(2025, 1, 10)
+        self.assertEqual(
+            services.calcular_encargos(Decimal('100'), vencimento, date(2025, 2, 9), Decimal('3'), Decimal('2')),
+            (Decimal('2.00'), Decimal('3.00')),
+        )
+        self.assertEqual(
+            services.calcular_encargos(Decimal('100'), vencimento, date(2025, 1, 11), Decimal('3'), Decimal('2')),
+            (Decimal('2.00'), Decimal('0.10')),
+        )
+        self.assertEqual(
+            services.calcular_encargos(Decimal('100'), vencimento, vencimento, Decimal('3'), Decimal('2')),
+            (0, 0),
+        )
+
+    def test_todas_as_vencidas_numa_consulta_e_em_cache(self):
+        services.parametros_encargos(self.empresa)
+        with self.assertNumQueries(1):
+            encargos = services.encargos_atraso(self.empresa)
+        # Só a conta a receber vencida
+        self.assertEqual(encargos, {self.vencida.id: (Decimal('2.00'), Decimal('3.00'))})
+
+        with self.assertNumQueries(0):
+            services.encargos_atraso(self.empresa)
+
+        # Amanhã a chave é outra
+        with self.assertNumQueries(1):
+            encargos = services.encargos_atraso(self.empresa, hoje=date.today() + timedelta(days=1))
+        self.assertEqual(encargos[self.vencida.id], (Decimal('2.00'), Decimal('3.10')))
+
+    def test_lista_mostra_valor_atualizado(self):
+        response = self.client.get('/financeiro/contas/receber/')
+        self.assertContains(response, "Atualizado: R$ 105,00", count=1)
+
+    def test_baixa_lanca_encargos_no_plano_de_juros(self):
+        response = self.client.post(f'/financeiro/contas/baixar/{self.vencida.id}/', {
+            'caixa': self.caixa.id, 'data_pagamento': date.today().isoformat(), 'cobrar_encargos': '1',
+        })
+        self.assertEqual(response.status_code, 302)
+
+        lancamentos = Lancamento.objects.filter(empresa=self.empresa).order_by('id')
+        self.assertEqual(
+            [(l.plano_de_contas_id, l.valor, l.conta_origem_id) for l in lancamentos],
+            [(self.receita.id, Decimal('100.00'), self.vencida.id), (self.juros.id, Decimal('5.00'), None)],
+        )
+        self.vencida.refresh_from_db()
+        self.assertEqual(self.vencida.status, 'PAGA')
+
+    def test_baixa_com_data_invalida(self):
+        for data in ['07/02/2025', '2025-02-30']:
+            response = self.client.post(f'/financeiro/contas/baixar/{self.vencida.id}/', {
+                'caixa': self.caixa.id, 'data_pagamento': data, 'cobrar_encargos': '1',
+            }, follow=True)
+            self.assertRedirects(response, '/financeiro/contas/receber/')
+            self.assertContains(response, "Preencha todos os campos da baixa.")
+        self.assertFalse(Lancamento.objects.filter(empresa=self.empresa).exists())
+        self.vencida.refresh_from_db()
+        self.assertEqual(self.vencida.status, 'PENDENTE')
+
+    def test_baixa_sem_encargos_e_em_lote(self):
+        self.client.post(f'/financeiro/contas/baixar/{self.a_vencer.id}/', {
+            'caixa': self.caixa.id, 'data_pagamento': date.today().isoformat(), 'cobrar_encargos': '1',
+        })
+        self.assertEqual(Lancamento.objects.filter(empresa=self.empresa).count(), 1)
+
+        self.client.post('/financeiro/contas/baixar-lote/', {
+            'contas': [self.vencida.id, self.a_pagar.id], 'caixa': self.caixa.id,
+            'data_pagamento': date.today().isoformat(), 'cobrar_encargos': '1',
+        })
+        # A conta a pagar não gera encargos
+        self.assertEqual(
+            list(Lancamento.objects.filter(plano_de_contas=self.juros).values_list('valor', flat=True)),
+            [Decimal('5.00')],
+        )
+        self.assertEqual(Conta.objects.filter(empresa=self.empresa, status='PAGA').count(), 3)
+
+
+class BaixaEmLoteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        cls.usuario = Usuario.objects.create_user('lote', password='x', empresa=cls.empresa)
+        cls.banco = Caixa.objects.create(empresa=cls.empresa, nome='Banco')
+        cls.receita = PlanoDeContas.objects.create(empresa=cls.empresa, nome='Mensalidade', tipo='R', codigo='01')
+        cls.despesa = PlanoDeContas.objects.create(empresa=cls.empresa, nome='Luz', tipo='D', codigo='02')
+        cls.a_receber = cls.criar_conta(cls.empresa, cls.receita, '100.00')
+        cls.a_pagar = cls.criar_conta(cls.empresa, cls.despesa, '30.00')
+        cls.paga = cls.criar_conta(cls.empresa, cls.receita, '7.00', status='PAGA')
+        outra = Empresa.objects.create(nome="B", cnpj="B")
+        cls.de_outra = cls.criar_conta(outra, PlanoDeContas.objects.create(empresa=outra, nome='X', tipo='R', codigo='01'), '9.00')
+        # Movimento num mês seguinte: a fotografia dele também precisa andar
+        Lancamento(empresa=cls.empresa, caixa=cls.banco, plano_de_contas=cls.receita, descricao='Março',
+                   valor=Decimal('10'), tipo='C', data_lancamento=date(2025, 3, 3)).save()
+
+    @classmethod
+    def criar_conta(cls, empresa, plano, valor, status='PENDENTE'):
+        return Conta.objects.create(empresa=empresa, descricao=plano.nome, plano_de_contas=plano,
+                                    valor=Decimal(valor), data_vencimento=date(2025, 2, 5), status=status)
+
+    def contas(self):
+        return [self.a_receber.id, self.a_pagar.id, self.paga.id, self.de_outra.id]
+
+    def test_sinal_status_e_resumos(self):
+        lancamentos = services.baixar_contas(self.empresa, self.contas(), self.banco, date(2025, 2, 10))
+
+        # Receber entra positivo, pagar sai negativo; a já paga e a de outra empresa ficam de fora
+        self.assertEqual(
+            sorted((l.conta_origem_id, l.tipo, l.valor) for l in lancamentos),
+            sorted([(self.a_receber.id, 'C', Decimal('100.00')), (self.a_pagar.id, 'D', Decimal('-30.00'))]),
+        )
+        self.assertEqual(
+            dict(Conta.objects.filter(id__in=self.contas()).values_list('id', 'status')),
+            {self.a_receber.id: 'PAGA', self.a_pagar.id: 'PAGA', self.paga.id: 'PAGA', self.de_outra.id: 'PENDENTE'},
+        )
+        self.assertEqual(
+            dict(SaldoMensal.objects.filter(caixa=self.banco).values_list('competencia', 'saldo')),
+            {date(2025, 2, 1): Decimal('70'), date(2025, 3, 1): Decimal('80')},
+        )
+        self.assertEqual(
+            dict(((r.plano_de_contas_id, r.tipo), r.total)
+                 for r in ResumoMensal.objects.filter(empresa=self.empresa, competencia=date(2025, 2, 1))),
+            {(self.receita.id, 'C'): Decimal('100'), (self.despesa.id, 'D'): Decimal('-30')},
+        )
+
+    def test_mes_fechado_nao_baixa_nada(self):
+        services.fechar_periodo(self.empresa, self.banco, date(2025, 2, 1))
+
+        with self.assertRaises(PeriodoFechado):
+            services.baixar_contas(self.empresa, self.contas(), self.banco, date(2025, 2, 10))
+
+        self.assertEqual(Lancamento.objects.filter(empresa=self.empresa).count(), 1)
+        self.assertEqual(Conta.objects.filter(empresa=self.empresa, status='PENDENTE').count(), 2)
+
+    def test_tela_com_data_invalida(self):
+        self.client.force_login(self.usuario)
+        for data in ['', '10/02/2025', '2025-02-30']:
+            response = self.client.post('/financeiro/contas/baixar-lote/', {
+                'contas': self.contas(), 'caixa': self.banco.id, 'data_pagamento': data,
+            }, follow=True)
+            self.assertContains(response, "Selecione as contas e preencha todos os campos da baixa.")
+        self.assertEqual(Conta.objects.filter(empresa=self.empresa, status='PENDENTE').count(), 2)
+
+        response = self.client.post('/financeiro/contas/baixar-lote/', {
+            'contas': self.contas(), 'caixa': self.banco.id, 'data_pagamento': '2025-02-10',
+        }, follow=True)
+        self.assertContains(response, "2 contas baixadas com sucesso!")
+
+
+class FechamentoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        cls.caixa = Caixa.objects.create(empresa=cls.empresa, nome='Banco', saldo_inicial=100)
+        cls.receita = PlanoDeContas.objects.create(empresa=cls.empresa, nome='Mensalidade', tipo='R', codigo='01')
+        cls.despesa = PlanoDeContas.objects.create(empresa=cls.empresa, nome='Luz', tipo='D', codigo='02')
+        cls.usuario = Usuario.objects.create_user('fechamento', password='x', empresa=cls.empresa)
+
+        cls.lancamentos = {}
+        for nome, dia, valor, plano in [
+            ('jan', date(2025, 1, 15), '50', cls.receita),
+            ('jan_luz', date(2025, 1, 20), '10', cls.despesa),
+            ('fev', date(2025, 2, 10), '30', cls.receita),
+            ('abr', date(2025, 4, 5), '7', cls.receita),
+        ]:
+            lancamento = Lancamento(
+                empresa=cls.empresa, caixa=cls.caixa, plano_de_contas=plano, descricao=nome,
+                valor=Decimal(valor), tipo='C' if plano.tipo == 'R' else 'D', data_lancamento=dia,
+            )
+            lancamento.save()
+            cls.lancamentos[nome] = lancamento
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def fechar(self, competencia):
+        return services.fechar_periodo(self.empresa, self.caixa, competencia, usuario=self.usuario)
+
+    def test_fecha_os_meses_anteriores_com_saldo_e_totais(self):
+        fechamentos = self.fechar(date(2025, 3, 1))
+        self.assertEqual(
+            [(f.competencia, f.saldo, f.saldo_final) for f in fechamentos],
+            [(date(2025, 1, 1), 40, 140), (date(2025, 2, 1), 70, 170), (date(2025, 3, 1), 70, 170)],
+        )
+        self.assertEqual(
+            sorted((t.competencia.month, t.plano_de_contas_id, t.total) for f in fechamentos for t in f.totais.all()),
+            sorted([(1, self.receita.id, 50), (1, self.despesa.id, -10), (2, self.receita.id, 30)]),
+        )
+        # Já fechado: nada a fazer; mês atual não pode ser fechado
+        self.assertEqual(self.fechar(date(2025, 2, 1)), [])
+        with self.assertRaises(ValueError):
+            self.fechar(date.today())
+
+    def test_lancamentos_do_mes_fechado_nao_mudam(self):
+        self.fechar(date(2025, 2, 1))
+
+        fev = Lancamento.objects.get(pk=self.lancamentos['fev'].pk)
+        fev.valor = Decimal('31')
+        with self.assertRaises(PeriodoFechado):
+            fev.save()
+        with self.assertRaises(PeriodoFechado):
+            fev.delete()
+
+        # Nem entrar no mês fechado, nem sair dele
+        abr = Lancamento.objects.get(pk=self.lancamentos['abr'].pk)
+        abr.data_lancamento = date(2025, 1, 31)
+        with self.assertRaises(PeriodoFechado):
+            abr.save()
+        abr.data_lancamento = date(2025, 3, 31)
+        abr.save()
+
+        response = self.client.post(f"/financeiro/fluxo/excluir/{self.lancamentos['jan'].pk}/")
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Lancamento.objects.filter(pk=self.lancamentos['jan'].pk).exists())
+
+        response = self.client.post(f"/financeiro/fluxo/editar/{self.lancamentos['jan'].pk}/", {
+            'caixa': self.caixa.id, 'data_lancamento': '2025-05-02', 'tipo': 'C',
+            'plano_de_contas': self.receita.id, 'descricao': 'jan', 'valor': '50',
+        })
+        self.assertContains(response, "está fechado")
+
+    def test_baixa_em_mes_fechado(self):
+        self.fechar(date(2025, 2, 1))
+        conta = Conta.objects.create(
+            empresa=self.empresa, descricao='Conta', plano_de_contas=self.receita,
+            valor=Decimal('5'), data_vencimento=date(2025, 2, 1),
+        )
+        with self.assertRaises(PeriodoFechado):
+            services.baixar_contas(self.empresa, [conta.id], self.caixa, date(2025, 2, 1))
+        self.client.post(f'/financeiro/contas/baixar/{conta.id}/', {'caixa': self.caixa.id, 'data_pagamento': '2025-02-01'})
+        conta.refresh_from_db()
+        self.assertEqual(conta.status, 'PENDENTE')
+
+    def test_relatorios_usam_os_totais_gravados(self):
+        self.fechar(date(2025, 1, 1))
+        # O resumo de um mês fechado não é mais lido (aqui, corrompido de propósito)
+        ResumoMensal.objects.filter(empresa=self.empresa, competencia=date(2025, 1, 1)).update(total=999)
+
+        totais = ResumoMensal.totais_por_plano(self.empresa, date(2025, 1, 1), date(2025, 4, 30))
+        self.assertEqual({t['plano_de_contas_id']: t['total'] for t in totais}, {self.receita.id: 87, self.despesa.id: -10})
+
+    def test_reabrir_o_ultimo_mes(self):
+        self.fechar(date(2025, 2, 1))
+        self.client.post(f'/financeiro/caixas/fechamentos/reabrir/{self.caixa.id}/')
+        self.assertEqual(list(Fechamento.objects.filter(caixa=self.caixa).values_list('competencia', flat=True)), [date(2025, 1, 1)])
+
+        fev = Lancamento.objects.get(pk=self.lancamentos['fev'].pk)
+        fev.valor = Decimal('31')
+        fev.save()
+
+    def test_caixa_vazio_com_fechamento_nao_e_excluido(self):
+        vazio = Caixa.objects.create(empresa=self.empresa, nome='Cofre')
+        services.fechar_periodo(self.empresa, vazio, date(2025, 1, 1), usuario=self.usuario)
+
+        response = self.client.post(f'/financeiro/caixas/excluir/{vazio.id}/', follow=True)
+
+        self.assertContains(response, "existem fechamentos vinculados")
+        self.assertTrue(Caixa.objects.filter(pk=vazio.pk).exists())
+
+    def test_tela_de_fechamento(self):
+        response = self.client.post('/financeiro/caixas/fechamentos/fechar/', {'caixa': '', 'competencia': '2025-02'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Fechamento.objects.filter(caixa=self.caixa).count(), 2)
+
+        response = self.client.get('/financeiro/caixas/fechamentos/')
+        self.assertContains(response, "02/2025")
+        self.assertContains(response, "R$ 170,00")
+
+
+class DadosSinteticosTests(TestCase):
+    def test_gera_empresa_consistente(self):
+        saida = StringIO()
+        call_command('gerar_dados_sinteticos', cadastros=30, contas=300, lancamentos=200, meses=6, seed=7, stdout=saida)
+
+        empresa = Empresa.objects.get(usuario__username__startswith='sintetico')
+        contas = Conta.objects.filter(empresa=empresa)
+        self.assertEqual(Cadastro.objects.filter(empresa=empresa).count(), 30)
+        self.assertEqual(contas.count(), 300)
+        # Toda conta paga tem a sua baixa, com o mesmo valor (e sinal do tipo)
+        pagas = contas.filter(status='PAGA')
+        self.assertTrue(pagas.exists())
+        self.assertEqual(Lancamento.objects.filter(conta_origem__in=pagas).count(), pagas.count())
+        self.assertEqual(Lancamento.objects.filter(empresa=empresa).count(), pagas.count() + 200)
+        self.assertFalse(contas.filter(status='PAGA', data_vencimento__gt=date.today()).exists())
+        self.assertFalse(Lancamento.objects.filter(empresa=empresa, tipo='D', valor__gt=0).exists())
+        # Movimento só nas folhas do plano de contas, e os resumos batem com os lançamentos
+        self.assertFalse(Lancamento.objects.filter(empresa=empresa, plano_de_contas__filhos__isnull=False).exists())
+        self.assertEqual(
+            ResumoMensal.objects.filter(empresa=empresa).aggregate(s=Sum('total'))['s'],
+            Lancamento.objects.filter(empresa=empresa).aggregate(s=Sum('valor'))['s'],
+        )
+
+
+class ExportacaoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        cls.usuario = Usuario.objects.create_user('a', password='x', empresa=cls.empresa)
+        cls.caixa = Caixa.objects.create(empresa=cls.empresa, nome='Banco')
+        cls.plano = PlanoDeContas.objects.create(empresa=cls.empresa, nome='Mensalidade', tipo='R', codigo='01')
+        # Vários no mesmo dia: o lote seguinte continua pelo id
+        for i, dia in enumerate([date(2025, 1, 10)] * 3 + [date(2025, 1, 5), date(2025, 1, 20)]):
+            Lancamento(empresa=cls.empresa, caixa=cls.caixa, plano_de_contas=cls.plano, descricao=f"L{i}",
+                       valor=Decimal('1234.50'), tipo='C', data_lancamento=dia).save()
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def test_em_lotes_segue_a_ordem_com_empates(self):
+        lancamentos = Lancamento.objects.filter(empresa=self.empresa)
+        esperado = list(lancamentos.order_by('data_lancamento', 'id').values_list('descricao'))
+
+        with CaptureQueriesContext(connection) as consultas:
+            linhas = list(exportacao.em_lotes(lancamentos, ['descricao'], ordem='data_lancamento', tamanho=2))
+        self.assertEqual(linhas, esperado)
+        self.assertEqual(len(consultas), 3)
+
+    def test_csv(self):
+        response = self.client.get('/financeiro/fluxo/relatorio/exportar/', {
+            'data_inicio': '2025-01-01', 'data_fim': '2025-01-31', 'caixa': self.caixa.id,
+        })
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="fluxo_20250101_20250131.csv"')
+
+        conteudo = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(conteudo.startswith('\ufeffData;Tipo;Caixa'))
+        linhas = conteudo.splitlines()[1:]
+        self.assertEqual(len(linhas), 5)
+        self.assertEqual(linhas[0], "05/01/2025;C;Banco;01;Mensalidade;L3;1234,50")
+        self.assertEqual([linha.split(';')[5] for linha in linhas], ['L3', 'L0', 'L1', 'L2', 'L4'])
+
+    @unittest.skipUnless(importlib.util.find_spec('openpyxl'), "openpyxl não instalado")
+    def test_xlsx(self):
+        from openpyxl import load_workbook
+
+        response = self.client.get('/financeiro/fluxo/relatorio/exportar/', {
+            'data_inicio': '2025-01-01', 'data_fim': '2025-01-31', 'caixa': self.caixa.id, 'formato': 'xlsx',
+        })
+        planilha = load_workbook(BytesIO(b''.join(response.streaming_content)), read_only=True)
+        linhas = list(planilha.active.values)
+        self.assertEqual(linhas[0][:3], ('Data', 'Tipo', 'Caixa'))
+        self.assertEqual(len(linhas), 6)
+        self.assertEqual(linhas[1][5], 'L3')
+
+    def test_xlsx_sem_openpyxl(self):
+        with mock.patch.dict(sys.modules, {'openpyxl': None}):
+            response = self.client.get('/financeiro/contas/relatorio/exportar/', {'formato': 'xlsx'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_periodo_invalido_volta_para_o_relatorio(self):
+        for url, destino, params in (
+            ('/financeiro/fluxo/relatorio/exportar/', '/financeiro/fluxo/relatorio/', {'data_inicio': 'abc'}),
+            ('/financeiro/relatorios/dre/exportar/', '/financeiro/relatorios/dre/', {'data_fim': '2025-02-30'}),
+            ('/financeiro/contas/relatorio/exportar/', '/financeiro/contas/relatorio/', {'data_ini': 'x', 'data_fim': '2025-01-31'}),
+        ):
+            response = self.client.get(url, params)
+            self.assertRedirects(response, destino, fetch_redirect_response=False)
+
+
+class SaldoMensalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        cls.banco = Caixa.objects.create(empresa=cls.empresa, nome='Banco')
+        cls.cofre = Caixa.objects.create(empresa=cls.empresa, nome='Cofre')
+
+    def lancar(self, caixa, dia, valor, tipo='C'):
+        lancamento = Lancamento(empresa=self.empresa, caixa=caixa, descricao='L', valor=Decimal(valor),
+                                tipo=tipo, data_lancamento=dia)
+        lancamento.save()
+        return lancamento
+
+    def saldos(self):
+        """Saldo antes de cada dia 1 e de cada dia 15, por caixa, como as telas leem"""
+        return {
+            (caixa.id, dia): SaldoMensal.movimento_anterior(self.empresa, dia, caixa.id)
+            for caixa in (self.banco, self.cofre)
+            for mes in range(1, 8) for dia in (date(2025, mes, 1), date(2025, mes, 15))
+        }
+
+    def assertIgualAoReconstruido(self):
+        incremental = self.saldos()
+        SaldoMensal.reconstruir(self.empresa)
+        self.assertEqual(incremental, self.saldos())
+        # E os dois batem com a soma direta dos lançamentos
+        for (caixa_id, dia), saldo in incremental.items():
+            direto = Lancamento.objects.filter(caixa_id=caixa_id, data_lancamento__lt=dia).aggregate(s=Sum('valor'))['s'] or 0
+            self.assertEqual(saldo, direto, (caixa_id, dia))
+
+    def test_edicoes_e_exclusoes_entre_meses(self):
+        fev = self.lancar(self.banco, date(2025, 2, 10), '100')
+        self.lancar(self.banco, date(2025, 4, 20), '30', tipo='D')
+        mai = self.lancar(self.cofre, date(2025, 5, 5), '40')
+
+        fev.valor = Decimal('120')
+        fev.save()
+        self.assertIgualAoReconstruido()
+
+        # Muda de mês (para depois do lançamento de abril) e de caixa
+        fev.data_lancamento = date(2025, 6, 2)
+        fev.save()
+        self.assertIgualAoReconstruido()
+        fev.caixa = self.cofre
+        fev.save()
+        self.assertIgualAoReconstruido()
+
+        # Volta para um mês que ainda não tinha fotografia
+        mai.data_lancamento = date(2025, 1, 3)
+        mai.save()
+        self.assertIgualAoReconstruido()
+
+        fev.delete()
+        self.assertIgualAoReconstruido()
+
+
+class ResumoMensalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        cls.usuario = Usuario.objects.create_user('a', password='x', empresa=cls.empresa)
+        cls.banco = Caixa.objects.create(empresa=cls.empresa, nome='Banco')
+        cls.cofre = Caixa.objects.create(empresa=cls.empresa, nome='Cofre')
+        cls.receita = PlanoDeContas.objects.create(empresa=cls.empresa, nome='Mensalidade', tipo='R', codigo='01')
+        cls.despesa = PlanoDeContas.objects.create(empresa=cls.empresa, nome='Luz', tipo='D', codigo='02')
+
+    def lancar(self, caixa, plano, dia, valor, tipo='C'):
+        lancamento = Lancamento(empresa=self.empresa, caixa=caixa, plano_de_contas=plano, descricao='L',
+                                valor=Decimal(valor), tipo=tipo, data_lancamento=dia)
+        lancamento.save()
+        return lancamento
+
+    def resumos(self):
+        # O incremental pode deixar linhas zeradas (movimento que saiu do mês); o reconstruído não
+        return {
+            (r.caixa_id, r.plano_de_contas_id, r.competencia, r.tipo): r.total
+            for r in ResumoMensal.objects.filter(empresa=self.empresa) if r.total
+        }
+
+    def assertIgualAoReconstruido(self):
+        incremental = self.resumos()
+        ResumoMensal.reconstruir(self.empresa)
+        self.assertEqual(incremental, self.resumos())
+
+    def test_manutencao_incremental(self):
+        jan = self.lancar(self.banco, self.receita, date(2025, 1, 10), '100')
+        self.lancar(self.banco, self.despesa, date(2025, 1, 12), '30', tipo='D')
+        self.assertIgualAoReconstruido()
+
+        jan.valor = Decimal('150')
+        jan.save()
+        self.assertIgualAoReconstruido()
+
+        # Muda de mês, de caixa e de categoria
+        jan.data_lancamento = date(2025, 3, 1)
+        jan.caixa = self.cofre
+        jan.plano_de_contas = self.despesa
+        jan.tipo = 'D'
+        jan.save()
+        self.assertIgualAoReconstruido()
+
+        jan.delete()
+        self.assertIgualAoReconstruido()
+
+    def test_baixa_de_conta(self):
+        conta = Conta.objects.create(empresa=self.empresa, descricao='Mensalidade', plano_de_contas=self.receita,
+                                     valor=Decimal('80.00'), data_vencimento=date(2025, 2, 5))
+        outra = Conta.objects.create(empresa=self.empresa, descricao='Luz', plano_de_contas=self.despesa,
+                                     valor=Decimal('20.00'), data_vencimento=date(2025, 2, 6))
+        self.client.force_login(self.usuario)
+        self.client.post(f'/financeiro/contas/baixar/{conta.id}/', {'caixa': self.banco.id, 'data_pagamento': '2025-02-07'})
+        services.baixar_contas(self.empresa, [outra.id], self.banco, date(2025, 2, 8))
+
+        self.assertEqual(self.resumos()[(self.banco.id, self.receita.id, date(2025, 2, 1), 'C')], Decimal('80.00'))
+        self.assertIgualAoReconstruido()
+
+    def test_sem_categoria_uma_linha_por_mes(self):
+        self.lancar(self.banco, None, date(2025, 1, 10), '5')
+        self.lancar(self.banco, None, date(2025, 1, 20), '7')
+        linhas = ResumoMensal.objects.filter(empresa=self.empresa, plano_de_contas=None)
+        self.assertEqual([linha.total for linha in linhas], [Decimal('12')])
+
+    def test_excluir_plano_passa_os_totais_para_sem_categoria(self):
+        self.lancar(self.banco, self.receita, date(2025, 1, 10), '100')
+        self.lancar(self.banco, None, date(2025, 1, 20), '5')
+        avulsa = PlanoDeContas.objects.create(empresa=self.empresa, nome='Avulsa', tipo='R', codigo='03')
+        self.lancar(self.banco, avulsa, date(2025, 1, 25), '40')
+        self.lancar(self.cofre, avulsa, date(2025, 2, 1), '8')
+
+        avulsa.delete()
+
+        self.assertEqual(self.resumos(), {
+            (self.banco.id, self.receita.id, date(2025, 1, 1), 'C'): Decimal('100'),
+            (self.banco.id, None, date(2025, 1, 1), 'C'): Decimal('45'),
+            (self.cofre.id, None, date(2025, 2, 1), 'C'): Decimal('8'),
+        })
+        self.assertIgualAoReconstruido()
+
+    def test_comando_reconstroi_todas_as_empresas(self):
+        self.lancar(self.banco, self.receita, date(2025, 1, 10), '100')
+        outra = Empresa.objects.create(nome="B", cnpj="B")
+        caixa = Caixa.objects.create(empresa=outra, nome='Banco B')
+        Lancamento(empresa=outra, caixa=caixa, descricao='L', valor=Decimal('9'), tipo='C',
+                   data_lancamento=date(2025, 1, 1)).save()
+        ResumoMensal.objects.all().delete()
+
+        saida = StringIO()
+        call_command('reconstruir_resumos', threads=2, stdout=saida)
+        self.assertIn("2 resumos mensais reconstruídos (2 empresas", saida.getvalue())
+        self.assertEqual(ResumoMensal.objects.filter(empresa=outra).get().total, Decimal('9'))
+
+
+@override_settings(RELATORIO_DIAS_SINCRONO=None)
+class DRESinteticoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        cls.usuario = Usuario.objects.create_user('a', password='x', empresa=cls.empresa)
+        cls.caixa = Caixa.objects.create(empresa=cls.empresa, nome='Banco')
+        cls.receitas = PlanoDeContas.objects.create(empresa=cls.empresa, codigo='01', nome='Receitas', tipo='R')
+        cls.mensalidades = PlanoDeContas.objects.create(empresa=cls.empresa, codigo='01.01', nome='Mensalidades',
+                                                        tipo='R', pai=cls.receitas)
+        cls.despesas = PlanoDeContas.objects.create(empresa=cls.empresa, codigo='02', nome='Despesas', tipo='D')
+        cls.luz = PlanoDeContas.objects.create(empresa=cls.empresa, codigo='02.01', nome='Luz', tipo='D', pai=cls.despesas)
+
+        # Período de 15/01 a 10/03: fevereiro inteiro vem do resumo, as pontas dos lançamentos
+        for dia, valor, plano in [
+            (date(2025, 1, 10), '1000', cls.mensalidades),  # antes do período
+            (date(2025, 1, 20), '100', cls.mensalidades),
+            (date(2025, 2, 5), '200', cls.receitas),
+            (date(2025, 2, 7), '30', cls.luz),
+            (date(2025, 3, 5), '40', cls.mensalidades),
+            (date(2025, 3, 20), '1000', cls.mensalidades),  # depois do período
+        ]:
+            cls.lancar(plano, dia, valor)
+
+    @classmethod
+    def lancar(cls, plano, dia, valor):
+        Lancamento(empresa=cls.empresa, caixa=cls.caixa, plano_de_contas=plano, descricao='L', valor=Decimal(valor),
+                   tipo='C' if plano.tipo == 'R' else 'D', data_lancamento=dia).save()
+
+    def setUp(self):
+        caches['relatorios'].clear()
+        self.client.force_login(self.usuario)
+
+    def relatorio(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get('/financeiro/relatorios/dre/sintetico/', {
+                'data_inicio': '2025-01-15', 'data_fim': '2025-03-10',
+            })
+        self.assertEqual(response.status_code, 200)
+        linhas = [(l['codigo'], l['nome'], l['total']) for l in response.context['receitas'] + response.context['despesas']]
+        return linhas, len(consultas)
+
+    def test_soma_no_grupo_pai_com_as_pontas_do_periodo(self):
+        linhas, _ = self.relatorio()
+        self.assertEqual(linhas, [('01', 'Receitas', Decimal('340')), ('02', 'Despesas', Decimal('-30'))])
+
+    def test_consultas_nao_crescem_com_os_lancamentos(self):
+        _, antes = self.relatorio()
+
+        outro = PlanoDeContas.objects.create(empresa=self.empresa, codigo='01.02', nome='Vendas', tipo='R', pai=self.receitas)
+        for i in range(20):
+            self.lancar(outro if i % 2 else self.luz, date(2025, 1 + i % 3, 10 + i % 10), '1')
+        caches['relatorios'].clear()
+
+        _, depois = self.relatorio()
+        self.assertEqual(depois, antes)
+
+
+class HierarquiaPlanoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        cls.usuario = Usuario.objects.create_user('a', password='x', empresa=cls.empresa)
+        cls.caixa = Caixa.objects.create(empresa=cls.empresa, nome='Banco')
+
+        def plano(codigo, nome, tipo='R', pai=None):
+            return PlanoDeContas.objects.create(empresa=cls.empresa, codigo=codigo, nome=nome, tipo=tipo, pai=pai)
+
+        cls.receitas = plano('1', 'Receitas')
+        cls.mensalidades = plano('1.01', 'Mensalidades', pai=cls.receitas)
+        cls.integral = plano('1.01.001', 'Integral', pai=cls.mensalidades)
+        cls.vendas = plano('1.02', 'Vendas', pai=cls.receitas)
+        cls.despesas = plano('2', 'Despesas', tipo='D')
+        cls.luz = plano('2.01', 'Luz', tipo='D', pai=cls.despesas)
+
+        for plano_lancamento, valor, tipo in ((cls.integral, '100', 'C'), (cls.vendas, '50', 'C'), (cls.luz, '30', 'D')):
+            Lancamento(empresa=cls.empresa, caixa=cls.caixa, plano_de_contas=plano_lancamento, descricao='L',
+                       valor=Decimal(valor), tipo=tipo, data_lancamento=date(2025, 3, 10)).save()
+
+    def setUp(self):
+        caches['relatorios'].clear()
+
+    def caminho(self, *planos):
+        return ''.join(f"{p.id:010d}/" for p in planos)
+
+    def test_mudar_de_grupo_reescreve_a_subarvore(self):
+        self.assertEqual((self.integral.caminho, self.integral.nivel), (self.caminho(self.receitas, self.mensalidades, self.integral), 3))
+
+        self.mensalidades.pai = self.despesas
+        self.mensalidades.save()
+        self.integral.refresh_from_db()
+        self.assertEqual((self.integral.caminho, self.integral.nivel), (self.caminho(self.despesas, self.mensalidades, self.integral), 3))
+
+        self.mensalidades.pai = None
+        self.mensalidades.save()
+        self.integral.refresh_from_db()
+        self.assertEqual((self.integral.caminho, self.integral.nivel), (self.caminho(self.mensalidades, self.integral), 2))
+        self.assertEqual(list(self.receitas.descendentes()), [self.vendas])
+
+    def test_formulario_deduz_o_grupo_pelo_codigo(self):
+        form = PlanoContasForm(data={'codigo': '1.01.002', 'nome': 'Meio período', 'tipo': 'R'}, user=self.usuario)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['pai'], self.mensalidades)
+
+        # Na edição, o próprio plano e os descendentes não podem ser o grupo
+        form = PlanoContasForm(instance=self.mensalidades, user=self.usuario)
+        self.assertNotIn(self.integral, form.fields['pai'].queryset)
+        self.assertNotIn(self.mensalidades, form.fields['pai'].queryset)
+
+    def test_migracao_preenche_pai_e_caminho(self):
+        from django.apps import apps
+        migracao = importlib.import_module('financeiro.migrations.0007_preencher_hierarquia_plano')
+
+        PlanoDeContas.objects.filter(empresa=self.empresa).update(pai=None, caminho='', nivel=1)
+        migracao.preencher_hierarquia(apps, None)
+
+        self.integral.refresh_from_db()
+        self.assertEqual(self.integral.pai, self.mensalidades)
+        self.assertEqual((self.integral.caminho, self.integral.nivel), (self.caminho(self.receitas, self.mensalidades, self.integral), 3))
+
+    def dre_sintetico(self, **params):
+        self.client.force_login(self.usuario)
+        response = self.client.get('/financeiro/relatorios/dre/sintetico/', {
+            'data_inicio': '2025-03-01', 'data_fim': '2025-03-31', **params,
+        })
+        self.assertEqual(response.status_code, 200)
+        return (
+            [(linha['nome'], linha['total']) for linha in response.context['receitas']],
+            [(linha['nome'], linha['total']) for linha in response.context['despesas']],
+        )
+
+    def test_dre_sintetico_soma_por_nivel(self):
+        self.assertEqual(self.dre_sintetico(), ([('Receitas', 150)], [('Despesas', -30)]))
+        self.assertEqual(self.dre_sintetico(nivel=2), ([('Mensalidades', 100), ('Vendas', 50)], [('Luz', -30)]))
+        self.assertEqual(self.dre_sintetico(nivel=3), ([('Integral', 100), ('Vendas', 50)], [('Luz', -30)]))
+
+    def test_dre_sintetico_abre_um_grupo(self):
+        self.assertEqual(self.dre_sintetico(grupo=self.receitas.id), ([('Mensalidades', 100), ('Vendas', 50)], []))
+        self.assertEqual(self.dre_sintetico(grupo=self.mensalidades.id), ([('Integral', 100)], []))
+
+
+@mock.patch.object(views, 'CONTAS_POR_PAGINA', 3)
+class PaginacaoContasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        cls.usuario = Usuario.objects.create_user('a', password='x', empresa=cls.empresa)
+        plano = PlanoDeContas.objects.create(empresa=cls.empresa, nome='Mensalidade', tipo='R', codigo='01')
+        hoje = date.today()
+        # Quatro contas no mesmo dia: a página pode acabar no meio do empate
+        dias = [hoje + timedelta(days=d) for d in (5, 1, 3, 3, 3, 3, -2, 8)]
+        for i, dia in enumerate(dias):
+            Conta.objects.create(empresa=cls.empresa, descricao=f"C{i}", plano_de_contas=plano, valor=Decimal(10 + i),
+                                 data_vencimento=dia, status='PAGA' if i == 7 else 'PENDENTE')
+        cls.ordem = list(Conta.objects.order_by('data_vencimento', 'id').values_list('id', flat=True))
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def pagina(self, **params):
+        response = self.client.get('/financeiro/contas/receber/', params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def ids(self, response):
+        return [c.id for c in response.context['contas']]
+
+    def test_avanca_e_volta_pelos_cursores(self):
+        paginas = [self.pagina()]
+        while paginas[-1].context['proximo_cursor']:
+            paginas.append(self.pagina(apos=paginas[-1].context['proximo_cursor']))
+        self.assertEqual([i for p in paginas for i in self.ids(p)], self.ordem)
+        self.assertEqual(len(paginas), 3)
+        self.assertIsNone(paginas[0].context['cursor_anterior'])
+
+        # Voltando a partir da última página, as mesmas páginas em ordem inversa
+        volta = [paginas[-1]]
+        while volta[-1].context['cursor_anterior']:
+            volta.append(self.pagina(antes=volta[-1].context['cursor_anterior']))
+        self.assertEqual([self.ids(p) for p in reversed(volta)], [self.ids(p) for p in paginas])
+
+    def test_cursor_invalido_mostra_a_primeira_pagina(self):
+        primeira = self.ids(self.pagina())
+        for cursor in ('x', '2025-13-01_5', '2025-02-30_5', '2025-01-01_abc', '2025-01-01_1_2'):
+            self.assertEqual(self.ids(self.pagina(apos=cursor)), primeira, cursor)
+
+    def test_totais_nao_dependem_da_pagina(self):
+        primeira = self.pagina()
+        segunda = self.pagina(apos=primeira.context['proximo_cursor'])
+        for chave, esperado in (('total_pendente', Decimal(11 + 12 + 13 + 14 + 15 + 10)),
+                                ('total_atrasado', Decimal(16)), ('total_pago', Decimal(17))):
+            self.assertEqual(primeira.context[chave], esperado, chave)
+            self.assertEqual(segunda.context[chave], esperado, chave)
+
+
+class ParcelamentoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        cls.plano = PlanoDeContas.objects.create(empresa=cls.empresa, nome='Mensalidade', tipo='R', codigo='01')
+
+    def test_soma_das_parcelas_bate_com_o_total(self):
+        self.assertEqual(services.calcular_parcelas(Decimal('100.00'), 3), [Decimal('33.34'), Decimal('33.33'), Decimal('33.33')])
+        for valor, qtd, juros in (('100.00', 7, 0), ('0.05', 3, 0), ('1999.99', 12, '2.5'), ('10.00', 1, 0)):
+            parcelas = services.calcular_parcelas(Decimal(valor), qtd, juros)
+            total = (Decimal(valor) * (1 + Decimal(juros) / 100)).quantize(Decimal('0.01'))
+            self.assertEqual(sum(parcelas), total, (valor, qtd, juros))
+            self.assertEqual(len(parcelas), qtd)
+            # A sobra do arredondamento vai toda para a primeira
+            self.assertEqual(len(set(parcelas[1:])), min(1, qtd - 1))
+            self.assertTrue(all(p.as_tuple().exponent == -2 for p in parcelas))
+
+    def test_vencimento_no_fim_do_mes(self):
+        self.assertEqual(services.add_months(date(2025, 1, 31), 1), date(2025, 2, 28))
+        self.assertEqual(services.add_months(date(2024, 1, 31), 1), date(2024, 2, 29))
+        self.assertEqual(services.add_months(date(2025, 12, 15), 2), date(2026, 2, 15))
+        self.assertEqual(services.add_months(date(2025, 3, 31), -1), date(2025, 2, 28))
+
+        _, parcelas = services.gerar_parcelas(self.empresa, self.plano, "Curso", Decimal('100.00'), date(2024, 1, 31), 4)
+        self.assertEqual([p.data_vencimento for p in parcelas],
+                         [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)])
+        self.assertEqual(sum(Conta.objects.filter(empresa=self.empresa).values_list('valor', flat=True)), Decimal('100.00'))
+        self.assertEqual(parcelas[1].documento.split('-')[1], '2/4')
+
+
+class InvalidacaoCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="A", cnpj="A")
+        cls.usuario = Usuario.objects.create_user('a', password='x', empresa=cls.empresa)
+        cls.caixa = Caixa.objects.create(empresa=cls.empresa, nome='Banco')
+        cls.plano = PlanoDeContas.objects.create(empresa=cls.empresa, nome='Mensalidade', tipo='R', codigo='01')
+
+    def setUp(self):
+        caches['relatorios'].clear()
+
+    def gravar(self, funcao):
+        """Executa e devolve (versão antes, versão depois do commit)"""
+        antes = versao_empresa(self.empresa.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            funcao()
+        return antes, versao_empresa(self.empresa.id)
+
+    def test_gravacoes_financeiras_mudam_a_versao(self):
+        lancamento = Lancamento(empresa=self.empresa, caixa=self.caixa, plano_de_contas=self.plano, descricao='L',
+                                valor=Decimal('10'), tipo='C', data_lancamento=date(2025, 1, 1))
+        for funcao in (
+            lancamento.save,
+            lambda: Conta.objects.create(empresa=self.empresa, descricao='C', plano_de_contas=self.plano,
+                                         valor=Decimal('5'), data_vencimento=date(2025, 1, 5)),
+            lancamento.delete,
+        ):
+            antes, depois = self.gravar(funcao)
+            self.assertNotEqual(antes, depois)
+
+        # Model que não aparece nos relatórios não invalida nada
+        antes, depois = self.gravar(lambda: Usuario.objects.filter(pk=self.usuario.pk).first().save())
+        self.assertEqual(antes, depois)
+
+    def test_relatorio_em_cache_e_gerado_de_novo(self):
+        self.client.force_login(self.usuario)
+        url = '/financeiro/contas/relatorio/?tipo_lista=receber'
+        Conta.objects.create(empresa=self.empresa, descricao='Primeira', plano_de_contas=self.plano,
+                             valor=Decimal('5'), data_vencimento=date(2025, 1, 5))
+        self.assertContains(self.client.get(url), 'Primeira')
+
+        # Sem gravação, a segunda vez vem do cache (nenhuma consulta aos dados)
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(url)
+        self.assertFalse([q for q in consultas if 'financeiro_conta' in q['sql']])
+
+        self.gravar(lambda: Conta.objects.create(empresa=self.empresa, descricao='Segunda', plano_de_contas=self.plano,
+                                                 valor=Decimal('7'), data_vencimento=date(2025, 1, 6)))
+        self.assertContains(self.client.get(url), 'Segunda')
@@ -13,9 +13,18 @@ urlpatterns = [
     
     # RELATÓRIO
     path('fluxo/relatorio/', views.relatorio_fluxo, name='relatorio_fluxo'),
+    path('fluxo/relatorio/async/', views.relatorio_fluxo_async, name='relatorio_fluxo_async'),
+    path('fluxo/projecao/', views.projecao_fluxo, name='projecao_fluxo'),
     path('contas/relatorio/', views.relatorio_contas, name='relatorio_contas'),
+    path('contas/relatorio/async/', views.relatorio_contas_async, name='relatorio_contas_async'),
+    path('contas/aging/', views.relatorio_aging, name='relatorio_aging'),
     path('relatorios/dre/', views.relatorio_dre, name='relatorio_dre'),
     path('relatorios/dre/sintetico/', views.relatorio_dre_sintetico, name='relatorio_dre_sintetico'),
+
+    # EXPORTAÇÃO (CSV / XLSX)
+    path('fluxo/relatorio/exportar/', views.exportar_fluxo, name='exportar_fluxo'),
+    path('contas/relatorio/exportar/', views.exportar_contas, name='exportar_contas'),
+    path('relatorios/dre/exportar/', views.exportar_dre, name='exportar_dre'),
         
     # RECEBER (NOVO)
     path('contas/receber/', views.lista_contas_receber, name='lista_receber'),
@@ -27,11 +36,15 @@ urlpatterns = [
 
     # AÇÕES COMUNS (Editar/Baixar/Excluir servem para ambos)
     path('contas/baixar/<int:id>/', views.baixar_conta, name='baixar_conta'),
+    path('contas/baixar-lote/', views.baixar_contas_lote, name='baixar_contas_lote'),
     path('contas/editar/<int:id>/', views.editar_conta, name='editar_conta'),
     path('contas/excluir/<int:id>/', views.excluir_conta, name='excluir_conta'),
 
     # CADASTROS AUXILIARES
     path('caixas/', views.lista_caixas, name='lista_caixas'),
+    path('caixas/fechamentos/', views.lista_fechamentos, name='lista_fechamentos'),
+    path('caixas/fechamentos/fechar/', views.fechar_periodo, name='fechar_periodo'),
+    path('caixas/fechamentos/reabrir/<int:caixa_id>/', views.reabrir_periodo, name='reabrir_periodo'),
     path('caixas/novo/', views.adicionar_caixa, name='adicionar_caixa'),
     path('caixas/editar/<int:id>/', views.editar_caixa, name='editar_caixa'),
     path('caixas/excluir/<int:id>/', views.excluir_caixa, name='excluir_caixa'),
@@ -40,4 +53,5 @@ urlpatterns = [
     path('plano-de-contas/novo/', views.adicionar_plano_de_contas, name='adicionar_plano_de_contas'),
     path('plano-de-contas/editar/<int:id>/', views.editar_plano_de_contas, name='editar_plano_de_contas'),
     path('plano-de-contas/excluir/<int:id>/', views.excluir_plano_de_contas, name='excluir_plano_de_contas'),
+    path('plano-de-contas/autocomplete/', views.autocomplete_planos, name='autocomplete_planos'),
 ]
\ No newline at end of file
@@ -1,26 +1,44 @@
-from datetime import date
+from datetime import date, timedelta
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import Max, Q, Sum
 from django.utils.dateparse import parse_date
+from urllib.parse import urlencode
 
 # Imports dos Modelos e Formulários
-from .models import Conta, Lancamento, Caixa, PlanoDeContas
+from cadastros.models import Cadastro
+from .models import Conta, Lancamento, Caixa, PlanoDeContas, SaldoMensal, ResumoMensal, Fechamento, PeriodoFechado
 from .forms import ContaForm, LancamentoManualForm, CaixaForm, PlanoContasForm
-from core.models import ParametroSistema
+from . import exportacao, services
+from .cache import cache_relatorio
+from core.autocomplete import resposta_autocomplete
+from core.fila import em_segundo_plano, periodo_longo
+from core.paralelo import em_paralelo
+from core.parametros import parametro
 from decimal import Decimal
-import calendar
 import random
 
 
-def add_months(source_date, months):
-    """Adiciona meses a uma data corretamente (ex: 31/01 + 1 mês -> 28/02)"""
-    month = source_date.month - 1 + months
-    year = source_date.year + month // 12
-    month = month % 12 + 1
-    day = min(source_date.day, calendar.monthrange(year, month)[1])
-    return date(year, month, day)
+def movimentos_anteriores(empresa, data_inicio, caixa_id=None, categoria_id=None):
+    """Soma dos lançamentos antes de data_inicio (usa o Saldo Mensal quando não há filtro de categoria)"""
+    if isinstance(data_inicio, str):
+        data_inicio = parse_date(data_inicio)
+
+    if not categoria_id:
+        return SaldoMensal.movimento_anterior(empresa, data_inicio, caixa_id)
+
+    # O Saldo Mensal é por caixa, não por categoria: aqui soma o histórico direto
+    movimentos = Lancamento.objects.filter(
+        empresa=empresa,
+        data_lancamento__lt=data_inicio,
+        plano_de_contas_id=categoria_id
+    )
+    if caixa_id:
+        movimentos = movimentos.filter(caixa_id=caixa_id)
+    return movimentos.aggregate(Sum('valor'))['valor__sum'] or 0
 
 # ==========================================================
 # 1. GESTÃO DE CAIXAS (BANCOS)
@@ -62,6 +80,9 @@ def excluir_caixa(request, id):
     caixa = get_object_or_404(Caixa, id=id, empresa=request.user.empresa)
     if caixa.lancamento_set.exists():
         messages.error(request, "Não é possível excluir este caixa pois existem lançamentos vinculados.")
+    elif caixa.fechamentos.exists():
+        # O fechamento grava um registro por caixa, mesmo sem movimento no mês
+        messages.error(request, "Não é possível excluir este caixa pois existem fechamentos vinculados.")
     else:
         caixa.delete()
         messages.success(request, "Caixa excluído com sucesso.")
@@ -114,83 +135,79 @@ def excluir_plano_de_contas(request, id):
     conta = get_object_or_404(PlanoDeContas, id=id, empresa=request.user.empresa)
     if conta.lancamento_set.exists() or conta.conta_set.exists():
         messages.error(request, "Não é possível excluir: existem lançamentos ou contas usando esta categoria.")
+    elif conta.filhos.exists():
+        messages.error(request, "Não é possível excluir: esta categoria é grupo de outras categorias.")
     else:
         conta.delete()
         messages.success(request, "Categoria excluída.")
     return redirect('financeiro:lista_plano_de_contas')
 
+@login_required
+def autocomplete_planos(request):
+    """Categorias para os campos de Plano de Contas (?q= código ou nome, ?tipo=R|D, ?pagina=)"""
+    qs = PlanoDeContas.objects.filter(empresa=request.user.empresa)
+
+    tipo = request.GET.get('tipo')
+    if tipo in ('R', 'D'):
+        qs = qs.filter(tipo=tipo)
+
+    q = (request.GET.get('q') or '').strip()
+    if q:
+        qs = qs.filter(Q(codigo__startswith=q) | Q(nome__icontains=q))
+
+    qs = qs.only('id', 'codigo', 'nome').order_by('codigo', 'nome')
+    return resposta_autocomplete(request, qs, str)
+
 
 # ==========================================================
 # 3. CONTAS A PAGAR E RECEBER (SEPARADAS COM FILTROS)
 # ==========================================================
 
-@login_required
-def lista_contas_receber(request):
-    """Lista apenas contas onde o Plano de Contas é TIPO RECEITA"""
-    # Base Query
-    contas = Conta.objects.filter(empresa=request.user.empresa, plano_de_contas__tipo='R')
+# Contas por página nas listas (paginação por cursor: data_vencimento + id)
+CONTAS_POR_PAGINA = 50
 
-    # --- FILTROS DE BUSCA ---
-    data_ini = request.GET.get('data_ini')
-    data_fim = request.GET.get('data_fim')
-    cliente_nome = request.GET.get('cliente')
-    status = request.GET.get('status')
-    categoria_id = request.GET.get('categoria') # NOVO
+# Colunas realmente usadas por contas_lista.html
+CAMPOS_LISTA_CONTAS = (
+    'id', 'data_vencimento', 'descricao', 'documento', 'valor', 'status',
+    'cadastro__nome', 'plano_de_contas__nome', 'plano_de_contas__tipo',
+)
 
-    if data_ini and data_fim:
-        contas = contas.filter(data_vencimento__range=[data_ini, data_fim])
-    
-    if cliente_nome:
-        contas = contas.filter(cadastro__nome__icontains=cliente_nome)
 
-    if status:
-        if status == 'ATRASADA':
-            contas = contas.filter(status='PENDENTE', data_vencimento__lt=date.today())
-        else:
-            contas = contas.filter(status=status)
+def data_valida(texto):
+    """'AAAA-MM-DD' -> date, ou None se vazio ou inválido (inclusive datas impossíveis, ex: 2025-02-30)"""
+    try:
+        return parse_date(texto or '')
+    except ValueError:
+        return None
 
-    # Filtro por Categoria (NOVO)
-    if categoria_id:
-        contas = contas.filter(plano_de_contas_id=categoria_id)
 
-    # Dados para os Dropdowns
-    caixas = Caixa.objects.filter(empresa=request.user.empresa)
-    # Carrega apenas categorias de RECEITA para o filtro
-    categorias = PlanoDeContas.objects.filter(empresa=request.user.empresa, tipo='R').order_by('nome')
-    
-    return render(request, 'financeiro/contas_lista.html', {
-        'contas': contas.order_by('data_vencimento'), 
-        'caixas': caixas,
-        'categorias': categorias, # Envia para o template
-        'titulo': 'Contas a Receber',
-        'tipo_lista': 'receber',
-        
-        # Mantém filtros preenchidos
-        'filtro_data_ini': data_ini,
-        'filtro_data_fim': data_fim,
-        'filtro_nome': cliente_nome,
-        'filtro_status': status,
-        'filtro_categoria': categoria_id # NOVO
-    })
+def ler_cursor(valor):
+    """Cursor no formato 'AAAA-MM-DD_id' -> (date, id), ou None se inválido"""
+    try:
+        data_str, id_str = valor.split('_')
+        data = parse_date(data_str)
+        return (data, int(id_str)) if data else None
+    except (AttributeError, ValueError):
+        return None
 
-@login_required
-def lista_contas_pagar(request):
-    """Lista apenas contas onde o Plano de Contas é TIPO DESPESA"""
+
+def listar_contas(request, tipo_plano, titulo, tipo_lista):
+    """Lógica comum das listas de Contas a Receber / Pagar"""
     # Base Query
-    contas = Conta.objects.filter(empresa=request.user.empresa, plano_de_contas__tipo='D')
+    contas = Conta.objects.filter(empresa=request.user.empresa, plano_de_contas__tipo=tipo_plano)
 
     # --- FILTROS DE BUSCA ---
     data_ini = request.GET.get('data_ini')
     data_fim = request.GET.get('data_fim')
-    fornecedor_nome = request.GET.get('cliente')
+    nome = request.GET.get('cliente')
     status = request.GET.get('status')
-    categoria_id = request.GET.get('categoria') # NOVO
+    categoria_id = request.GET.get('categoria')
 
     if data_ini and data_fim:
         contas = contas.filter(data_vencimento__range=[data_ini, data_fim])
     
-    if fornecedor_nome:
-        contas = contas.filter(cadastro__nome__icontains=fornecedor_nome)
+    if nome:
+        contas = contas.filter(cadastro__in=Cadastro.objects.buscar(nome, request.user.empresa))
 
     if status:
         if status == 'ATRASADA':
@@ -198,27 +215,95 @@ def lista_contas_pagar(request):
         else:
             contas = contas.filter(status=status)
 
-    # Filtro por Categoria (NOVO)
+    # Filtro por Categoria
     if categoria_id:
         contas = contas.filter(plano_de_contas_id=categoria_id)
 
+    # --- TOTAIS DO FILTRO (uma única query, para o rodapé) ---
+    hoje = date.today()
+    totais = contas.aggregate(
+        pendente=Sum('valor', filter=Q(status='PENDENTE', data_vencimento__gte=hoje)),
+        atrasado=Sum('valor', filter=Q(status='PENDENTE', data_vencimento__lt=hoje)),
+        pago=Sum('valor', filter=Q(status='PAGA')),
+    )
+
+    # --- PAGINAÇÃO POR CURSOR (data_vencimento, id) ---
+    apos = ler_cursor(request.GET.get('apos'))
+    antes = ler_cursor(request.GET.get('antes'))
+
+    pagina = contas.select_related('cadastro', 'plano_de_contas').only(*CAMPOS_LISTA_CONTAS)
+    if antes:
+        # Página anterior: busca de trás para frente e desinverte
+        pagina = pagina.filter(
+            Q(data_vencimento__lt=antes[0]) | Q(data_vencimento=antes[0], id__lt=antes[1])
+        ).order_by('-data_vencimento', '-id')
+    else:
+        if apos:
+            pagina = pagina.filter(
+                Q(data_vencimento__gt=apos[0]) | Q(data_vencimento=apos[0], id__gt=apos[1])
+            )
+        pagina = pagina.order_by('data_vencimento', 'id')
+
+    # Um registro a mais só para saber se existe outra página
+    pagina = list(pagina[:CONTAS_POR_PAGINA + 1])
+    tem_mais = len(pagina) > CONTAS_POR_PAGINA
+    pagina = pagina[:CONTAS_POR_PAGINA]
+    if antes:
+        pagina.reverse()
+
+    def cursor(c):
+        return f"{c.data_vencimento:%Y-%m-%d}_{c.id}"
+
+    # Multa e juros de hoje (calculados para todas as vencidas de uma vez, em cache)
+    if tipo_plano == 'R':
+        encargos = services.encargos_atraso(request.user.empresa)
+        for c in pagina:
+            c.multa, c.juros = encargos.get(c.id, (0, 0))
+            c.valor_atualizado = c.valor + c.multa + c.juros
+
+    proximo_cursor = cursor(pagina[-1]) if pagina and (tem_mais or antes) else None
+    cursor_anterior = cursor(pagina[0]) if pagina and (apos or (antes and tem_mais)) else None
+
+    # Dados para os Dropdowns
     caixas = Caixa.objects.filter(empresa=request.user.empresa)
-    # Carrega apenas categorias de DESPESA para o filtro
-    categorias = PlanoDeContas.objects.filter(empresa=request.user.empresa, tipo='D').order_by('nome')
-    
+    categorias = PlanoDeContas.objects.filter(empresa=request.user.empresa, tipo=tipo_plano).order_by('nome')
+
+    # Filtros atuais, para os links de página
+    filtros = {k: v for k, v in request.GET.items() if k not in ('apos', 'antes') and v}
+
     return render(request, 'financeiro/contas_lista.html', {
-        'contas': contas.order_by('data_vencimento'), 
+        'contas': pagina, 
         'caixas': caixas,
         'categorias': categorias,
-        'titulo': 'Contas a Pagar',
-        'tipo_lista': 'pagar',
+        'titulo': titulo,
+        'tipo_lista': tipo_lista,
+
+        # Rodapé e paginação
+        'total_pendente': totais['pendente'] or 0,
+        'total_atrasado': totais['atrasado'] or 0,
+        'total_pago': totais['pago'] or 0,
+        'proximo_cursor': proximo_cursor,
+        'cursor_anterior': cursor_anterior,
+        'filtros_url': urlencode(filtros),
+        
+        # Mantém filtros preenchidos
         'filtro_data_ini': data_ini,
         'filtro_data_fim': data_fim,
-        'filtro_nome': fornecedor_nome,
+        'filtro_nome': nome,
         'filtro_status': status,
         'filtro_categoria': categoria_id
     })
 
+@login_required
+def lista_contas_receber(request):
+    """Lista apenas contas onde o Plano de Contas é TIPO RECEITA"""
+    return listar_contas(request, 'R', 'Contas a Receber', 'receber')
+
+@login_required
+def lista_contas_pagar(request):
+    """Lista apenas contas onde o Plano de Contas é TIPO DESPESA"""
+    return listar_contas(request, 'D', 'Contas a Pagar', 'pagar')
+
 # ==========================================================
 # FUNÇÃO AUXILIAR PARA CRIAR CONTAS (EVITA REPETIÇÃO DE CÓDIGO)
 # ==========================================================
@@ -234,32 +319,20 @@ def processar_lancamento_conta(request, form, tipo_redirect):
     
     if gerar_parcelas:
         qtd = dados['qtd_parcelas']
-        juros = dados.get('taxa_juros') or Decimal(0)
-        
-        acrescimo = valor_original * (juros / Decimal(100))
-        valor_total = valor_original + acrescimo
-        valor_parcela = valor_total / qtd
-        
-        # Gera um número aleatório de 4 dígitos para agrupar as parcelas (Ex: 1234)
-        grupo_parcela = random.randint(1000, 9999) 
-        
-        # Cria as parcelas
-        for i in range(qtd):
-            nova_conta = form.save(commit=False)
-            nova_conta.pk = None
-            nova_conta.empresa = request.user.empresa
-            
-            # Formata: Descrição (Parcela X/Y)
-            nova_conta.descricao = f"{descricao_original}"
-            
-            # Formata: 1234-1/3
-            nova_conta.documento = f"{grupo_parcela}-{i+1}/{qtd}"
-            
-            nova_conta.valor = valor_parcela
-            nova_conta.data_vencimento = add_months(vencimento_inicial, i)
-            
-            nova_conta.save()
-            
+
+        # Todas as parcelas num único INSERT em lote e numa transação
+        grupo_parcela, _ = services.gerar_parcelas(
+            empresa=request.user.empresa,
+            plano_de_contas=dados['plano_de_contas'],
+            cadastro=dados.get('cadastro'),
+            descricao=descricao_original,
+            observacoes=dados.get('observacoes', ''),
+            valor=valor_original,
+            data_vencimento=vencimento_inicial,
+            qtd_parcelas=qtd,
+            taxa_juros=dados.get('taxa_juros') or Decimal(0),
+        )
+
         messages.success(request, f"{qtd} parcelas geradas com sucesso! (Doc: {grupo_parcela})")
     else:
         # Salva normal
@@ -307,6 +380,10 @@ def editar_conta(request, id):
     # Define o tipo para filtrar corretamente o form na edição
     tipo_filtro = conta.plano_de_contas.tipo 
 
+    if conta.status == 'PAGA' and conta.em_periodo_fechado():
+        messages.error(request, "Esta conta foi baixada num mês já fechado e não pode ser alterada.")
+        return redirect('financeiro:lista_receber' if tipo_filtro == 'R' else 'financeiro:lista_pagar')
+
     if request.method == 'POST':
         form = ContaForm(request.POST, instance=conta, user=request.user, tipo_filtro=tipo_filtro)
         if form.is_valid():
@@ -336,7 +413,8 @@ def baixar_conta(request, id):
     
     if request.method == 'POST':
         caixa_id = request.POST.get('caixa')
-        data_pagamento = request.POST.get('data_pagamento')
+        # Data malformada ou impossível (2025-02-30) conta como não preenchida
+        data_pagamento = data_valida(request.POST.get('data_pagamento'))
         
         if not caixa_id or not data_pagamento:
             messages.error(request, "Preencha todos os campos da baixa.")
@@ -349,21 +427,40 @@ def baixar_conta(request, id):
         # D (Despesa) -> D (Débito)
         tipo_lancamento = 'C' if conta.plano_de_contas.tipo == 'R' else 'D'
 
-        Lancamento.objects.create(
-            empresa=request.user.empresa,
-            caixa=caixa,
-            plano_de_contas=conta.plano_de_contas,
-            conta_origem=conta,
-            descricao=f"Baixa: {conta.descricao}",
-            data_lancamento=data_pagamento,
-            valor=conta.valor,
-            tipo=tipo_lancamento
-        )
+        # Juros e multa pela data do movimento, num lançamento à parte no plano de juros
+        encargos = None
+        if request.POST.get('cobrar_encargos'):
+            plano = services.plano_juros(request.user.empresa)
+            if plano:
+                encargos = services.lancamento_encargos(conta, caixa, data_pagamento, plano)
+            else:
+                messages.warning(request, "Configure o parâmetro do plano de contas de Juros/Multa para cobrar encargos.")
 
-        conta.status = 'PAGA'
-        conta.save()
-        
-        messages.success(request, "Baixa realizada com sucesso!")
+        try:
+            with transaction.atomic():
+                Lancamento.objects.create(
+                    empresa=request.user.empresa,
+                    caixa=caixa,
+                    plano_de_contas=conta.plano_de_contas,
+                    conta_origem=conta,
+                    descricao=f"Baixa: {conta.descricao}",
+                    data_lancamento=data_pagamento,
+                    valor=conta.valor,
+                    tipo=tipo_lancamento
+                )
+                if encargos:
+                    encargos.save()
+
+                conta.status = 'PAGA'
+                conta.save()
+        except PeriodoFechado as erro:
+            messages.error(request, erro.message)
+            return redirect('financeiro:lista_receber' if conta.plano_de_contas.tipo == 'R' else 'financeiro:lista_pagar')
+
+        if encargos:
+            messages.success(request, f"Baixa realizada com sucesso! Juros/multa: R$ {encargos.valor:.2f}")
+        else:
+            messages.success(request, "Baixa realizada com sucesso!")
         
         if conta.plano_de_contas.tipo == 'R':
             return redirect('financeiro:lista_receber')
@@ -373,6 +470,38 @@ def baixar_conta(request, id):
     return redirect('financeiro:lista_receber')
 
 
+@login_required
+def baixar_contas_lote(request):
+    """Baixa várias contas de uma vez (mesmo caixa e mesma data)"""
+    tipo_redirect = 'financeiro:lista_pagar' if request.POST.get('tipo_lista') == 'pagar' else 'financeiro:lista_receber'
+
+    if request.method == 'POST':
+        conta_ids = [i for i in request.POST.getlist('contas') if i.isdigit()]
+        caixa_id = request.POST.get('caixa')
+        data_pagamento = data_valida(request.POST.get('data_pagamento'))
+
+        if not conta_ids or not caixa_id or not data_pagamento:
+            messages.error(request, "Selecione as contas e preencha todos os campos da baixa.")
+            return redirect(tipo_redirect)
+
+        caixa = get_object_or_404(Caixa, id=caixa_id, empresa=request.user.empresa)
+
+        plano = None
+        if request.POST.get('cobrar_encargos'):
+            plano = services.plano_juros(request.user.empresa)
+            if not plano:
+                messages.warning(request, "Configure o parâmetro do plano de contas de Juros/Multa para cobrar encargos.")
+        try:
+            lancamentos = services.baixar_contas(request.user.empresa, conta_ids, caixa, data_pagamento, encargos_em=plano)
+        except PeriodoFechado as erro:
+            messages.error(request, erro.message)
+            return redirect(tipo_redirect)
+        baixadas = sum(1 for l in lancamentos if l.conta_origem_id)
+        messages.success(request, f"{baixadas} contas baixadas com sucesso!")
+
+    return redirect(tipo_redirect)
+
+
 # ==========================================================
 # 4. FLUXO DE CAIXA E RELATÓRIOS
 # ==========================================================
@@ -403,12 +532,7 @@ def fluxo_caixa(request):
     else:
         # CENÁRIO B: Primeira carga da página (sem filtros na URL)
         # Tenta pegar o padrão do sistema
-        try:
-            param = ParametroSistema.objects.get(empresa=request.user.empresa, chave='CAIXA_PADRAO_ID')
-            if param.valor and param.valor.isdigit():
-                caixa_id = int(param.valor)
-        except ParametroSistema.DoesNotExist:
-            caixa_id = None
+        caixa_id = parametro(request.user.empresa, 'CAIXA_PADRAO_ID')
 
     # 3. Definição da Categoria
     categoria_id_str = request.GET.get('categoria')
@@ -432,20 +556,8 @@ def fluxo_caixa(request):
             saldo_inicial_cadastro = Caixa.objects.filter(empresa=request.user.empresa).aggregate(Sum('saldo_inicial'))['saldo_inicial__sum'] or 0
 
     # B. Movimentações Passadas (Tudo antes da data_inicio)
-    movimentos_anteriores = Lancamento.objects.filter(
-        empresa=request.user.empresa,
-        data_lancamento__lt=data_inicio # Menor que data de início
-    )
-    
-    # Filtros obrigatórios no histórico
-    if caixa_id:
-        movimentos_anteriores = movimentos_anteriores.filter(caixa_id=caixa_id)
-    
-    if categoria_id_str:
-        movimentos_anteriores = movimentos_anteriores.filter(plano_de_contas_id=categoria_id_str)
-
-    # Soma do histórico
-    total_anteriores = movimentos_anteriores.aggregate(Sum('valor'))['valor__sum'] or 0
+    # Última fotografia do Saldo Mensal + lançamentos do mês de início
+    total_anteriores = movimentos_anteriores(request.user.empresa, data_inicio, caixa_id, categoria_id_str)
 
     # ===> SALDO ANTERIOR FINAL
     saldo_anterior = saldo_inicial_cadastro + total_anteriores
@@ -520,30 +632,91 @@ def editar_lancamento(request, id):
 def excluir_lancamento(request, id):
     lancamento = get_object_or_404(Lancamento, id=id, empresa=request.user.empresa)
     
-    # Se for baixa de conta, retorna a conta para PENDENTE
-    if lancamento.conta_origem:
-        conta = lancamento.conta_origem
-        conta.status = 'PENDENTE'
-        conta.save()
-        aviso_extra = " A conta original voltou para 'Pendente'."
-    else:
-        aviso_extra = ""
+    try:
+        with transaction.atomic():
+            # Se for baixa de conta, retorna a conta para PENDENTE
+            if lancamento.conta_origem:
+                conta = lancamento.conta_origem
+                conta.status = 'PENDENTE'
+                conta.save()
+                aviso_extra = " A conta original voltou para 'Pendente'."
+            else:
+                aviso_extra = ""
+
+            lancamento.delete()
+    except PeriodoFechado as erro:
+        messages.error(request, erro.message)
+        return redirect('financeiro:fluxo_caixa')
 
-    lancamento.delete()
     messages.success(request, f"Lançamento excluído.{aviso_extra}")
     return redirect('financeiro:fluxo_caixa')
 
+
+# ==========================================================
+# FECHAMENTO MENSAL
+# ==========================================================
+
 @login_required
-def relatorio_fluxo(request):
+def lista_fechamentos(request):
+    """Situação do fechamento de cada caixa e os últimos meses fechados"""
+    empresa = request.user.empresa
+    caixas = Caixa.objects.filter(empresa=empresa).annotate(fechado_ate=Max('fechamentos__competencia')).order_by('nome')
+    fechamentos = Fechamento.objects.filter(empresa=empresa).select_related('caixa', 'usuario').order_by('-competencia', 'caixa__nome')[:36]
+    return render(request, 'financeiro/fechamento_lista.html', {
+        'caixas': caixas,
+        'fechamentos': fechamentos,
+        # Último mês que pode ser fechado: o anterior ao atual
+        'mes_sugerido': (date.today().replace(day=1) - timedelta(days=1)).strftime('%Y-%m'),
+    })
+
+@login_required
+def fechar_periodo(request):
+    """Fecha até o mês informado um caixa (ou todos, com caixa vazio)"""
+    if request.method != 'POST':
+        return redirect('financeiro:lista_fechamentos')
+
+    competencia = parse_date(f"{request.POST.get('competencia', '')}-01")
+    if not competencia:
+        messages.error(request, "Informe o mês a fechar.")
+        return redirect('financeiro:lista_fechamentos')
+
+    caixas = Caixa.objects.filter(empresa=request.user.empresa)
+    if request.POST.get('caixa'):
+        caixas = caixas.filter(id=request.POST['caixa'])
+
+    try:
+        meses = sum(
+            len(services.fechar_periodo(request.user.empresa, caixa, competencia, usuario=request.user))
+            for caixa in caixas
+        )
+    except ValueError as erro:
+        messages.error(request, str(erro))
+        return redirect('financeiro:lista_fechamentos')
+
+    if meses:
+        messages.success(request, f"Período fechado até {competencia:%m/%Y} ({meses} mês(es) fechados).")
+    else:
+        messages.warning(request, f"Nada a fechar: {competencia:%m/%Y} já estava fechado.")
+    return redirect('financeiro:lista_fechamentos')
+
+@login_required
+def reabrir_periodo(request, caixa_id):
+    """Reabre o último mês fechado do caixa"""
+    if request.method == 'POST':
+        caixa = get_object_or_404(Caixa, id=caixa_id, empresa=request.user.empresa)
+        competencia = services.reabrir_periodo(request.user.empresa, caixa)
+        if competencia:
+            messages.success(request, f"{caixa.nome}: {competencia:%m/%Y} reaberto.")
+    return redirect('financeiro:lista_fechamentos')
+
+def filtros_relatorio_fluxo(request):
+    """Lê os filtros do relatório de fluxo (datas, caixa, categoria) e monta a query do período"""
     # 1. Definição de Datas
     hoje = date.today()
     inicio_mes = hoje.replace(day=1)
     
     data_inicio_str = request.GET.get('data_inicio') or inicio_mes.strftime('%Y-%m-%d')
     data_fim_str = request.GET.get('data_fim') or hoje.strftime('%Y-%m-%d')
-    
-    data_inicio = parse_date(data_inicio_str)
-    data_fim = parse_date(data_fim_str)
 
     # 2. Filtros (Caixa e Categoria)
     caixa_id_str = request.GET.get('caixa')
@@ -559,41 +732,63 @@ def relatorio_fluxo(request):
     else:
         # Se não veio no filtro, tenta o padrão APENAS se o usuário não pediu "Todos" explicitamente
         # Aqui assumimos que se veio vazio na URL, tenta o padrão.
-        try:
-            param = ParametroSistema.objects.get(empresa=request.user.empresa, chave='CAIXA_PADRAO_ID')
-            if param.valor and param.valor.isdigit():
-                caixa_id = int(param.valor)
-                caixa_selecionado = Caixa.objects.filter(id=caixa_id, empresa=request.user.empresa).first()
-        except ParametroSistema.DoesNotExist:
-            pass
-
-    # =======================================================
-    # 3. CÁLCULO DO SALDO ANTERIOR (A CORREÇÃO)
-    # =======================================================
-    saldo_inicial_cadastro = 0
-    
-    # Se não tem filtro de categoria, considera o saldo de abertura do banco
-    if not categoria_id_str:
+        caixa_id = parametro(request.user.empresa, 'CAIXA_PADRAO_ID')
         if caixa_id:
-            if caixa_selecionado:
-                saldo_inicial_cadastro = caixa_selecionado.saldo_inicial
-        else:
-            # Soma de todos os caixas
-            saldo_inicial_cadastro = Caixa.objects.filter(empresa=request.user.empresa).aggregate(Sum('saldo_inicial'))['saldo_inicial__sum'] or 0
+            caixa_selecionado = Caixa.objects.filter(id=caixa_id, empresa=request.user.empresa).first()
 
-    # Movimentações anteriores à data de início
-    movimentos_anteriores = Lancamento.objects.filter(
+    # 3. Lançamentos do Período (datas inválidas: nenhum; quem chama decide o aviso)
+    data_inicio, data_fim = data_valida(data_inicio_str), data_valida(data_fim_str)
+    lancamentos = Lancamento.objects.filter(
         empresa=request.user.empresa,
-        data_lancamento__lt=data_inicio_str
-    )
-    
+        data_lancamento__range=[data_inicio, data_fim]
+    ) if data_inicio and data_fim else Lancamento.objects.none()
+
     if caixa_id:
-        movimentos_anteriores = movimentos_anteriores.filter(caixa_id=caixa_id)
+        lancamentos = lancamentos.filter(caixa_id=caixa_id)
     
     if categoria_id_str:
-        movimentos_anteriores = movimentos_anteriores.filter(plano_de_contas_id=categoria_id_str)
+        lancamentos = lancamentos.filter(plano_de_contas_id=categoria_id_str)
 
-    total_anteriores = movimentos_anteriores.aggregate(Sum('valor'))['valor__sum'] or 0
+    return {
+        'data_inicio': data_inicio,
+        'data_fim': data_fim,
+        'caixa_id': caixa_id,
+        'caixa_selecionado': caixa_selecionado,
+        'categoria_id': categoria_id_str,
+        'lancamentos': lancamentos,
+    }
+
+def saldo_inicial_fluxo(empresa, filtros):
+    """Saldo de abertura dos caixas do relatório (só sem filtro de categoria)"""
+    if filtros['categoria_id']:
+        return 0
+    if filtros['caixa_id']:
+        caixa = filtros['caixa_selecionado']
+        return caixa.saldo_inicial if caixa else 0
+    # Soma de todos os caixas
+    return Caixa.objects.filter(empresa=empresa).aggregate(Sum('saldo_inicial'))['saldo_inicial__sum'] or 0
+
+def fluxo_pesado(request):
+    return periodo_longo(request, lambda hoje: hoje.replace(day=1))
+
+@login_required
+@cache_relatorio('fluxo')
+@em_segundo_plano("Relatório de Fluxo de Caixa", fluxo_pesado)
+def relatorio_fluxo(request):
+    filtros = filtros_relatorio_fluxo(request)
+    data_inicio = filtros['data_inicio']
+    data_fim = filtros['data_fim']
+    caixa_id = filtros['caixa_id']
+    caixa_selecionado = filtros['caixa_selecionado']
+    categoria_id_str = filtros['categoria_id']
+
+    # =======================================================
+    # 3. CÁLCULO DO SALDO ANTERIOR (A CORREÇÃO)
+    # =======================================================
+    saldo_inicial_cadastro = saldo_inicial_fluxo(request.user.empresa, filtros)
+
+    # Movimentações anteriores à data de início (via Saldo Mensal)
+    total_anteriores = movimentos_anteriores(request.user.empresa, data_inicio, caixa_id, categoria_id_str)
     
     # ===> SALDO ANTERIOR REAL
     saldo_anterior = saldo_inicial_cadastro + total_anteriores
@@ -602,16 +797,7 @@ def relatorio_fluxo(request):
     # =======================================================
     # 4. DADOS DO PERÍODO
     # =======================================================
-    lancamentos = Lancamento.objects.filter(
-        empresa=request.user.empresa,
-        data_lancamento__range=[data_inicio_str, data_fim_str]
-    )
-
-    if caixa_id:
-        lancamentos = lancamentos.filter(caixa_id=caixa_id)
-    
-    if categoria_id_str:
-        lancamentos = lancamentos.filter(plano_de_contas_id=categoria_id_str)
+    lancamentos = filtros['lancamentos'].select_related('plano_de_contas')
 
     # Listas detalhadas
     receitas = lancamentos.filter(tipo='C').order_by('data_lancamento')
@@ -643,10 +829,45 @@ def relatorio_fluxo(request):
     })
 
 @login_required
-def relatorio_contas(request):
+@cache_relatorio('fluxo')
+async def relatorio_fluxo_async(request):
     """
-    Gera relatório de Contas a Pagar ou Receber baseado nos filtros da URL
+    Mesmo relatório, para ASGI: saldo de abertura, movimentos anteriores e as duas
+    listas do período são consultados em paralelo (core.paralelo). Os totais saem
+    das próprias listas.
     """
+    empresa = request.user.empresa
+    filtros = await sync_to_async(filtros_relatorio_fluxo)(request)
+    lancamentos = filtros['lancamentos'].select_related('plano_de_contas').order_by('data_lancamento')
+
+    saldo_inicial_cadastro, total_anteriores, receitas, despesas = await em_paralelo(
+        lambda: saldo_inicial_fluxo(empresa, filtros),
+        lambda: movimentos_anteriores(empresa, filtros['data_inicio'], filtros['caixa_id'], filtros['categoria_id']),
+        lambda: list(lancamentos.filter(tipo='C')),
+        lambda: list(lancamentos.filter(tipo='D')),
+    )
+
+    saldo_anterior = saldo_inicial_cadastro + total_anteriores
+    total_receitas = sum(l.valor for l in receitas)
+    total_despesas = sum(l.valor for l in despesas)
+    resultado_periodo = total_receitas + total_despesas
+
+    return render(request, 'financeiro/relatorio_impresso.html', {
+        'data_inicio': filtros['data_inicio'],
+        'data_fim': filtros['data_fim'],
+        'caixa_selecionado': filtros['caixa_selecionado'],
+        'receitas': receitas,
+        'despesas': despesas,
+        'saldo_anterior': saldo_anterior,
+        'total_receitas': total_receitas,
+        'total_despesas': total_despesas,
+        'resultado_periodo': resultado_periodo,
+        'saldo_final': saldo_anterior + resultado_periodo,
+        'empresa': empresa,
+    })
+
+def filtros_relatorio_contas(request):
+    """Lê os filtros do relatório de contas (mesmos da lista) e monta a query"""
     tipo_lista = request.GET.get('tipo_lista', 'receber')
     tipo_plano = 'R' if tipo_lista == 'receber' else 'D'
     
@@ -656,8 +877,8 @@ def relatorio_contas(request):
     def clean_val(val):
         return val if val and val != 'None' else None
 
-    data_ini = clean_val(request.GET.get('data_ini'))
-    data_fim = clean_val(request.GET.get('data_fim'))
+    data_ini = data_valida(clean_val(request.GET.get('data_ini')))
+    data_fim = data_valida(clean_val(request.GET.get('data_fim')))
     nome = clean_val(request.GET.get('cliente'))
     status = clean_val(request.GET.get('status'))
     categoria_id = clean_val(request.GET.get('categoria')) # NOVO
@@ -666,7 +887,7 @@ def relatorio_contas(request):
         contas = contas.filter(data_vencimento__range=[data_ini, data_fim])
     
     if nome:
-        contas = contas.filter(cadastro__nome__icontains=nome)
+        contas = contas.filter(cadastro__in=Cadastro.objects.buscar(nome, request.user.empresa))
 
     if status:
         if status == 'ATRASADA':
@@ -678,6 +899,24 @@ def relatorio_contas(request):
     if categoria_id:
         contas = contas.filter(plano_de_contas_id=categoria_id)
 
+    return {
+        'tipo_lista': tipo_lista,
+        'data_ini': data_ini,
+        'data_fim': data_fim,
+        'status': status,
+        'contas': contas,
+    }
+
+@login_required
+@cache_relatorio('contas')
+def relatorio_contas(request):
+    """
+    Gera relatório de Contas a Pagar ou Receber baseado nos filtros da URL
+    """
+    filtros = filtros_relatorio_contas(request)
+    tipo_lista = filtros['tipo_lista']
+    contas = filtros['contas'].select_related('cadastro', 'plano_de_contas')
+
     contas = contas.order_by('data_vencimento')
     total_valor = contas.aggregate(Sum('valor'))['valor__sum'] or 0
     titulo_relatorio = "Relatório de Contas a Receber" if tipo_lista == 'receber' else "Relatório de Contas a Pagar"
@@ -687,46 +926,107 @@ def relatorio_contas(request):
         'total_valor': total_valor,
         'titulo_relatorio': titulo_relatorio,
         'empresa': request.user.empresa,
-        'data_ini': parse_date(data_ini) if data_ini else None,
-        'data_fim': parse_date(data_fim) if data_fim else None,
-        'status_filtro': status
+        'data_ini': filtros['data_ini'],
+        'data_fim': filtros['data_fim'],
+        'status_filtro': filtros['status']
     })
 
 @login_required
-def relatorio_dre(request):
-    # 1. Filtros de Data
+@cache_relatorio('contas')
+async def relatorio_contas_async(request):
+    """Relatório de contas para ASGI: a lista e o total em paralelo"""
+    filtros = await sync_to_async(filtros_relatorio_contas)(request)
+    contas = filtros['contas']
+
+    lista, total_valor = await em_paralelo(
+        lambda: list(contas.select_related('cadastro', 'plano_de_contas').order_by('data_vencimento')),
+        lambda: contas.aggregate(Sum('valor'))['valor__sum'] or 0,
+    )
+    titulo_relatorio = "Relatório de Contas a Receber" if filtros['tipo_lista'] == 'receber' else "Relatório de Contas a Pagar"
+
+    return render(request, 'financeiro/relatorio_contas_impresso.html', {
+        'contas': lista,
+        'total_valor': total_valor,
+        'titulo_relatorio': titulo_relatorio,
+        'empresa': request.user.empresa,
+        'data_ini': filtros['data_ini'],
+        'data_fim': filtros['data_fim'],
+        'status_filtro': filtros['status']
+    })
+
+@login_required
+@cache_relatorio('aging')
+def relatorio_aging(request):
+    """Aging: contas pendentes por faixa de atraso, por cliente/fornecedor ou por categoria"""
+    tipo_lista = request.GET.get('tipo_lista', 'receber')
+    agrupar_por = request.GET.get('agrupar', 'cadastro')
+    if agrupar_por not in services.AGRUPAMENTOS_AGING:
+        agrupar_por = 'cadastro'
+
+    linhas, totais = services.aging_contas(
+        request.user.empresa, 'R' if tipo_lista == 'receber' else 'D', agrupar_por
+    )
+    faixas = [(campo, rotulo) for campo, rotulo, _, _ in services.FAIXAS_AGING]
+
+    return render(request, 'financeiro/relatorio_aging.html', {
+        'titulo_relatorio': "Aging de Contas a Receber" if tipo_lista == 'receber' else "Aging de Contas a Pagar",
+        'tipo_lista': tipo_lista,
+        'agrupar_por': agrupar_por,
+        'faixas': faixas,
+        # Valores na ordem das faixas, para o template não depender dos nomes dos campos
+        'linhas': [(linha, [linha[campo] for campo, _ in faixas]) for linha in linhas],
+        'totais': totais,
+        'totais_faixas': [totais[campo] for campo, _ in faixas],
+        'empresa': request.user.empresa,
+    })
+
+@login_required
+@cache_relatorio('projecao')
+def projecao_fluxo(request):
+    """Fluxo de caixa projetado: saldo dos caixas somando as contas pendentes pelo vencimento"""
+    meses = request.GET.get('meses', '3')
+    meses = int(meses) if meses in ('3', '6', '12') else 3
+    periodo = request.GET.get('periodo', 'dia')
+    if periodo not in services.PERIODOS_PROJECAO:
+        periodo = 'dia'
+
+    projecao = services.projecao_fluxo(
+        request.user.empresa, meses, periodo,
+        caixa_contas_id=parametro(request.user.empresa, 'CAIXA_PADRAO_ID'),
+    )
+
+    return render(request, 'financeiro/relatorio_projecao.html', {
+        **projecao,
+        'meses': meses,
+        'periodo': periodo,
+        'empresa': request.user.empresa,
+    })
+
+def periodo_dre(request):
+    """Período do DRE: padrão do início do ano até hoje"""
     hoje = date.today()
     inicio_ano = hoje.replace(month=1, day=1)
     
     data_inicio_str = request.GET.get('data_inicio') or inicio_ano.strftime('%Y-%m-%d')
     data_fim_str = request.GET.get('data_fim') or hoje.strftime('%Y-%m-%d')
     
-    data_inicio = parse_date(data_inicio_str)
-    data_fim = parse_date(data_fim_str)
-
-    # 2. Busca Lançamentos
-    lancamentos = Lancamento.objects.filter(
-        empresa=request.user.empresa,
-        data_lancamento__range=[data_inicio_str, data_fim_str],
-        plano_de_contas__isnull=False
-    )
+    return data_valida(data_inicio_str), data_valida(data_fim_str)
 
-    # 3. Agrupamento (Total por Categoria)
-    from django.db.models import Sum
-    
-    # Receitas
-    receitas = lancamentos.filter(tipo='C').values(
-        'plano_de_contas__codigo', 'plano_de_contas__nome'
-    ).annotate(total=Sum('valor')).order_by('plano_de_contas__codigo')
+@login_required
+@cache_relatorio('dre')
+def relatorio_dre(request):
+    # 1. Filtros de Data
+    data_inicio, data_fim = periodo_dre(request)
 
-    total_receitas = lancamentos.filter(tipo='C').aggregate(Sum('valor'))['valor__sum'] or 0
+    # 2. Total por Categoria (meses fechados vêm do Resumo Mensal)
+    totais = ResumoMensal.totais_por_plano(request.user.empresa, data_inicio, data_fim)
 
-    # Despesas
-    despesas = lancamentos.filter(tipo='D').values(
-        'plano_de_contas__codigo', 'plano_de_contas__nome'
-    ).annotate(total=Sum('valor')).order_by('plano_de_contas__codigo')
+    # 3. Separação Receitas / Despesas
+    receitas = [t for t in totais if t['tipo'] == 'C']
+    total_receitas = sum(t['total'] for t in receitas)
 
-    total_despesas = lancamentos.filter(tipo='D').aggregate(Sum('valor'))['valor__sum'] or 0
+    despesas = [t for t in totais if t['tipo'] == 'D']
+    total_despesas = sum(t['total'] for t in despesas)
 
     # 4. Resultado (Lucro ou Prejuízo)
     resultado = total_receitas + total_despesas
@@ -742,7 +1042,12 @@ def relatorio_dre(request):
         'empresa': request.user.empresa,
     })
 
+def dre_pesado(request):
+    return periodo_longo(request, lambda hoje: hoje.replace(month=1, day=1))
+
 @login_required
+@cache_relatorio('dre_sintetico')
+@em_segundo_plano("DRE Sintético", dre_pesado)
 def relatorio_dre_sintetico(request):
     # 1. Filtros
     hoje = date.today()
@@ -754,53 +1059,50 @@ def relatorio_dre_sintetico(request):
     data_inicio = parse_date(data_inicio_str)
     data_fim = parse_date(data_fim_str)
 
-    # 2. Busca
-    lancamentos = Lancamento.objects.filter(
-        empresa=request.user.empresa,
-        data_lancamento__range=[data_inicio_str, data_fim_str],
-        plano_de_contas__isnull=False
-    )
-
-    # 3. Agrupamento Manual (Soma por Código Pai)
-    grupos_receitas = {}
-    grupos_despesas = {}
+    # 2. Nível do DRE (1 = grupos principais) ou drill-down a partir de um grupo
+    grupo = None
+    grupo_id = request.GET.get('grupo')
+    if grupo_id:
+        grupo = get_object_or_404(PlanoDeContas, id=grupo_id, empresa=request.user.empresa)
 
-    total_rec = 0
-    total_desp = 0
-
-    for l in lancamentos:
-        # Pega o primeiro nível do código (ex: '01.02.001' -> pega '01')
-        # Se seu código não usa ponto (ex: 101001), ajuste o slice (ex: l.plano_de_contas.codigo[:2])
-        codigo_pai = l.plano_de_contas.codigo.split('.')[0] if '.' in l.plano_de_contas.codigo else l.plano_de_contas.codigo[:2]
-        
-        # Garante um fallback se o código for vazio
-        if not codigo_pai: 
-            codigo_pai = 'OUTROS'
-
-        # Lógica para Receitas (C)
-        if l.tipo == 'C':
-            if codigo_pai not in grupos_receitas:
-                nome_pai_obj = PlanoDeContas.objects.filter(empresa=request.user.empresa, codigo=codigo_pai).first()
-                nome_grupo = nome_pai_obj.nome if nome_pai_obj else f'GRUPO {codigo_pai}'
-                grupos_receitas[codigo_pai] = {'nome': nome_grupo, 'total': 0}
-            
-            grupos_receitas[codigo_pai]['total'] += l.valor
-            total_rec += l.valor
-            
-        # Lógica para Despesas (D)
-        elif l.tipo == 'D':
-            if codigo_pai not in grupos_despesas:
-                nome_pai_obj = PlanoDeContas.objects.filter(empresa=request.user.empresa, codigo=codigo_pai).first()
-                nome_grupo = nome_pai_obj.nome if nome_pai_obj else f'GRUPO {codigo_pai}'
-                grupos_despesas[codigo_pai] = {'nome': nome_grupo, 'total': 0}
-            
-            grupos_despesas[codigo_pai]['total'] += l.valor # Soma valor negativo
-            total_desp += l.valor
-
-    # 4. Ordenação (Para aparecer 01, 02, 03 na ordem)
-    # Transforma dicionário em lista de tuplas ordenadas
-    receitas_ordenadas = dict(sorted(grupos_receitas.items()))
-    despesas_ordenadas = dict(sorted(grupos_despesas.items()))
+    nivel_str = request.GET.get('nivel')
+    if nivel_str and nivel_str.isdigit() and int(nivel_str) > 0:
+        nivel = int(nivel_str)
+    else:
+        nivel = grupo.nivel + 1 if grupo else 1
+
+    # 3. Soma por grupo, agrupada no banco pelo prefixo do caminho (Resumo Mensal + pontas do período)
+    totais = ResumoMensal.totais_por_grupo(request.user.empresa, data_inicio, data_fim, nivel=nivel, grupo=grupo)
+
+    # 4. Dados dos grupos numa única consulta
+    planos = {
+        p['caminho']: p for p in PlanoDeContas.objects.filter(
+            empresa=request.user.empresa, caminho__in={caminho for caminho, tipo in totais}
+        ).values('id', 'caminho', 'codigo', 'nome')
+    }
+
+    receitas_ordenadas = []
+    despesas_ordenadas = []
+
+    for (caminho, tipo), total in totais.items():
+        plano = planos.get(caminho, {})
+        linha = {
+            'id': plano.get('id'),
+            'codigo': plano.get('codigo') or '',
+            'nome': plano.get('nome', 'OUTROS'),
+            'total': total,
+        }
+        if tipo == 'C':
+            receitas_ordenadas.append(linha)
+        elif tipo == 'D':
+            despesas_ordenadas.append(linha) # Valor negativo
+
+    # 5. Ordenação (Para aparecer 01, 02, 03 na ordem)
+    receitas_ordenadas.sort(key=lambda l: (l['codigo'], l['nome']))
+    despesas_ordenadas.sort(key=lambda l: (l['codigo'], l['nome']))
+
+    total_rec = sum(l['total'] for l in receitas_ordenadas)
+    total_desp = sum(l['total'] for l in despesas_ordenadas)
 
     resultado = total_rec + total_desp
 
@@ -809,8 +1111,65 @@ def relatorio_dre_sintetico(request):
         'data_fim': data_fim,
         'receitas': receitas_ordenadas,
         'despesas': despesas_ordenadas,
+        'nivel': nivel,
+        'grupo': grupo,
         'total_receitas': total_rec,
         'total_despesas': total_desp,
         'resultado': resultado,
         'empresa': request.user.empresa,
-    })
\ No newline at end of file
+    })
+
+# ==========================================================
+# 5. EXPORTAÇÃO (CSV / XLSX)
+# ==========================================================
+
+def periodo_invalido(request, *datas):
+    """Alguma data do filtro não é uma data (a exportação volta para o relatório com o aviso)"""
+    if None in datas:
+        messages.error(request, "Período inválido: informe as datas no formato AAAA-MM-DD.")
+        return True
+    return False
+
+@login_required
+def exportar_fluxo(request):
+    """Lançamentos do relatório de fluxo, com os mesmos filtros, em CSV ou XLSX"""
+    filtros = filtros_relatorio_fluxo(request)
+    if periodo_invalido(request, filtros['data_inicio'], filtros['data_fim']):
+        return redirect('financeiro:relatorio_fluxo')
+    linhas = exportacao.em_lotes(filtros['lancamentos'], [
+        'data_lancamento', 'tipo', 'caixa__nome', 'plano_de_contas__codigo',
+        'plano_de_contas__nome', 'descricao', 'valor'
+    ], ordem='data_lancamento')
+    cabecalho = ['Data', 'Tipo', 'Caixa', 'Código', 'Categoria', 'Descrição', 'Valor']
+    nome = f"fluxo_{filtros['data_inicio']:%Y%m%d}_{filtros['data_fim']:%Y%m%d}"
+    return exportacao.resposta(request.GET.get('formato'), nome, cabecalho, linhas)
+
+@login_required
+def exportar_contas(request):
+    """Contas do relatório de contas a pagar/receber, com os mesmos filtros, em CSV ou XLSX"""
+    filtros = filtros_relatorio_contas(request)
+    informadas = [filtros[campo] for campo in ('data_ini', 'data_fim') if request.GET.get(campo) not in (None, '', 'None')]
+    if periodo_invalido(request, *informadas):
+        return redirect('financeiro:relatorio_contas')
+    linhas = exportacao.em_lotes(filtros['contas'], [
+        'data_vencimento', 'documento', 'cadastro__nome', 'cadastro__cpf_cnpj',
+        'plano_de_contas__nome', 'descricao', 'valor', 'status'
+    ], ordem='data_vencimento')
+    cabecalho = ['Vencimento', 'Documento', 'Cliente/Fornecedor', 'CPF/CNPJ', 'Categoria', 'Descrição', 'Valor', 'Status']
+    nome = f"contas_{filtros['tipo_lista']}"
+    return exportacao.resposta(request.GET.get('formato'), nome, cabecalho, linhas)
+
+@login_required
+def exportar_dre(request):
+    """DRE analítico (total por categoria) em CSV ou XLSX"""
+    data_inicio, data_fim = periodo_dre(request)
+    if periodo_invalido(request, data_inicio, data_fim):
+        return redirect('financeiro:relatorio_dre')
+    totais = ResumoMensal.totais_por_plano(request.user.empresa, data_inicio, data_fim)
+    linhas = (
+        ('Receita' if t['tipo'] == 'C' else 'Despesa', t['plano_de_contas__codigo'], t['plano_de_contas__nome'], t['total'])
+        for t in totais
+    )
+    cabecalho = ['Grupo', 'Código', 'Categoria', 'Total']
+    nome = f"dre_{data_inicio:%Y%m%d}_{data_fim:%Y%m%d}"
+    return exportacao.resposta(request.GET.get('formato'), nome, cabecalho, linhas)
@@ -0,0 +1,74 @@
+// Autocomplete para <select data-autocomplete-url="..."> (ver core/autocomplete.py).
+// Mostra um campo de busca acima do select e preenche as opções com o resultado do endpoint JSON.
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('select[data-autocomplete-url]').forEach(function (select) {
+        const url = select.dataset.autocompleteUrl;
+        const busca = document.createElement('input');
+        busca.type = 'search';
+        busca.placeholder = 'Digite para buscar...';
+        busca.className = select.className + ' mb-1';
+        busca.autocomplete = 'off';
+
+        const lista = document.createElement('div');
+        lista.className = 'hidden absolute z-20 w-full bg-white border border-gray-300 rounded-md shadow max-h-60 overflow-y-auto text-sm';
+
+        const caixa = document.createElement('div');
+        caixa.className = 'relative';
+        select.parentNode.insertBefore(caixa, select);
+        caixa.appendChild(busca);
+        caixa.appendChild(lista);
+
+        let pagina = 1;
+        let espera = null;
+
+        function escolher(item) {
+            let opcao = select.querySelector('option[value="' + item.id + '"]');
+            if (!opcao) {
+                opcao = new Option(item.texto, item.id);
+                select.appendChild(opcao);
+            }
+            select.value = String(item.id);
+            select.dispatchEvent(new Event('change'));
+            lista.classList.add('hidden');
+            busca.value = '';
+        }
+
+        function carregar(acrescentar) {
+            const separador = url.includes('?') ? '&' : '?';
+            fetch(url + separador + new URLSearchParams({q: busca.value, pagina: pagina}))
+                .then(function (resposta) { return resposta.json(); })
+                .then(function (dados) {
+                    if (!acrescentar) lista.innerHTML = '';
+                    const anterior = lista.querySelector('[data-mais]');
+                    if (anterior) anterior.remove();
+
+                    dados.resultados.forEach(function (item) {
+                        const linha = document.createElement('div');
+                        linha.className = 'px-3 py-2 cursor-pointer hover:bg-blue-50';
+                        linha.textContent = item.texto;
+                        linha.addEventListener('mousedown', function (e) { e.preventDefault(); escolher(item); });
+                        lista.appendChild(linha);
+                    });
+                    if (!dados.resultados.length && !acrescentar) {
+                        lista.innerHTML = '<div class="px-3 py-2 text-gray-500">Nada encontrado</div>';
+                    }
+                    if (dados.mais) {
+                        const mais = document.createElement('div');
+                        mais.dataset.mais = '1';
+                        mais.className = 'px-3 py-2 text-center text-blue-600 cursor-pointer hover:bg-blue-50';
+                        mais.textContent = 'Carregar mais...';
+                        mais.addEventListener('mousedown', function (e) { e.preventDefault(); pagina += 1; carregar(true); });
+                        lista.appendChild(mais);
+                    }
+                    lista.classList.remove('hidden');
+                });
+        }
+
+        busca.addEventListener('input', function () {
+            clearTimeout(espera);
+            espera = setTimeout(function () { pagina = 1; carregar(false); }, 250);
+        });
+        busca.addEventListener('focus', function () { pagina = 1; carregar(false); });
+        busca.addEventListener('blur', function () { lista.classList.add('hidden'); });
+    });
+});
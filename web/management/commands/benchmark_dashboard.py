@@ -0,0 +1,125 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core.instrumentacao import percentil
+
+# Página -> (view síncrona, view assíncrona)
+PAGINAS = {
+    'dashboard': ('dashboard', 'dashboard_async'),
+    'fluxo': ('financeiro:relatorio_fluxo', 'financeiro:relatorio_fluxo_async'),
+    'contas': ('financeiro:relatorio_contas', 'financeiro:relatorio_contas_async'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara a latência (p50/p95) das views síncronas (caminho WSGI, N threads) com as "
+        "versões assíncronas (caminho ASGI, N requisições simultâneas no event loop). "
+        "Roda no próprio processo, sem servidor HTTP, sobre os dados já gravados no banco."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', required=True, help="Login do usuário (define a empresa)")
+        parser.add_argument('--paginas', nargs='+', choices=PAGINAS, default=list(PAGINAS))
+        parser.add_argument('--requisicoes', type=int, default=200)
+        parser.add_argument('--concorrencia', type=int, default=8)
+        parser.add_argument('--host', default='testserver', help="Host das requisições (liberado no ALLOWED_HOSTS durante a medição)")
+        parser.add_argument(
+            '--latencia-ms', type=float, default=0,
+            help="Atraso somado a cada consulta, simulando a ida e volta até um MySQL na rede "
+                 "(com SQLite local não há espera de I/O para sobrepor)",
+        )
+
+    def handle(self, *args, **options):
+        usuario = get_user_model().objects.filter(username=options['usuario']).first()
+        if not usuario or not usuario.empresa_id:
+            raise CommandError(f"Usuário {options['usuario']} não encontrado ou sem empresa.")
+
+        if options['latencia_ms']:
+            self.simular_latencia(options['latencia_ms'] / 1000)
+
+        # Uma sessão só, compartilhada por todos os clientes
+        cliente = Client(SERVER_NAME=options['host'])
+        cliente.force_login(usuario)
+        self.cookies = cliente.cookies
+        self.host = options['host']
+
+        # Os clientes rodam no próprio processo: o host deles pode entrar no ALLOWED_HOSTS
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, self.host]):
+                self.stdout.write(f"{'página':<12} {'modo':<6} {'p50 (ms)':>10} {'p95 (ms)':>10} {'req/s':>8}")
+                for pagina in options['paginas']:
+                    sincrona, assincrona = (reverse(nome) for nome in PAGINAS[pagina])
+                    for modo, medir in (('WSGI', self.medir_wsgi), ('ASGI', self.medir_asgi)):
+                        url = sincrona if modo == 'WSGI' else assincrona
+                        inicio = time.perf_counter()
+                        tempos = medir(url, options['requisicoes'], options['concorrencia'])
+                        total = time.perf_counter() - inicio
+                        self.stdout.write(
+                            f"{pagina:<12} {modo:<6} {percentil(tempos, 50):>10.1f} "
+                            f"{percentil(tempos, 95):>10.1f} {len(tempos) / total:>8.1f}"
+                        )
+        finally:
+            cliente.logout()
+
+    @staticmethod
+    def simular_latencia(segundos):
+        def atraso(execute, sql, params, many, context):
+            time.sleep(segundos)
+            return execute(sql, params, many, context)
+
+        def nova_conexao(sender, connection, **kwargs):
+            connection.execute_wrappers.append(atraso)
+
+        # Vale para a conexão desta thread e para as que as threads abrirem depois
+        connection.execute_wrappers.append(atraso)
+        connection_created.connect(nova_conexao, weak=False)
+
+    @staticmethod
+    def url_sem_cache(url, i):
+        # Parâmetro único: os relatórios não vêm do cache (ver financeiro.cache)
+        return f"{url}?_={i}"
+
+    def medir_wsgi(self, url, requisicoes, concorrencia):
+        def requisicao(i):
+            cliente = Client(SERVER_NAME=self.host)
+            cliente.cookies = self.cookies
+            inicio = time.perf_counter()
+            response = cliente.get(self.url_sem_cache(url, i))
+            if response.status_code != 200:
+                raise CommandError(f"{url}: status {response.status_code}")
+            return (time.perf_counter() - inicio) * 1000
+
+        with ThreadPoolExecutor(max_workers=concorrencia) as pool:
+            return list(pool.map(requisicao, range(requisicoes)))
+
+    def medir_asgi(self, url, requisicoes, concorrencia):
+        async def todas():
+            limite = asyncio.Semaphore(concorrencia)
+
+            async def requisicao(i):
+                # ThreadSensitiveContext: como no ASGIHandler, cada requisição tem a sua thread para
+                # o código síncrono (sessão, usuário); o AsyncClient sozinho enfileira todas numa só
+                async with limite, ThreadSensitiveContext():
+                    cliente = AsyncClient(SERVER_NAME=self.host)
+                    cliente.cookies = self.cookies
+                    inicio = time.perf_counter()
+                    response = await cliente.get(self.url_sem_cache(url, i))
+                    if response.status_code != 200:
+                        raise CommandError(f"{url}: status {response.status_code}")
+                    return (time.perf_counter() - inicio) * 1000
+
+            return await asyncio.gather(*(requisicao(i) for i in range(requisicoes)))
+
+        return asyncio.run(todas())
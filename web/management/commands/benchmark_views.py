@@ -0,0 +1,161 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from cadastros.models import Cadastro
+from core.instrumentacao import percentil
+from financeiro.models import Conta, Lancamento
+
+# Nome -> (rota, parâmetros). As páginas que o time mais usa, com os filtros padrão
+PAGINAS = {
+    'dashboard': ('dashboard', {}),
+    'fluxo_caixa': ('financeiro:fluxo_caixa', {}),
+    'receber': ('financeiro:lista_receber', {}),
+    'receber_atrasadas': ('financeiro:lista_receber', {'status': 'ATRASADA'}),
+    'pagar': ('financeiro:lista_pagar', {}),
+    'clientes': ('lista_clientes', {}),
+    'relatorio_fluxo': ('financeiro:relatorio_fluxo', {}),
+    'relatorio_contas': ('financeiro:relatorio_contas', {}),
+    'aging': ('financeiro:relatorio_aging', {}),
+    'projecao': ('financeiro:projecao_fluxo', {'meses': 12}),
+    'dre': ('financeiro:relatorio_dre', {}),
+    'dre_sintetico': ('financeiro:relatorio_dre_sintetico', {}),
+    'exportar_fluxo': ('financeiro:exportar_fluxo', {}),
+    'exportar_contas': ('financeiro:exportar_contas', {}),
+    'exportar_dre': ('financeiro:exportar_dre', {}),
+}
+
+
+class MedidorSQL:
+    """execute_wrapper que conta as consultas e soma o tempo gasto no banco"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1
+            self.tempo += time.perf_counter() - inicio
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede as páginas principais (tempo, consultas, tempo de banco e tamanho da resposta) "
+        "com os dados de uma empresa — normalmente gerados com gerar_dados_sinteticos. "
+        "Grava o resultado em JSON para comparar antes/depois de uma mudança (--comparar)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', required=True, help="Login do usuário (define a empresa)")
+        parser.add_argument('--paginas', nargs='+', choices=PAGINAS, default=list(PAGINAS))
+        parser.add_argument('--repeticoes', type=int, default=5)
+        parser.add_argument('--host', default='testserver', help="Host das requisições (liberado no ALLOWED_HOSTS durante a medição)")
+        parser.add_argument('--rotulo', default='', help="Identifica a execução no JSON (ex: nome do branch)")
+        parser.add_argument('--saida', help="Arquivo JSON com o resultado")
+        parser.add_argument('--comparar', help="JSON de uma execução anterior: mostra a diferença por página")
+
+    def handle(self, *args, **options):
+        usuario = get_user_model().objects.filter(username=options['usuario']).first()
+        if not usuario or not usuario.empresa_id:
+            raise CommandError(f"Usuário {options['usuario']} não encontrado ou sem empresa.")
+        if options['repeticoes'] < 1:
+            raise CommandError("--repeticoes precisa ser pelo menos 1.")
+
+        anterior = None
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as arquivo:
+                anterior = json.load(arquivo)['paginas']
+
+        cliente = Client(SERVER_NAME=options['host'])
+        cliente.force_login(usuario)
+        resultado = {
+            'rotulo': options['rotulo'],
+            'data': timezone.now().isoformat(timespec='seconds'),
+            'banco': connection.vendor,
+            'empresa': usuario.empresa_id,
+            'volume': {
+                'cadastros': Cadastro.objects.filter(empresa_id=usuario.empresa_id).count(),
+                'contas': Conta.objects.filter(empresa_id=usuario.empresa_id).count(),
+                'lancamentos': Lancamento.objects.filter(empresa_id=usuario.empresa_id).count(),
+            },
+            'paginas': {},
+        }
+        self.stdout.write(
+            f"{resultado['banco']}: {resultado['volume']['contas']} contas, "
+            f"{resultado['volume']['lancamentos']} lançamentos, {options['repeticoes']} repetições por página"
+        )
+        self.stdout.write(
+            f"{'página':<18} {'mediana':>9} {'p95':>9} {'mín':>9} {'consultas':>10} {'banco':>9} {'KB':>8}"
+        )
+
+        # Tudo síncrono: o benchmark mede a página, não a fila de segundo plano. O cliente
+        # roda no próprio processo, então o host dele pode entrar no ALLOWED_HOSTS
+        try:
+            with override_settings(RELATORIO_DIAS_SINCRONO=None,
+                                   ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, options['host']]):
+                for nome in options['paginas']:
+                    medida = self.medir(cliente, *PAGINAS[nome], options['repeticoes'])
+                    resultado['paginas'][nome] = medida
+                    self.stdout.write(
+                        f"{nome:<18} {medida['mediana_ms']:>9.1f} {medida['p95_ms']:>9.1f} {medida['min_ms']:>9.1f} "
+                        f"{medida['consultas']:>10} {medida['banco_ms']:>9.1f} {medida['bytes'] / 1024:>8.1f}"
+                        + self.diferenca(anterior, nome, medida)
+                    )
+        finally:
+            cliente.logout()
+
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Resultado gravado em {options['saida']}"))
+
+    @staticmethod
+    def medir(cliente, rota, parametros, repeticoes):
+        url = reverse(rota)
+        tempos, medidores = [], []
+        for i in range(repeticoes):
+            # Parâmetro único: os relatórios não vêm do cache (ver financeiro.cache)
+            medidor = MedidorSQL()
+            with connection.execute_wrapper(medidor):
+                inicio = time.perf_counter()
+                response = cliente.get(url, {**parametros, '_': i})
+                # Exportações são streaming: o tempo inclui gerar o arquivo inteiro
+                conteudo = b''.join(response.streaming_content) if response.streaming else response.content
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f"{url}: status {response.status_code}")
+            medidores.append(medidor)
+
+        return {
+            'url': url,
+            'parametros': parametros,
+            'mediana_ms': round(statistics.median(tempos), 1),
+            'p95_ms': round(percentil(tempos, 95), 1),
+            'min_ms': round(min(tempos), 1),
+            # Consultas e banco da requisição mediana (a primeira pode trazer sessão/parâmetros do cache frio)
+            'consultas': sorted(m.consultas for m in medidores)[len(medidores) // 2],
+            'banco_ms': round(statistics.median(m.tempo for m in medidores) * 1000, 1),
+            'bytes': len(conteudo),
+            'status': response.status_code,
+        }
+
+    @staticmethod
+    def diferenca(anterior, nome, medida):
+        if not anterior or nome not in anterior or not anterior[nome]['mediana_ms']:
+            return ''
+        antes = anterior[nome]
+        variacao = (medida['mediana_ms'] - antes['mediana_ms']) / antes['mediana_ms'] * 100
+        return f"   {variacao:+.0f}% tempo, {medida['consultas'] - antes['consultas']:+d} consultas"
@@ -1,3 +1,110 @@
+import json
+import os
+import tempfile
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from cadastros.models import Cadastro
+from core.models import Empresa, Usuario
+from financeiro.models import Caixa, Lancamento
+from web import views
+from web.management.commands import benchmark_views
+
+
+class DashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.empresa = Empresa.objects.create(nome="Empresa Teste", cnpj="00.000.000/0001-00")
+        cls.usuario = Usuario.objects.create_user('teste', password='senha', empresa=cls.empresa)
+        cls.caixa = Caixa.objects.create(empresa=cls.empresa, nome="Caixa")
+
+        Cadastro.objects.create(empresa=cls.empresa, nome="Ativo", cpf_cnpj="1", papel='CLI')
+        Cadastro.objects.create(empresa=cls.empresa, nome="Inativo", cpf_cnpj="2", papel='AMB', situacao='INATIVO')
+        Cadastro.objects.create(empresa=cls.empresa, nome="Fornecedor", cpf_cnpj="3", papel='FOR')
+
+        hoje = timezone.now().date()
+        for meses in range(24):
+            data_ref = views.inicio_mes_anterior(hoje, meses)
+            Lancamento.objects.create(empresa=cls.empresa, caixa=cls.caixa, data_lancamento=data_ref,
+                                      descricao="Receita", valor=Decimal('100.00'), tipo='C')
+            Lancamento.objects.create(empresa=cls.empresa, caixa=cls.caixa, data_lancamento=data_ref,
+                                      descricao="Despesa", valor=Decimal('40.00'), tipo='D')
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def get_dashboard(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_totais(self):
+        response, _ = self.get_dashboard()
+        self.assertEqual(response.context['total_clientes'], 2)
+        self.assertEqual(response.context['ativos'], 1)
+        self.assertEqual(response.context['receita_mensal'], Decimal('100.00'))
+        self.assertEqual(response.context['despesa_mensal'], Decimal('40.00'))
+        self.assertEqual(response.context['grafico_receita'], [100.0] * views.MESES_GRAFICO)
+        self.assertEqual(response.context['grafico_despesa'], [40.0] * views.MESES_GRAFICO)
+
+    def test_meses_do_grafico_sao_de_calendario(self):
+        self.assertEqual(views.inicio_mes_anterior(date(2025, 3, 31), 1), date(2025, 2, 1))
+        self.assertEqual(views.inicio_mes_anterior(date(2025, 1, 15), 1), date(2024, 12, 1))
+        self.assertEqual(views.inicio_mes_anterior(date(2025, 1, 15), 13), date(2023, 12, 1))
+        self.assertEqual(views.inicio_mes_anterior(date(2025, 12, 15), -1), date(2026, 1, 1))
+
+    def test_queries_nao_crescem_com_a_janela(self):
+        _, queries_padrao = self.get_dashboard()
+
+        for meses in (12, 24):
+            with mock.patch.object(views, 'MESES_GRAFICO', meses):
+                response, queries = self.get_dashboard()
+            self.assertEqual(queries, queries_padrao, f"Janela de {meses} meses mudou o nº de queries")
+            self.assertEqual(len(response.context['grafico_labels']), meses)
+            self.assertEqual(response.context['grafico_receita'], [100.0] * meses)
+
+    async def test_versao_assincrona_igual_a_sincrona(self):
+        await self.async_client.aforce_login(self.usuario)
+        sincrono = await self.async_client.get(reverse('dashboard'))
+        assincrono = await self.async_client.get(reverse('dashboard_async'))
+
+        self.assertEqual(assincrono.status_code, 200)
+        for chave in ('total_clientes', 'ativos', 'receita_mensal', 'despesa_mensal', 'saldo',
+                      'grafico_labels', 'grafico_receita', 'grafico_despesa'):
+            self.assertEqual(assincrono.context[chave], sincrono.context[chave], chave)
+
+
+class BenchmarkViewsTests(TestCase):
+    def test_mede_todas_as_paginas_e_grava_json(self):
+        call_command('gerar_dados_sinteticos', cadastros=20, contas=100, lancamentos=100, meses=3, seed=1, stdout=StringIO())
+        usuario = Usuario.objects.get(username__startswith='sintetico')
+
+        with tempfile.TemporaryDirectory() as pasta:
+            arquivo = os.path.join(pasta, 'benchmark.json')
+            call_command('benchmark_views', usuario=usuario.username, repeticoes=1, rotulo='teste',
+                         saida=arquivo, stdout=StringIO())
+            with open(arquivo, encoding='utf-8') as f:
+                resultado = json.load(f)
+
+            # A segunda execução compara com a primeira
+            saida = StringIO()
+            call_command('benchmark_views', usuario=usuario.username, repeticoes=1, paginas=['dashboard'],
+                         comparar=arquivo, stdout=saida)
 
-# Create your tests here.
+        self.assertEqual(resultado['rotulo'], 'teste')
+        self.assertEqual(resultado['volume']['contas'], 100)
+        self.assertEqual(set(resultado['paginas']), set(benchmark_views.PAGINAS))
+        for nome, medida in resultado['paginas'].items():
+            self.assertEqual(medida['status'], 200, nome)
+            self.assertGreater(medida['consultas'], 0, nome)
+        self.assertIn("consultas", saida.getvalue().splitlines()[-1])
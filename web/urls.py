@@ -7,6 +7,7 @@ urlpatterns = [
     # Landing Page e Dashboard
     path('', views.home, name='home'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/async/', views.dashboard_async, name='dashboard_async'),
 
     # --- SISTEMA DE LOGIN PERSONALIZADO ---
     path('login/', auth_views.LoginView.as_view(
@@ -1,10 +1,11 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Q
+from django.db.models import Count, F, Sum, Q
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date
 from cadastros.models import Cadastro
-from financeiro.models import Lancamento, Conta
+from core.paralelo import em_paralelo
+from financeiro.models import Lancamento, Conta, ResumoMensal
 
 # ==========================================
 # LANDING PAGE (Tela Inicial)
@@ -17,93 +18,127 @@ def home(request):
 # ==========================================
 # DASHBOARD (Painel Principal)
 # ==========================================
-@login_required
-def dashboard(request):
-    empresa = request.user.empresa
-    hoje = timezone.now().date()
-    mes_atual = hoje.month
-    ano_atual = hoje.year
+# Quantidade de meses exibidos no gráfico (o custo em queries não muda com ele)
+MESES_GRAFICO = 6
+
 
-    # 1. DADOS DE CADASTROS
-    # Filtra apenas quem é Cliente (CLI) ou Ambos (AMB)
-    qs_clientes = Cadastro.objects.filter(
+def inicio_mes_anterior(data, meses):
+    """Primeiro dia do mês 'meses' antes de 'data' (aritmética de calendário, não de 30 dias)"""
+    total = data.year * 12 + (data.month - 1) - meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+# Grupos de consultas independentes: a view síncrona roda um depois do outro,
+# a assíncrona roda todos ao mesmo tempo (core.paralelo)
+
+def contagem_clientes(empresa):
+    """Filtra apenas quem é Cliente (CLI) ou Ambos (AMB) - as duas contagens numa query só"""
+    return Cadastro.objects.filter(
         empresa=empresa
-    ).filter(Q(papel='CLI') | Q(papel='AMB'))
-
-    total_clientes = qs_clientes.count()
-    ativos = qs_clientes.filter(situacao='ATIVO').count()
-    
-    # 2. DADOS FINANCEIROS (REALIZADO / FLUXO)
-    # Soma apenas o que foi BAIXADO/PAGO neste mês
-    
-    # Receitas (Créditos)
-    receita_mensal = Lancamento.objects.filter(
-        empresa=empresa,
-        tipo='C', 
-        data_lancamento__month=mes_atual,
-        data_lancamento__year=ano_atual
-    ).aggregate(Sum('valor'))['valor__sum'] or 0
+    ).filter(Q(papel='CLI') | Q(papel='AMB')).aggregate(
+        total=Count('id'),
+        ativos=Count('id', filter=Q(situacao='ATIVO')),
+    )
 
-    # Despesas (Débitos) - Vem negativo do banco
-    despesa_mensal_raw = Lancamento.objects.filter(
+
+def totais_por_mes(empresa, hoje):
+    """
+    Uma única query no Resumo Mensal, agrupada por mês com agregação condicional por tipo.
+    O mês atual (cards) é o último ponto da própria série.
+    """
+    primeiro_mes = inicio_mes_anterior(hoje, MESES_GRAFICO - 1)
+    fim_mes = inicio_mes_anterior(hoje, -1)
+
+    totais = ResumoMensal.objects.filter(
         empresa=empresa,
-        tipo='D', 
-        data_lancamento__month=mes_atual,
-        data_lancamento__year=ano_atual
-    ).aggregate(Sum('valor'))['valor__sum'] or 0
+        competencia__gte=primeiro_mes,
+        competencia__lt=fim_mes,
+    ).values(mes=F('competencia')).annotate(
+        receita=Sum('total', filter=Q(tipo='C')),
+        despesa=Sum('total', filter=Q(tipo='D')),
+    ).order_by('mes')
+
+    return {t['mes']: t for t in totais}
 
-    # Saldo Real (Soma direta pois despesa é negativa)
-    saldo_mes = receita_mensal + despesa_mensal_raw
 
-    # 3. LISTAS DE ALERTA
-    ultimos_pagamentos = Lancamento.objects.filter(
+def ultimos_pagamentos(empresa):
+    return Lancamento.objects.filter(
         empresa=empresa, 
         tipo='C'
     ).order_by('-data_lancamento')[:5]
 
-    contas_atrasadas = Conta.objects.filter(
+
+def contas_atrasadas(empresa, hoje):
+    return Conta.objects.filter(
         empresa=empresa,
         plano_de_contas__tipo='R', # Só queremos saber de receber
         status='PENDENTE',
         data_vencimento__lt=hoje
-    ).order_by('data_vencimento')[:5]
+    ).select_related('cadastro').order_by('data_vencimento')[:5]
+
 
-    # 4. DADOS PARA O GRÁFICO (Últimos 6 meses)
+def contexto_dashboard(hoje, contagem, serie, pagamentos, atrasadas):
     labels_grafico = []
     dados_receita = []
     dados_despesa = []
-    
-    for i in range(5, -1, -1):
-        data_ref = hoje.replace(day=1) - timedelta(days=i*30)
-        mes_ref = data_ref.month
-        ano_ref = data_ref.year
-        
-        labels_grafico.append(f"{mes_ref:02d}/{ano_ref}")
-        
-        r = Lancamento.objects.filter(
-            empresa=empresa, tipo='C', 
-            data_lancamento__month=mes_ref, data_lancamento__year=ano_ref
-        ).aggregate(Sum('valor'))['valor__sum'] or 0
-        
-        d = Lancamento.objects.filter(
-            empresa=empresa, tipo='D', 
-            data_lancamento__month=mes_ref, data_lancamento__year=ano_ref
-        ).aggregate(Sum('valor'))['valor__sum'] or 0
-        
-        dados_receita.append(float(r))
-        dados_despesa.append(abs(float(d)))
-
-    context = {
-        'total_clientes': total_clientes,
-        'ativos': ativos,
+
+    for i in range(MESES_GRAFICO - 1, -1, -1):
+        mes_ref = inicio_mes_anterior(hoje, i)
+        totais = serie.get(mes_ref, {})
+
+        labels_grafico.append(f"{mes_ref.month:02d}/{mes_ref.year}")
+        dados_receita.append(float(totais.get('receita') or 0))
+        dados_despesa.append(abs(float(totais.get('despesa') or 0)))
+
+    # Receitas (Créditos) e Despesas (Débitos) - despesa vem negativa do banco
+    totais_mes = serie.get(hoje.replace(day=1), {})
+    receita_mensal = totais_mes.get('receita') or 0
+    despesa_mensal_raw = totais_mes.get('despesa') or 0
+
+    # Saldo Real (Soma direta pois despesa é negativa)
+    saldo_mes = receita_mensal + despesa_mensal_raw
+
+    return {
+        'total_clientes': contagem['total'],
+        'ativos': contagem['ativos'],
         'receita_mensal': receita_mensal,
         'despesa_mensal': abs(despesa_mensal_raw),
         'saldo': saldo_mes,
-        'ultimos_pagamentos': ultimos_pagamentos,
-        'contas_atrasadas': contas_atrasadas,
+        'ultimos_pagamentos': pagamentos,
+        'contas_atrasadas': atrasadas,
         'grafico_labels': labels_grafico,
         'grafico_receita': dados_receita,
         'grafico_despesa': dados_despesa,
+        'grafico_meses': MESES_GRAFICO,
     }
-    
-    return render(request, 'web/dashboard.html', context)
\ No newline at end of file
+
+
+@login_required
+def dashboard(request):
+    empresa = request.user.empresa
+    hoje = timezone.now().date()
+
+    context = contexto_dashboard(
+        hoje,
+        contagem_clientes(empresa),
+        totais_por_mes(empresa, hoje),
+        ultimos_pagamentos(empresa),
+        contas_atrasadas(empresa, hoje),
+    )
+    return render(request, 'web/dashboard.html', context)
+
+
+@login_required
+async def dashboard_async(request):
+    """Mesmo painel, com os grupos de consultas em paralelo (servir via ASGI: core/asgi.py)"""
+    empresa = request.user.empresa
+    hoje = timezone.now().date()
+
+    # As listas são avaliadas aqui: o template não pode consultar o banco num contexto assíncrono
+    resultados = await em_paralelo(
+        lambda: contagem_clientes(empresa),
+        lambda: totais_por_mes(empresa, hoje),
+        lambda: list(ultimos_pagamentos(empresa)),
+        lambda: list(contas_atrasadas(empresa, hoje)),
+    )
+    return render(request, 'web/dashboard.html', contexto_dashboard(hoje, *resultados))